@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
+from fastapi import APIRouter, Depends, File, HTTPException, status, Request, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
-from app.service.auth_service import AuthService
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from app.config import settings
+from app.database import get_async_db, get_async_session_factory
+from app.service.async_auth_service import AsyncAuthService
 from app.api.schemas.auth_schema import (
     UserCreate, UserLogin, UserResponse, Token,
     ForgotPasswordRequest, ForgotPasswordResponse,
@@ -16,12 +19,19 @@ from app.api.schemas.auth_schema import (
     PendingUsersListResponse, SetPasswordResponse, SetPasswordRequest,
     UserListResponse, UserDetailResponse, AdminUserCreateResponse, AdminUserUpdateResponse,
     ToggleUserActiveRequest, ToggleUserActiveResponse,
-    AdminUserCreate, AdminUserUpdate
+    AdminUserCreate, AdminUserUpdate,
+    UserImportResponse,
+    BulkVerificationRequest, BulkToggleUserActiveRequest, BulkActionResponse
 )
-from app.api.schemas.response_schemas import success_response, error_response
-from app.utils.auth_util import get_current_active_user
+from app.api.schemas.response_schemas import ResponseModel, success_response, error_response
+from app.utils.auth_util import get_current_active_user, get_current_user_entity
+from app.utils.activity_tracker_util import activity_tracker
+from app.utils.export_util import stream_csv, stream_xlsx
+from app.utils.json_response_util import json_response
+from app.utils.query_cache_util import cached_query_async, normalize_query_params
 from app.domain.models import User
 
+from datetime import datetime, timezone
 import logging
 
 logger = logging.getLogger(__name__)
@@ -32,12 +42,12 @@ router = APIRouter(prefix="/api/auth", tags=["authentication"])
 # REGISTER & LOGIN
 # ============================================================================
 @router.post("/register", status_code=201)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     try:
-        service = AuthService(db)
-        new_user = service.register_user(user)
+        service = AsyncAuthService(db)
+        new_user = await service.register_user(user)
         
-        return {
+        return json_response({
             "status": "success",
             "code": 201,
             "message": "User berhasil terdaftar. Menunggu verifikasi administrator.",
@@ -57,7 +67,7 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
                 "created_at": new_user.created_at,
                 "updated_at": new_user.updated_at
             }
-        }
+        }, status_code=status.HTTP_201_CREATED)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -68,17 +78,17 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
 @router.post("/set-password", response_model=SetPasswordResponse)
-def set_password(
+async def set_password(
     payload: SetPasswordRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        service = AuthService(db)
-        service.set_password_from_token(payload)
-        return SetPasswordResponse(
+        service = AsyncAuthService(db)
+        await service.set_password_from_token(payload)
+        return json_response(SetPasswordResponse(
             status=status.HTTP_200_OK,
             message="Password berhasil dibuat! Silakan login dengan username dan password Anda."
-        )
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -90,24 +100,24 @@ def set_password(
 
 
 @router.post("/login")
-def login(
+async def login(
     request: Request,
     login_data: UserLogin,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Login user dan dapatkan access token"""
     try:
-        service = AuthService(db)
-        result = service.authenticate_user(login_data)
-        return success_response(
+        service = AsyncAuthService(db)
+        result = await service.authenticate_user(login_data)
+        return json_response(success_response(
             data={
                 "access_token": result["access_token"],
                 "token_type": "bearer",
                 "expires_in": result["expires_in"],
-                "user": UserResponse.from_orm(result["user"])
+                "user": UserResponse.model_validate(result["user"])
             },
             message="Login berhasil"
-        )
+        ))
     except HTTPException as e:
         raise HTTPException(status_code=e.status_code, detail=error_response(e.detail, e.status_code))
     except Exception as e:
@@ -119,18 +129,18 @@ def login(
 
 
 @router.post("/logout", response_model=LogoutResponse)
-def logout(
-    db: Session = Depends(get_db),
+async def logout(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Logout user"""
     try:
-        service = AuthService(db)
-        service.logout_user(current_user)
-        return LogoutResponse(
+        service = AsyncAuthService(db)
+        await service.logout_user(current_user)
+        return json_response(LogoutResponse(
             status=status.HTTP_200_OK,
             message="Logout berhasil"
-        )
+        ))
     except Exception as e:
         logger.error(f"Logout error: {str(e)}")
         raise HTTPException(
@@ -143,28 +153,28 @@ def logout(
 # ============================================================================
 # USER INFO & PROFILE
 # ============================================================================
-@router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_active_user)):
+@router.get("/me", response_model=ResponseModel[UserResponse])
+async def get_current_user_info(current_user: User = Depends(get_current_user_entity)):
     """Dapatkan informasi user saat ini"""
-    return success_response(
-        data=UserResponse.from_orm(current_user),
+    return json_response(success_response(
+        data=UserResponse.model_validate(current_user),
         message="Data user berhasil diambil"
-    )
+    ))
 
 
-@router.patch("/me/profile", response_model=UserResponse)
-def update_profile(
+@router.patch("/me/profile", response_model=ResponseModel[UserResponse])
+async def update_profile(
     payload: ProfileUpdateRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_entity)
 ):
     try:
-        service = AuthService(db)
-        updated_user = service.update_user_profile(current_user, payload)
-        return success_response(
-            data=UserResponse.from_orm(updated_user),
+        service = AsyncAuthService(db)
+        updated_user = await service.update_user_profile(current_user, payload)
+        return json_response(success_response(
+            data=UserResponse.model_validate(updated_user),
             message="Profile berhasil diperbarui"
-        )
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -175,12 +185,19 @@ def update_profile(
         )
 
 @router.get("/users")
-def get_all_users(
+async def get_all_users(
     limit: int = Query(50, ge=1, le=100, description="Jumlah data per halaman"),
-    page: int = Query(1, ge=1, description="Nomor halaman"),
+    page: int = Query(1, ge=1, description="Nomor halaman (diabaikan jika cursor diisi)"),
+    cursor: Optional[str] = Query(None, description="Cursor dari next_cursor halaman sebelumnya"),
+    count: Optional[Literal["exact", "approx", "none"]] = Query(
+        None, description="Mode total: exact, approx (estimasi planner), none. Default exact tanpa cursor, none dengan cursor"
+    ),
     search: str = Query(None, description="Cari berdasarkan nama, username, email, NIP, jabatan, atau instansi"),
+    sort: Optional[Literal["relevance", "newest"]] = Query(
+        None, description="Urutan hasil: relevance (similarity pencarian) atau newest. Default relevance jika ada search"
+    ),
     role: str = Query(None, description="Filter berdasarkan role (Super Admin, Eksekutif)"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
 
@@ -192,37 +209,242 @@ def get_all_users(
             )
         
         calculated_offset = (page - 1) * limit
+        count_mode = count or ("none" if cursor else "exact")
         
-        service = AuthService(db)
-        users, total = service.get_all_users(
-            limit=limit,
-            page=calculated_offset,
-            search=search,
-            role_filter=role
-        )
+        rank_by_relevance = (sort or "relevance") == "relevance"
+
+        async def load_page():
+            service = AsyncAuthService(db)
+            users, total, next_cursor = await service.get_all_users(
+                limit=limit,
+                page=calculated_offset,
+                search=search,
+                role_filter=role,
+                cursor=cursor,
+                count_mode=count_mode,
+                rank_by_relevance=rank_by_relevance
+            )
+
+            return UserListResponse(
+                status=status.HTTP_200_OK,
+                message="Daftar user berhasil diambil",
+                data=users,
+                total=total,
+                count_mode=count_mode,
+                next_cursor=next_cursor,
+                page=page,
+                limit=limit
+            ).model_dump(mode="json")
+
+        content = await cached_query_async(
+            "users:list",
+            ["users"],
+            normalize_query_params(
+                search=search,
+                sort="relevance" if rank_by_relevance and search else "created_at,desc",
+                filters={User.role_name: role},
+                page=None if cursor else page,
+                limit=limit,
+                cursor=cursor,
+                count=count_mode
+            ),
+            load_page
+        )
+        return json_response(content)
         
-        return UserListResponse(
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Get all users error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=error_response("Internal server error", 500)
+        )
+
+@router.get("/users/export")
+async def export_users(
+    format: Literal["csv", "xlsx"] = Query("csv", description="Format file export"),
+    search: str = Query(None, description="Cari berdasarkan nama, username, email, NIP, jabatan, atau instansi"),
+    role: str = Query(None, description="Filter berdasarkan role (Super Admin, Eksekutif)"),
+    current_user: User = Depends(get_current_active_user)
+):
+    if current_user.role_name != "Super Admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Hanya administrator yang dapat mengakses resource ini"
+        )
+
+    async def batches():
+        # Session sendiri: dependency get_async_db sudah ditutup sebelum body response dikirim
+        async with get_async_session_factory()() as db:
+            async for batch in AsyncAuthService(db).stream_users_for_export(search, role):
+                yield batch
+
+    filename = f"users_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    if format == "xlsx":
+        return StreamingResponse(
+            stream_xlsx(AsyncAuthService.EXPORT_COLUMNS, batches(), sheet_title="Users"),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers=headers
+        )
+
+    return StreamingResponse(
+        stream_csv(AsyncAuthService.EXPORT_COLUMNS, batches()),
+        media_type="text/csv; charset=utf-8",
+        headers=headers
+    )
+
+
+@router.post("/users/import", response_model=UserImportResponse)
+async def import_users(
+    file: UploadFile = File(..., description="File XLSX dengan header NIP, Username, Email, Nama Lengkap, Jabatan, Instansi, No. Telepon, Role; user mengatur password lewat email set password"),
+    dry_run: bool = Query(False, description="Hanya validasi, tidak membuat user"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    try:
+        if not (file.filename or "").lower().endswith(".xlsx"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File harus berformat .xlsx"
+            )
+
+        content = await file.read(settings.USER_IMPORT_MAX_FILE_BYTES + 1)
+        if len(content) > settings.USER_IMPORT_MAX_FILE_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Ukuran file melebihi batas"
+            )
+
+        service = AsyncAuthService(db)
+        report = await service.import_users_from_xlsx(current_user, content, dry_run=dry_run)
+
+        if dry_run:
+            message = "Validasi file import selesai"
+        else:
+            message = f"{report['created']} user berhasil dibuat"
+
+        return json_response(UserImportResponse(
             status=status.HTTP_200_OK,
-            message="Daftar user berhasil diambil",
-            data=[UserResponse.from_orm(user) for user in users],
-            total=total,
-            page=page,
-            limit=limit
+            message=message,
+            **report
+        ))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Import users error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=error_response("Internal server error", 500)
         )
-        
+
+
+@router.post("/users/bulk-verify", response_model=BulkActionResponse)
+async def bulk_verify_users(
+    payload: BulkVerificationRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Verifikasi banyak user pending sekaligus - approve atau reject"""
+    try:
+        if current_user.role_name != "Super Admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Hanya administrator yang dapat memverifikasi user"
+            )
+
+        service = AsyncAuthService(db)
+        processed_ids, skipped = await service.bulk_verify_users(
+            current_user, payload.user_ids, payload
+        )
+
+        return json_response(BulkActionResponse(
+            status=status.HTTP_200_OK,
+            message=f"{len(processed_ids)} user berhasil di-{payload.status}",
+            processed=len(processed_ids),
+            user_ids=processed_ids,
+            skipped=skipped
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
-        logger.error(f"Get all users error: {str(e)}")
+        logger.error(f"Bulk verify user error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=error_response("Gagal memverifikasi user", 500)
+        )
+
+
+@router.patch("/users/bulk-toggle-active", response_model=BulkActionResponse)
+async def bulk_toggle_user_active(
+    payload: BulkToggleUserActiveRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    try:
+        service = AsyncAuthService(db)
+        processed_ids, skipped = await service.bulk_toggle_user_active(
+            current_user, payload.user_ids, payload.is_active
+        )
+
+        action = "diaktifkan" if payload.is_active else "dinonaktifkan"
+        return json_response(BulkActionResponse(
+            status=status.HTTP_200_OK,
+            message=f"{len(processed_ids)} user berhasil {action}",
+            processed=len(processed_ids),
+            user_ids=processed_ids,
+            skipped=skipped
+        ))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Bulk toggle user active error: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=error_response("Internal server error", 500)
         )
 
+
+@router.get("/users/pending", response_model=PendingUsersListResponse)
+async def get_pending_users(
+    limit: int = Query(50, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+
+    try:
+        if current_user.role_name != "Super Admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Hanya administrator yang dapat mengakses resource ini"
+            )
+
+        service = AsyncAuthService(db)
+        users, total = await service.get_pending_users_for_verification(limit, offset)
+
+        return json_response(PendingUsersListResponse(
+            status=status.HTTP_200_OK,
+            message="Daftar user pending berhasil diambil",
+            data=users,
+            total=total
+        ))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Get pending users error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=error_response("Internal server error", 500)
+        )
+
+
 @router.get("/users/{user_id}")
-def get_user_detail(
+async def get_user_detail(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
 
@@ -233,14 +455,14 @@ def get_user_detail(
                 detail="Hanya administrator yang dapat mengakses resource ini"
             )
         
-        service = AuthService(db)
-        user = service.get_user_by_id(user_id)
+        service = AsyncAuthService(db)
+        user = await service.get_user_by_id(user_id)
             
-        return UserDetailResponse(
+        return json_response(UserDetailResponse(
             status=status.HTTP_200_OK,
             message="Detail user berhasil diambil",
-            data=UserResponse.from_orm(user)
-        )
+            data=UserResponse.model_validate(user)
+        ))
         
     except HTTPException as e:
         raise e
@@ -252,23 +474,23 @@ def get_user_detail(
         )
 
 @router.patch("/users/{user_id}/toggle-active", response_model=ToggleUserActiveResponse)
-def toggle_user_active(
+async def toggle_user_active(
     user_id: int,
     payload: ToggleUserActiveRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
 
     try:
-        service = AuthService(db)
-        updated_user = service.toggle_user_active(current_user, user_id, payload.is_active)
+        service = AsyncAuthService(db)
+        updated_user = await service.toggle_user_active(current_user, user_id, payload.is_active)
         
         action = "diaktifkan" if payload.is_active else "dinonaktifkan"
-        return ToggleUserActiveResponse(
+        return json_response(ToggleUserActiveResponse(
             status=status.HTTP_200_OK,
             message=f"User berhasil {action}",
-            data=UserResponse.from_orm(updated_user)
-        )
+            data=UserResponse.model_validate(updated_user)
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -280,20 +502,20 @@ def toggle_user_active(
 
 
 @router.post("/users", response_model=AdminUserCreateResponse, status_code=201)
-def create_user_by_admin(
+async def create_user_by_admin(
     user_data: AdminUserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     try:
-        service = AuthService(db)
-        new_user = service.create_user_by_admin(current_user, user_data)
+        service = AsyncAuthService(db)
+        new_user = await service.create_user_by_admin(current_user, user_data)
         
-        return AdminUserCreateResponse(
+        return json_response(AdminUserCreateResponse(
             status=status.HTTP_201_CREATED,
             message="User berhasil dibuat",
-            data=UserResponse.from_orm(new_user)
-        )
+            data=UserResponse.model_validate(new_user)
+        ), status_code=status.HTTP_201_CREATED)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -305,22 +527,22 @@ def create_user_by_admin(
 
 
 @router.put("/users/{user_id}", response_model=AdminUserUpdateResponse)
-def update_user_by_admin(
+async def update_user_by_admin(
     user_id: int,
     update_data: AdminUserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
 
     try:
-        service = AuthService(db)
-        updated_user = service.update_user_by_admin(current_user, user_id, update_data)
+        service = AsyncAuthService(db)
+        updated_user = await service.update_user_by_admin(current_user, user_id, update_data)
         
-        return AdminUserUpdateResponse(
+        return json_response(AdminUserUpdateResponse(
             status=status.HTTP_200_OK,
             message="User berhasil diupdate",
-            data=UserResponse.from_orm(updated_user)
-        )
+            data=UserResponse.model_validate(updated_user)
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -333,18 +555,18 @@ def update_user_by_admin(
 # PASSWORD MANAGEMENT
 # ============================================================================
 @router.post("/me/change-password", response_model=ChangePasswordResponse)
-def change_password(
+async def change_password(
     payload: ChangePasswordRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_entity)
 ):
     try:
-        service = AuthService(db)
-        service.change_user_password(current_user, payload)
-        return ChangePasswordResponse(
+        service = AsyncAuthService(db)
+        await service.change_user_password(current_user, payload)
+        return json_response(ChangePasswordResponse(
             status=status.HTTP_200_OK,
             message="Password berhasil diperbarui"
-        )
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -356,18 +578,18 @@ def change_password(
 
 
 @router.post("/forgot-password", response_model=ForgotPasswordResponse)
-def forgot_password(
+async def forgot_password(
     payload: ForgotPasswordRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        service = AuthService(db)
-        is_admin = service.request_password_reset(payload)
-        return ForgotPasswordResponse(
+        service = AsyncAuthService(db)
+        is_admin = await service.request_password_reset(payload)
+        return json_response(ForgotPasswordResponse(
             status=status.HTTP_200_OK,
             message="Jika email terdaftar, link reset password akan dikirim dalam beberapa menit.",
             is_admin=is_admin
-        )
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -379,17 +601,17 @@ def forgot_password(
 
 
 @router.post("/reset-password", response_model=ResetPasswordResponse)
-def reset_password_endpoint(
+async def reset_password_endpoint(
     payload: ResetPasswordRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        service = AuthService(db)
-        service.reset_password(payload)
-        return ResetPasswordResponse(
+        service = AsyncAuthService(db)
+        await service.reset_password(payload)
+        return json_response(ResetPasswordResponse(
             status=status.HTTP_200_OK,
             message="Password berhasil direset. Silakan login dengan password baru Anda."
-        )
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -403,20 +625,20 @@ def reset_password_endpoint(
 # ============================================================================
 # ROLE MANAGEMENT
 # ============================================================================
-@router.patch("/users/{user_id}/role", response_model=UserResponse)
-def update_user_role(
+@router.patch("/users/{user_id}/role", response_model=ResponseModel[UserResponse])
+async def update_user_role(
     user_id: int,
     payload: RoleChangeRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     try:
-        service = AuthService(db)
-        updated_user = service.change_user_role(current_user, user_id, payload.role_name)
-        return success_response(
-            data=UserResponse.from_orm(updated_user),
+        service = AsyncAuthService(db)
+        updated_user = await service.change_user_role(current_user, user_id, payload.role_name)
+        return json_response(success_response(
+            data=UserResponse.model_validate(updated_user),
             message="Role user berhasil diperbarui"
-        )
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -428,8 +650,8 @@ def update_user_role(
 
 
 @router.get("/roles", response_model=RoleListResponse)
-def get_roles(
-    db: Session = Depends(get_db),
+async def get_roles(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """List semua role - Super Admin only"""
@@ -440,13 +662,13 @@ def get_roles(
                 detail="Hanya administrator yang dapat mengakses resource ini"
             )
 
-        service = AuthService(db)
-        roles = service.list_roles()
-        return RoleListResponse(
+        service = AsyncAuthService(db)
+        roles = await service.list_roles()
+        return json_response(RoleListResponse(
             status=status.HTTP_200_OK,
             message="Daftar role berhasil diambil",
             data=roles
-        )
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -460,46 +682,11 @@ def get_roles(
 # ============================================================================
 # VERIFICATION ENDPOINTS
 # ============================================================================
-@router.get("/users/pending", response_model=PendingUsersListResponse)
-def get_pending_users(
-    limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-
-    try:
-        if current_user.role_name != "Super Admin":
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Hanya administrator yang dapat mengakses resource ini"
-            )
-
-        service = AuthService(db)
-        users, total = service.get_pending_users_for_verification(limit, offset)
-
-        from app.api.schemas.auth_schema import PendingUserResponse
-        return PendingUsersListResponse(
-            status=status.HTTP_200_OK,
-            message="Daftar user pending berhasil diambil",
-            data=[PendingUserResponse.from_orm(user) for user in users],
-            total=total
-        )
-    except HTTPException as e:
-        raise e
-    except Exception as e:
-        logger.error(f"Get pending users error: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=error_response("Internal server error", 500)
-        )
-
-
 @router.post("/users/{user_id}/verify", response_model=VerificationResponse)
-def verify_user(
+async def verify_user(
     user_id: int,
     payload: VerificationRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Verifikasi user - approve atau reject"""
@@ -510,14 +697,14 @@ def verify_user(
                 detail="Hanya administrator yang dapat memverifikasi user"
             )
         
-        service = AuthService(db)
-        verified_user = service.verify_user(current_user, user_id, payload)
+        service = AsyncAuthService(db)
+        verified_user = await service.verify_user(current_user, user_id, payload)
 
-        return VerificationResponse(
+        return json_response(VerificationResponse(
             status=status.HTTP_200_OK,
             message=f"User berhasil di-{payload.status}",
-            data=UserResponse.from_orm(verified_user)
-        )
+            data=UserResponse.model_validate(verified_user)
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -531,18 +718,20 @@ def verify_user(
 # TOKEN VALIDATION
 # ============================================================================
 @router.get("/validate-token")
-def validate_token(current_user: User = Depends(get_current_active_user)):
+async def validate_token(current_user: User = Depends(get_current_active_user)):
     """Validasi token aktif"""
     try:
-        return success_response(
+        return json_response(success_response(
             data={
                 "is_valid": True,
                 "username": current_user.username,
                 "role_name": current_user.role_name,
-                "last_activity": current_user.last_activity
+                "last_activity": await run_in_threadpool(
+                    activity_tracker.get_last_activity, current_user.id, current_user.last_activity
+                )
             },
             message="Token masih aktif dan valid"
-        )
+        ))
     except Exception as e:
         logger.error(f"Validate token error: {str(e)}")
         raise HTTPException(
@@ -52,6 +52,9 @@ class UserListResponse(BaseModel):
     data: List[UserResponse]
     page: int
     limit: int
+    total: Optional[int] = None
+    count_mode: str = "exact"
+    next_cursor: Optional[str] = None
 
 class UserDetailResponse(BaseModel):
     status: int
@@ -68,7 +71,7 @@ class ToggleUserActiveResponse(BaseModel):
     data: UserResponse
 
 
-class AdminUserCreate(BaseModel):
+class AdminUserBase(BaseModel):
     nip: str = Field(min_length=5, max_length=50)
     username: str = Field(min_length=3, max_length=100)
     email: EmailStr
@@ -77,7 +80,6 @@ class AdminUserCreate(BaseModel):
     organization: str = Field(min_length=2, max_length=255)
     no_telepon: str = Field(min_length=10, max_length=20)
     role_name: str = Field(description="Role user (Super Admin, Eksekutif)")
-    password: str = Field(min_length=8, max_length=20)
     
     @validator('nip')
     def validate_nip(cls, v):
@@ -98,6 +100,21 @@ class AdminUserCreate(BaseModel):
             raise ValueError('Format nomor telepon tidak valid (contoh: 081234567890)')
         return cleaned
 
+    @validator('role_name')
+    def validate_role(cls, v):
+        allowed_roles = ["Super Admin", "Eksekutif"]
+        if v not in allowed_roles:
+            raise ValueError(f'Role harus salah satu dari: {", ".join(allowed_roles)}')
+        return v
+
+
+class AdminUserImportRow(AdminUserBase):
+    """Baris file import user: tanpa password, user mengatur sendiri lewat link set password"""
+
+
+class AdminUserCreate(AdminUserBase):
+    password: str = Field(min_length=8, max_length=20)
+
     @validator('password')
     def validate_password_strength(cls, v):
         if len(v) < 8 or len(v) > 20:
@@ -112,13 +129,6 @@ class AdminUserCreate(BaseModel):
             raise ValueError('Password harus mengandung minimal 1 karakter khusus (#, ?, !, /, @, &)')
         return v
 
-    @validator('role_name')
-    def validate_role(cls, v):
-        allowed_roles = ["Super Admin", "Eksekutif"]
-        if v not in allowed_roles:
-            raise ValueError(f'Role harus salah satu dari: {", ".join(allowed_roles)}')
-        return v
-
 
 class AdminUserUpdate(BaseModel):
     nip: Optional[str] = Field(None, min_length=5, max_length=50)
@@ -166,6 +176,26 @@ class AdminUserCreateResponse(BaseModel):
     data: UserResponse
 
 
+class UserImportRowResult(BaseModel):
+    row: int
+    status: str  # created, valid (dry run), failed
+    nip: Optional[str] = None
+    username: Optional[str] = None
+    email: Optional[str] = None
+    user_id: Optional[int] = None
+    errors: List[str] = []
+
+
+class UserImportResponse(BaseModel):
+    status: int
+    message: str
+    dry_run: bool
+    total_rows: int
+    created: int
+    failed: int
+    rows: List[UserImportRowResult]
+
+
 class AdminUserUpdateResponse(BaseModel):
     status: int
     message: str
@@ -270,6 +300,27 @@ class VerificationResponse(BaseModel):
     message: str
     data: Optional['UserResponse'] = None
 
+class BulkVerificationRequest(BaseModel):
+    """Schema untuk admin verifikasi banyak user sekaligus"""
+    user_ids: List[int] = Field(min_length=1, max_length=500)
+    status: str = Field(pattern="^(approve|reject)$")
+    notes: Optional[str] = None
+
+class BulkToggleUserActiveRequest(BaseModel):
+    user_ids: List[int] = Field(min_length=1, max_length=500)
+    is_active: bool = Field(description="Set true untuk aktifkan, false untuk nonaktifkan")
+
+class BulkSkippedUser(BaseModel):
+    user_id: int
+    reason: str
+
+class BulkActionResponse(BaseModel):
+    status: int
+    message: str
+    processed: int
+    user_ids: List[int]
+    skipped: List[BulkSkippedUser] = []
+
 class PendingUserResponse(BaseModel):
     """Schema untuk list user pending"""
     id: int
@@ -0,0 +1,17 @@
+import logging
+from app.database import Base, get_engine
+
+logger = logging.getLogger(__name__)
+
+
+def create_schema():
+    """Buat tabel yang belum ada. Dijalankan saat deploy, bukan di jalur request."""
+    import app.domain.models  # noqa: F401 - registrasi model ke Base.metadata
+
+    Base.metadata.create_all(bind=get_engine())
+    logger.info("Schema database siap")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    create_schema()
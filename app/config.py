@@ -1,6 +1,6 @@
 import os
+from functools import cached_property
 from dotenv import load_dotenv
-from redis import Redis
 from pathlib import Path
 
 load_dotenv()
@@ -13,6 +13,13 @@ class Settings:
     DB_NAME: str = os.getenv("DB_NAME", "monitoring_jalan")
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 
+    # Connection pool (berlaku untuk engine sync dan async, masing-masing)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "0"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "300"))
+    DB_POOL_SATURATION_WARN: float = float(os.getenv("DB_POOL_SATURATION_WARN", "0.8"))
+
     #set session
     # ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
     JABAR_SESSION_EXPIRE_DAYS: int = int(os.getenv("JABAR_SESSION_EXPIRE_DAYS", "30"))
@@ -29,12 +36,81 @@ class Settings:
 
     # REDIS Settings
     REDIS_PORT: str = os.getenv("REDIS_PORT", "6390")
-    REDIS = Redis(
-            host=REDIS_HOST,
-            port=int(REDIS_PORT),
-            decode_responses=True
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "1"))
+
+    @cached_property
+    def REDIS(self):
+        # Client dibuat saat pertama dipakai, bukan saat modul config di-import
+        from redis import Redis
+        return Redis(
+            host=self.REDIS_HOST,
+            port=int(self.REDIS_PORT),
+            decode_responses=True,
+            socket_connect_timeout=self.REDIS_SOCKET_TIMEOUT,
+            socket_timeout=self.REDIS_SOCKET_TIMEOUT
         )
 
+    # Principal cache (snapshot user untuk get_current_user)
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+
+    # Cache hasil list query (halaman ter-serialize di Redis)
+    QUERY_CACHE_TTL_SECONDS: int = int(os.getenv("QUERY_CACHE_TTL_SECONDS", "60"))
+
+    # Import user massal dari XLSX
+    USER_IMPORT_MAX_ROWS: int = int(os.getenv("USER_IMPORT_MAX_ROWS", "1000"))
+    USER_IMPORT_MAX_FILE_BYTES: int = int(os.getenv("USER_IMPORT_MAX_FILE_BYTES", str(5 * 1024 * 1024)))
+    USER_IMPORT_BATCH_SIZE: int = int(os.getenv("USER_IMPORT_BATCH_SIZE", "200"))
+
+    # Cache payload JWT yang sudah diverifikasi
+    JWT_CACHE_MAX_SIZE: int = int(os.getenv("JWT_CACHE_MAX_SIZE", "1024"))
+
+    # Bootstrap aplikasi
+    # Di serverless (Vercel/Lambda) create_all tidak dijalankan saat cold start;
+    # jalankan `python -m app.bootstrap` saat deploy.
+    IS_SERVERLESS: bool = bool(os.getenv("VERCEL") or os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+    CREATE_SCHEMA_ON_STARTUP: bool = os.getenv(
+        "CREATE_SCHEMA_ON_STARTUP", "False" if IS_SERVERLESS else "True"
+    ).lower() == "true"
+    # Baseline handler:import di benchmarks/baselines/cold_start.json (~1000 ms terbaik,
+    # ~1400 ms median)
+    # ditambah ruang untuk CPU serverless yang lebih lambat
+    COLD_START_BUDGET_MS: int = int(os.getenv("COLD_START_BUDGET_MS", "2000"))
+
+    # Write-behind last_activity
+    ACTIVITY_FLUSH_INTERVAL_SECONDS: int = int(os.getenv("ACTIVITY_FLUSH_INTERVAL_SECONDS", "5"))
+    # Sesi sliding-window di Redis: satu key per (user, token_version) dengan TTL
+    # SESSION_EXPIRE_MINUTES; sesi idle berakhir saat key kadaluarsa
+    SESSION_STORE_REDIS: bool = os.getenv("SESSION_STORE_REDIS", "True").lower() == "true"
+
+    # Pool bcrypt
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+    PASSWORD_HASH_TIMEOUT_SECONDS: float = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "10"))
+
+    # Outbox email: dikirim worker terpisah (python -m app.email_worker).
+    # Di luar serverless worker juga berjalan di dalam proses API.
+    EMAIL_OUTBOX_INPROCESS_WORKER: bool = os.getenv(
+        "EMAIL_OUTBOX_INPROCESS_WORKER", "False" if IS_SERVERLESS else "True"
+    ).lower() == "true"
+    EMAIL_OUTBOX_POLL_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "2"))
+    EMAIL_OUTBOX_BATCH_SIZE: int = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+    EMAIL_OUTBOX_BACKOFF_BASE_SECONDS: int = int(os.getenv("EMAIL_OUTBOX_BACKOFF_BASE_SECONDS", "30"))
+    EMAIL_OUTBOX_BACKOFF_MAX_SECONDS: int = int(os.getenv("EMAIL_OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+    EMAIL_OUTBOX_LEASE_SECONDS: int = int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "300"))
+    # Baris sent/dead dihapus setelah retensi ini (ikut jadwal purge token)
+    EMAIL_OUTBOX_RETENTION_HOURS: int = int(os.getenv("EMAIL_OUTBOX_RETENTION_HOURS", "168"))
+
+    # Token reset/set password: purge baris kadaluarsa/terpakai (python -m app.token_purge)
+    # dan penyimpanan token aktif di Redis dengan TTL sampai expires_at
+    TOKEN_PURGE_INPROCESS: bool = os.getenv(
+        "TOKEN_PURGE_INPROCESS", "False" if IS_SERVERLESS else "True"
+    ).lower() == "true"
+    TOKEN_PURGE_INTERVAL_SECONDS: int = int(os.getenv("TOKEN_PURGE_INTERVAL_SECONDS", "3600"))
+    TOKEN_PURGE_RETENTION_HOURS: int = int(os.getenv("TOKEN_PURGE_RETENTION_HOURS", "24"))
+    TOKEN_PURGE_BATCH_SIZE: int = int(os.getenv("TOKEN_PURGE_BATCH_SIZE", "1000"))
+    TOKEN_STORE_REDIS: bool = os.getenv("TOKEN_STORE_REDIS", "False").lower() == "true"
+
     # SMTP Resend Configuration
     MAIL_MAILER: str = os.getenv("MAIL_MAILER", "smtp")
     MAIL_HOST: str = os.getenv("MAIL_HOST", "smtp.resend.com")
@@ -43,6 +119,14 @@ class Settings:
     MAIL_PASSWORD: str = os.getenv("MAIL_PASSWORD", "")  # API Key Resend
     MAIL_FROM_ADDRESS: str = os.getenv("MAIL_FROM_ADDRESS", "info@ekosistemdata.dev")
     MAIL_FROM_NAME: str = os.getenv("MAIL_FROM_NAME", "Monitoring Jalan")
+    MAIL_USE_SSL: bool = os.getenv("MAIL_USE_SSL", "True").lower() == "true"
+    MAIL_TIMEOUT_SECONDS: float = float(os.getenv("MAIL_TIMEOUT_SECONDS", "30"))
+
+    # Pool koneksi SMTP (sesi yang sudah login dipakai ulang)
+    MAIL_POOL_SIZE: int = int(os.getenv("MAIL_POOL_SIZE", "2"))
+    MAIL_POOL_MAX_IDLE_SECONDS: float = float(os.getenv("MAIL_POOL_MAX_IDLE_SECONDS", "60"))
+    MAIL_POOL_NOOP_AFTER_SECONDS: float = float(os.getenv("MAIL_POOL_NOOP_AFTER_SECONDS", "5"))
+    MAIL_POOL_MAX_MESSAGES: int = int(os.getenv("MAIL_POOL_MAX_MESSAGES", "100"))
     
 
     ADMIN_NOTIFICATION_EMAIL: str = os.getenv("ADMIN_NOTIFICATION_EMAIL", "ekosistemdatajabar@digitalservice.id")
@@ -1,15 +1,26 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.utils.pool_metrics_util import (
+    InstrumentedAsyncAdaptedQueuePool,
+    InstrumentedQueuePool,
+    instrument_engine,
+)
+import app.utils.query_cache_util  # noqa: F401 - listener invalidasi query cache
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 def get_database_url():
 
     
     database_url = os.getenv("DATABASE_URL")
     if database_url:
-        print("Using DATABASE_URL from environment (Supabase)")
+        logger.info("Using DATABASE_URL from environment (Supabase)")
         # Pastikan ada SSL mode
         if "sslmode" not in database_url:
             database_url += "?sslmode=require"
@@ -23,28 +34,109 @@ def get_database_url():
     
     return f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-SQLALCHEMY_DATABASE_URL = get_database_url()
+def get_async_database_url(database_url: str) -> str:
+    # asyncpg tidak mengenal parameter libpq seperti sslmode, SSL diatur lewat connect_args
+    url = make_url(database_url)
+    query = {key: value for key, value in url.query.items() if key != "sslmode"}
+    url = url.set(drivername="postgresql+asyncpg", query=query)
+    return url.render_as_string(hide_password=False)
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=0,
-    pool_recycle=300,
-    echo=False,
-    connect_args={
-        "sslmode": "require"
-    } if "supabase" in SQLALCHEMY_DATABASE_URL else {}
-)
+SQLALCHEMY_DATABASE_URL = get_database_url()
+ASYNC_SQLALCHEMY_DATABASE_URL = get_async_database_url(SQLALCHEMY_DATABASE_URL)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Engine dan session factory dibuat saat pertama dipakai agar import modul
+# (cold start serverless) tidak ikut membayar inisialisasi driver dan pool.
+_engine = None
+_async_engine = None
+_session_factory = None
+_async_session_factory = None
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_engine(
+            SQLALCHEMY_DATABASE_URL,
+            poolclass=InstrumentedQueuePool,
+            pool_pre_ping=True,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            echo=False,
+            connect_args={
+                "sslmode": "require"
+            } if "supabase" in SQLALCHEMY_DATABASE_URL else {}
+        )
+        instrument_engine(_engine, "sync")
+    return _engine
+
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            ASYNC_SQLALCHEMY_DATABASE_URL,
+            poolclass=InstrumentedAsyncAdaptedQueuePool,
+            pool_pre_ping=True,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            echo=False,
+            connect_args={
+                "ssl": "require",
+                # Pooler Supabase (pgbouncer mode transaction) tidak mendukung prepared statement cache
+                "statement_cache_size": 0
+            } if "supabase" in ASYNC_SQLALCHEMY_DATABASE_URL else {}
+        )
+        instrument_engine(_async_engine.sync_engine, "async")
+    return _async_engine
+
+
+def get_session_factory():
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    return _session_factory
+
+
+def get_async_session_factory():
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(
+            bind=get_async_engine(),
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False
+        )
+    return _async_session_factory
+
+
+_LAZY_ATTRIBUTES = {
+    "engine": get_engine,
+    "async_engine": get_async_engine,
+    "SessionLocal": get_session_factory,
+    "AsyncSessionLocal": get_async_session_factory,
+}
+
+
+def __getattr__(name):
+    # Kompatibilitas untuk `from app.database import engine, SessionLocal`
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def get_db():
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
     finally:
         db.close()
 
-        
\ No newline at end of file
+async def get_async_db():
+    async with get_async_session_factory()() as db:
+        yield db
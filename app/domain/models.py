@@ -1,13 +1,24 @@
 from sqlalchemy import DECIMAL, JSON, TIMESTAMP, BigInteger, Column, Integer, String
-from sqlalchemy import Float, Text, DateTime, Boolean, ForeignKey, Numeric, Date, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Float, Text, DateTime, Boolean, ForeignKey, Numeric, Date, ForeignKey, Index
+from sqlalchemy import DDL, Computed, event, text
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
-from geoalchemy2 import Geometry
 from app.database import Base
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Urutan keyset pagination daftar user: (created_at, id) DESC
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # Pencarian substring (LIKE '%term%') dan ranking similarity via pg_trgm
+        Index(
+            "ix_users_search_text_trgm",
+            "search_text",
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"}
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nip = Column(String(50), unique=True, nullable=False, index=True)
@@ -33,16 +44,33 @@ class User(Base):
     token_version = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Hanya dipakai di WHERE/ORDER BY pencarian, tidak ikut dimuat ke entity
+    search_text = deferred(Column(
+        Text,
+        Computed(
+            "lower("
+            "coalesce(full_name, '') || ' ' || coalesce(username, '') || ' ' || "
+            "coalesce(email, '') || ' ' || coalesce(nip, '') || ' ' || "
+            "coalesce(jabatan, '') || ' ' || coalesce(organization, '')"
+            ")",
+            persisted=True
+        )
+    ))
 
     role = relationship("Role", back_populates="users")
     verified_by_user = relationship("User", remote_side=[id], foreign_keys=[verified_by])
-    activity_logs = relationship("ActivityLog", back_populates="user")
     password_reset_tokens = relationship(
         "PasswordResetToken",
         back_populates="user",
         cascade="all, delete-orphan"
     )
 
+event.listen(
+    User.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
 class Role(Base):
     __tablename__ = "roles"
 
@@ -56,6 +84,13 @@ class Role(Base):
 
 class PasswordResetToken(Base):
     __tablename__ = "password_reset_token"
+    __table_args__ = (
+        # Token aktif per user: UPDATE ... WHERE user_id AND used_at IS NULL saat request reset
+        Index("ix_password_reset_token_live_user", "user_id", postgresql_where=text("used_at IS NULL")),
+        # Purge: used_at < cutoff OR expires_at < cutoff (BitmapOr kedua index)
+        Index("ix_password_reset_token_used_at", "used_at", postgresql_where=text("used_at IS NOT NULL")),
+        Index("ix_password_reset_token_expires_at", "expires_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -66,3 +101,33 @@ class PasswordResetToken(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="password_reset_tokens")
+
+
+class EmailOutbox(Base):
+    """Email transaksional yang menunggu dikirim worker (app.email_worker).
+
+    Baris ditulis dalam transaksi yang sama dengan perubahan data bisnisnya,
+    sehingga email hanya terkirim jika commit berhasil.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # Antrian worker: hanya baris yang belum selesai
+        Index(
+            "ix_email_outbox_due",
+            "next_attempt_at",
+            postgresql_where=text("status IN ('pending', 'sending')")
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    template = Column(String(100), nullable=False)
+    to_email = Column(String(255), nullable=False)
+    payload = Column(JSON, nullable=True)
+    status = Column(String(20), nullable=False, default="pending", server_default="pending", index=True)  # pending, sending, sent, dead
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
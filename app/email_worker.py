@@ -0,0 +1,42 @@
+import argparse
+import logging
+import time
+from app.config import settings
+from app.utils.email_outbox_util import email_outbox
+from app.utils.smtp_pool_util import smtp_pool
+
+logger = logging.getLogger(__name__)
+
+
+def run(poll_seconds: float, once: bool = False):
+    """Kirim email dari outbox sampai antrian kosong (once) atau terus-menerus."""
+    logger.info("Email worker berjalan")
+    while True:
+        claimed = email_outbox.dispatch()
+        if claimed:
+            continue
+        if once:
+            return
+        time.sleep(poll_seconds)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Worker pengirim email dari tabel email_outbox")
+    parser.add_argument("--once", action="store_true", help="Kirim semua email yang jatuh tempo lalu berhenti")
+    parser.add_argument("--poll", type=float, default=settings.EMAIL_OUTBOX_POLL_SECONDS)
+    parser.add_argument("--requeue-dead", nargs="*", type=int, metavar="ID",
+                        help="Kembalikan email berstatus dead ke antrian (semua jika ID tidak diisi)")
+    parser.add_argument("--stats", action="store_true", help="Tampilkan jumlah email per status")
+    args = parser.parse_args()
+
+    if args.stats:
+        print(email_outbox.stats())
+    elif args.requeue_dead is not None:
+        print(f"{email_outbox.requeue_dead(args.requeue_dead)} email dikembalikan ke antrian")
+    else:
+        try:
+            run(args.poll, once=args.once)
+        finally:
+            smtp_pool.close_all()
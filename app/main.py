@@ -1,20 +1,43 @@
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
+from sqlalchemy import text
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.api.routes import auth
 from app.config import settings
+from app.utils.activity_tracker_util import activity_tracker
+from app.utils.json_response_util import (
+    FastJSONResponse,
+    http_exception_handler,
+    json_response,
+    validation_exception_handler,
+)
+from app.utils.password_hasher_util import password_hasher
+from app.utils.pool_metrics_util import get_pool_metrics, is_pool_saturated
+from app.utils.smtp_pool_util import smtp_pool
+from app.utils.token_cache_util import token_cache
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Sistem Monitoring Infrastruktur Jalan",
     description="Dashboard untuk memonitoring kondisi infrastruktur jalan",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse
 )
 
+app.add_exception_handler(StarletteHTTPException, http_exception_handler)
+app.add_exception_handler(RequestValidationError, validation_exception_handler)
+
 # CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -28,9 +51,79 @@ app.add_middleware(
 app.include_router(auth.router)
 
 
+@app.on_event("startup")
+def create_schema_on_startup():
+    # Mode serverless: schema dibuat saat deploy (python -m app.bootstrap)
+    if settings.CREATE_SCHEMA_ON_STARTUP:
+        from app.bootstrap import create_schema
+        create_schema()
+
+
+async def _email_outbox_loop():
+    from app.utils.email_outbox_util import email_outbox
+
+    while True:
+        claimed = await run_in_threadpool(email_outbox.dispatch)
+        if not claimed:
+            await asyncio.sleep(settings.EMAIL_OUTBOX_POLL_SECONDS)
+
+
+@app.on_event("startup")
+async def start_email_outbox_worker():
+    # Serverless: jalankan `python -m app.email_worker` di proses terpisah
+    if settings.EMAIL_OUTBOX_INPROCESS_WORKER:
+        app.state.email_outbox_task = asyncio.create_task(_email_outbox_loop())
+
+
+@app.on_event("shutdown")
+async def stop_email_outbox_worker():
+    task = getattr(app.state, "email_outbox_task", None)
+    if task is not None:
+        task.cancel()
+
+
+async def _token_purge_loop():
+    from app.utils.email_outbox_util import email_outbox
+    from app.utils.token_lifecycle_util import purge_stale_tokens
+
+    while True:
+        await run_in_threadpool(purge_stale_tokens)
+        await run_in_threadpool(email_outbox.purge)
+        await asyncio.sleep(settings.TOKEN_PURGE_INTERVAL_SECONDS)
+
+
+@app.on_event("startup")
+async def start_token_purge():
+    # Serverless: jadwalkan `python -m app.token_purge` lewat cron
+    if settings.TOKEN_PURGE_INPROCESS:
+        app.state.token_purge_task = asyncio.create_task(_token_purge_loop())
+
+
+@app.on_event("shutdown")
+async def stop_token_purge():
+    task = getattr(app.state, "token_purge_task", None)
+    if task is not None:
+        task.cancel()
+
+
+@app.on_event("shutdown")
+def flush_pending_activity():
+    activity_tracker.flush()
+
+
+@app.on_event("shutdown")
+def shutdown_password_hasher():
+    password_hasher.shutdown()
+
+
+@app.on_event("shutdown")
+def close_smtp_connections():
+    smtp_pool.close_all()
+
+
 @app.get("/api/")
 def root():
-    return {
+    return json_response({
         "status": "success",
         "code": 200,
         "message": "Sistem Monitoring Infrastruktur Jalan API",
@@ -38,22 +131,85 @@ def root():
             "version": "1.0.0",
             "docs": "/docs"
         }
-    }
+    })
 
 @app.get("/api/health")
-def health_check():
-    return {
+async def health_check(deep: bool = False):
+    if not deep:
+        return json_response({
+            "status": "success",
+            "code": 200,
+            "message": "Service is healthy",
+            "data": {
+                "status": "healthy"
+            }
+        })
+
+    # Mode deep: cek koneksi DB lewat pool async dan laporkan saturasi pool
+    from app.database import get_async_engine
+
+    database = {"reachable": True}
+    started = time.perf_counter()
+    try:
+        async with get_async_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.error(f"Health check DB gagal: {str(e)}")
+        database = {"reachable": False, "error": str(e)}
+    database["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    pools = get_pool_metrics()
+    saturated = [name for name, snapshot in pools.items() if is_pool_saturated(snapshot)]
+
+    if not database["reachable"]:
+        status, code, message = "unhealthy", 503, "Database tidak dapat dijangkau"
+    elif saturated:
+        status, code, message = "degraded", 200, f"Connection pool mendekati penuh: {', '.join(saturated)}"
+    else:
+        status, code, message = "healthy", 200, "Service is healthy"
+
+    return json_response(
+        status_code=code,
+        content={
+            "status": "success" if code == 200 else "error",
+            "code": code,
+            "message": message,
+            "data": {
+                "status": status,
+                "database": database,
+                "pools": pools,
+                "saturation_warn_ratio": settings.DB_POOL_SATURATION_WARN
+            }
+        }
+    )
+
+
+@app.get("/api/metrics")
+def metrics():
+    return json_response({
         "status": "success",
         "code": 200,
-        "message": "Service is healthy",
+        "message": "Metrics retrieved successfully",
         "data": {
-            "status": "healthy"
+            "db_pools": get_pool_metrics(),
+            "token_cache": token_cache.stats(),
+            "smtp_pool": smtp_pool.stats(),
+            "cold_start_ms": app.state.cold_start_ms
         }
-    }
+    })
 
 from mangum import Mangum
 handler = Mangum(app)
 
+# Budget cold start: waktu import modul ini sampai handler siap
+app.state.cold_start_ms = round((time.perf_counter() - _import_started) * 1000, 2)
+if app.state.cold_start_ms > settings.COLD_START_BUDGET_MS:
+    logger.warning(
+        f"Cold start {app.state.cold_start_ms} ms melebihi budget {settings.COLD_START_BUDGET_MS} ms"
+    )
+else:
+    logger.info(f"Cold start {app.state.cold_start_ms} ms (budget {settings.COLD_START_BUDGET_MS} ms)")
+
 # Local development server
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,629 @@
+from sqlalchemy import select, update, insert, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import asynccontextmanager
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+from datetime import datetime, timezone
+from app.domain.models import User, PasswordResetToken, Role
+from app.api.schemas.auth_schema import UserCreate, ProfileUpdateRequest, UserResponse
+from app.utils.email_outbox_util import enqueue_email
+from app.utils.principal_cache_util import invalidate_principal, invalidate_principals
+from app.utils.query_cache_util import bump_table_versions, defer_version_bumps, pop_committed_tables
+from app.utils.query_helpers_util import (
+    add_total_count_column,
+    apply_keyset_pagination,
+    encode_cursor,
+    estimate_count,
+    paginate_with_total,
+    split_total_count,
+)
+from app.utils.serialization_util import projection_columns
+from app.utils.token_lifecycle_util import forget_live_tokens, remember_live_token, remember_live_tokens
+from app.utils.token_registry_util import set_token_version, set_token_versions
+from app.utils.user_search_util import apply_user_search, normalize_search_term, user_search_rank
+
+
+# Write path satu user mengembalikan kolom ini lewat RETURNING, langsung jadi UserResponse
+USER_RESPONSE_COLUMNS = projection_columns(User, UserResponse)
+
+
+def _run_callbacks(callbacks):
+    for callback, args in callbacks:
+        callback(*args)
+
+
+class AsyncAuthRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        defer_version_bumps(db.sync_session)
+        self._uow_depth = 0
+        self._after_commit_callbacks = []
+
+    @asynccontextmanager
+    async def unit_of_work(self):
+        """Gabungkan beberapa method repository dalam satu transaksi.
+
+        Di dalam blok, method hanya flush; commit dilakukan sekali saat blok
+        selesai dan di-rollback jika terjadi error. Invalidasi cache Redis
+        ditunda sampai commit berhasil. Blok boleh bersarang.
+        """
+        self._uow_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._uow_depth -= 1
+            if not self._uow_depth:
+                self._after_commit_callbacks.clear()
+                await self.db.rollback()
+            raise
+        self._uow_depth -= 1
+        if not self._uow_depth:
+            await self._commit()
+
+    async def _commit(self):
+        if self._uow_depth:
+            await self.db.flush()
+            return
+        await self.db.commit()
+        callbacks, self._after_commit_callbacks = self._after_commit_callbacks, []
+        tables = pop_committed_tables(self.db.sync_session)
+        if tables:
+            callbacks.append((bump_table_versions, (tables,)))
+        if callbacks:
+            await run_in_threadpool(_run_callbacks, callbacks)
+
+    async def _after_commit(self, callback, *args):
+        # Callback berupa I/O Redis sync, dijalankan di threadpool
+        if self._uow_depth:
+            self._after_commit_callbacks.append((callback, args))
+        else:
+            await run_in_threadpool(callback, *args)
+
+    async def _first(self, stmt):
+        result = await self.db.execute(stmt)
+        return result.scalars().first()
+
+    async def _write_user(self, stmt) -> Optional[UserResponse]:
+        """Jalankan INSERT/UPDATE user ... RETURNING lalu commit.
+
+        Satu statement menggantikan SELECT -> ubah atribut -> commit -> refresh.
+        """
+        try:
+            result = await self.db.execute(stmt.returning(*USER_RESPONSE_COLUMNS))
+        except IntegrityError:
+            # Pending object (mis. outbox email) ikut dibuang; di dalam unit of work
+            # rollback dilakukan oleh blok terluar
+            if not self._uow_depth:
+                await self.db.rollback()
+            raise
+        row = result.mappings().first()
+        await self._commit()
+        return UserResponse.model_validate(dict(row)) if row else None
+
+    async def _update_user(self, user_id: int, **values) -> Optional[UserResponse]:
+        return await self._write_user(update(User).where(User.id == user_id).values(**values))
+
+    def enqueue_email(self, template: str, to_email: str, **payload):
+        """Email ke outbox; ikut commit repository berikutnya."""
+        return enqueue_email(self.db, template, to_email, **payload)
+
+    async def get_user_by_username(self, username: str):
+        return await self._first(select(User).where(User.username == username))
+
+    async def get_user_by_email(self, email: str):
+        return await self._first(select(User).where(User.email == email))
+
+    async def get_user_by_nip(self, nip: str):
+        return await self._first(select(User).where(User.nip == nip))
+
+    async def get_user_by_id(self, user_id: int):
+        return await self._first(select(User).where(User.id == user_id))
+
+    async def update_last_activity(self, user_id: int):
+        await self.db.execute(
+            update(User).where(User.id == user_id).values(last_activity=datetime.now(timezone.utc))
+        )
+        await self._commit()
+
+    async def increment_token_version(self, user_id: int):
+        result = await self.db.execute(
+            update(User).where(User.id == user_id).values(
+                token_version=User.token_version + 1
+            ).returning(User.token_version)
+        )
+        new_version = result.scalar()
+        await self._commit()
+        if new_version is not None:
+            await self._after_commit(set_token_version, user_id, new_version)
+        await self._after_commit(invalidate_principal, user_id)
+
+    async def update_user_profile(self, user_id: int, payload: ProfileUpdateRequest) -> Optional[UserResponse]:
+        user = await self._update_user(
+            user_id,
+            username=payload.username,
+            email=payload.email,
+            full_name=payload.full_name,
+            organization=payload.organization,
+            updated_at=datetime.now(timezone.utc)
+        )
+        if user:
+            await self._after_commit(invalidate_principal, user_id)
+        return user
+
+    async def change_password(self, user_id: int, new_hashed_password: str):
+        await self.db.execute(
+            update(User).where(User.id == user_id).values(
+                hashed_password=new_hashed_password,
+                updated_at=datetime.now(timezone.utc)
+            )
+        )
+        await self._commit()
+
+    async def mark_reset_tokens_used(self, user_id: int):
+        result = await self.db.execute(
+            update(PasswordResetToken).where(
+                PasswordResetToken.user_id == user_id,
+                PasswordResetToken.used_at.is_(None)
+            ).values(used_at=datetime.now(timezone.utc)).returning(PasswordResetToken.token_hash)
+        )
+        token_hashes = result.scalars().all()
+        await self._commit()
+        await self._after_commit(forget_live_tokens, token_hashes)
+
+    async def create_reset_token(self, user_id: int, token_hash: str, expires_at: datetime) -> int:
+        result = await self.db.execute(
+            insert(PasswordResetToken).values(
+                user_id=user_id,
+                token_hash=token_hash,
+                expires_at=expires_at
+            ).returning(PasswordResetToken.id)
+        )
+        token_id = result.scalar_one()
+        await self._commit()
+        await self._after_commit(remember_live_token, token_hash, token_id, user_id, expires_at)
+        return token_id
+
+    async def get_reset_token(self, token_hash: str):
+        return await self._first(
+            select(PasswordResetToken).where(PasswordResetToken.token_hash == token_hash)
+        )
+
+    async def mark_token_used(self, token_id: int) -> bool:
+        """Tandai token terpakai; False jika token sudah dipakai sebelumnya."""
+        result = await self.db.execute(
+            update(PasswordResetToken).where(
+                PasswordResetToken.id == token_id,
+                PasswordResetToken.used_at.is_(None)
+            ).values(used_at=datetime.now(timezone.utc)).returning(PasswordResetToken.token_hash)
+        )
+        token_hash = result.scalar()
+        await self._commit()
+        if token_hash is None:
+            return False
+        await self._after_commit(forget_live_tokens, [token_hash])
+        return True
+
+    async def update_user_role(self, user_id: int, role_name: str) -> Optional[UserResponse]:
+        user = await self._update_user(user_id, role_name=role_name, updated_at=datetime.now(timezone.utc))
+        if user:
+            await self._after_commit(invalidate_principal, user_id)
+        return user
+
+    async def get_all_roles(self) -> list[Role]:
+        result = await self.db.execute(select(Role).order_by(Role.name))
+        return result.scalars().all()
+
+    async def get_role_by_name(self, role_name: str):
+        return await self._first(select(Role).where(Role.name == role_name))
+
+    async def create_user_without_password(self, user: UserCreate) -> UserResponse:
+        return await self._write_user(
+            insert(User).values(
+                nip=user.nip,
+                username=user.username,
+                email=user.email,
+                full_name=user.full_name,
+                jabatan=user.jabatan,
+                organization=user.organization,
+                no_telepon=user.no_telepon,
+                hashed_password=None,  # Belum ada password
+                is_active=False,
+                is_verified=False,
+                status_verifikasi="pending"
+            )
+        )
+
+    async def approve_user(self, user_id: int, verified_by: int, notes: str = None) -> Optional[UserResponse]:
+        """Approve user - set is_verified=True, is_active=True"""
+        return await self._update_user(
+            user_id,
+            is_verified=True,
+            is_active=True,
+            status_verifikasi="approved",
+            verified_by=verified_by,
+            verified_at=datetime.now(timezone.utc),
+            verification_notes=notes,
+            role_name="Eksekutif",
+            is_approved=True
+        )
+
+    async def reject_user(self, user_id: int, verified_by: int, notes: str = None) -> Optional[UserResponse]:
+        """Reject user - set status_verifikasi=rejected"""
+        return await self._update_user(
+            user_id,
+            status_verifikasi="rejected",
+            verified_by=verified_by,
+            verified_at=datetime.now(timezone.utc),
+            verification_notes=notes,
+            is_approved=False
+        )
+
+    async def bulk_approve_users(
+        self, user_ids: list, verified_by: int, notes: str,
+        token_hashes: dict, raw_tokens: dict, expires_at
+    ):
+        """Approve semua user pending di user_ids, buat token set password dan
+        antrikan email set password dalam satu transaksi.
+        token_hashes/raw_tokens: user_id -> token."""
+        now = datetime.now(timezone.utc)
+        result = await self.db.execute(
+            update(User).where(
+                User.id.in_(user_ids),
+                User.status_verifikasi == "pending"
+            ).values(
+                is_verified=True,
+                is_active=True,
+                status_verifikasi="approved",
+                verified_by=verified_by,
+                verified_at=now,
+                verification_notes=notes,
+                role_name="Eksekutif",
+                is_approved=True
+            ).returning(User.id, User.email, User.full_name).execution_options(synchronize_session=False)
+        )
+        approved = result.all()
+        tokens = []
+        if approved:
+            token_result = await self.db.execute(
+                insert(PasswordResetToken).returning(
+                    PasswordResetToken.id, PasswordResetToken.user_id, PasswordResetToken.token_hash
+                ),
+                [
+                    {"user_id": row.id, "token_hash": token_hashes[row.id], "expires_at": expires_at}
+                    for row in approved
+                ]
+            )
+            tokens = token_result.all()
+        for row in approved:
+            self.enqueue_email(
+                "send_set_password_email",
+                row.email,
+                email=row.email,
+                set_password_token=raw_tokens[row.id],
+                user_display_name=row.full_name
+            )
+        await self._commit()
+        await self._after_commit(invalidate_principals, [row.id for row in approved])
+        await self._after_commit(remember_live_tokens, tokens, expires_at)
+        return approved
+
+    async def bulk_reject_users(self, user_ids: list, verified_by: int, notes: str = None):
+        result = await self.db.execute(
+            update(User).where(
+                User.id.in_(user_ids),
+                User.status_verifikasi == "pending"
+            ).values(
+                status_verifikasi="rejected",
+                verified_by=verified_by,
+                verified_at=datetime.now(timezone.utc),
+                verification_notes=notes,
+                is_approved=False
+            ).returning(User.id, User.email, User.full_name).execution_options(synchronize_session=False)
+        )
+        rejected = result.all()
+        for row in rejected:
+            self.enqueue_email(
+                "send_registration_rejection_email",
+                row.email,
+                email=row.email,
+                user_display_name=row.full_name,
+                rejection_notes=notes
+            )
+        await self._commit()
+        await self._after_commit(invalidate_principals, [row.id for row in rejected])
+        return rejected
+
+    async def get_verification_status(self, user_ids: list) -> dict:
+        """user_id -> status_verifikasi untuk user yang ada."""
+        if not user_ids:
+            return {}
+        result = await self.db.execute(
+            select(User.id, User.status_verifikasi).where(User.id.in_(user_ids))
+        )
+        return {row.id: row.status_verifikasi for row in result}
+
+    async def set_user_password(self, user_id: int, hashed_password: str):
+        """Set password user pertama kali"""
+        await self.db.execute(
+            update(User).where(User.id == user_id).values(hashed_password=hashed_password)
+        )
+        await self._commit()
+
+    async def create_set_password_token(self, user_id: int, token_hash: str, expires_at) -> int:
+        return await self.create_reset_token(user_id, token_hash, expires_at)
+
+    async def get_set_password_token(self, token_hash: str):
+        return await self.get_reset_token(token_hash)
+
+    async def mark_set_password_token_used(self, token_id: int) -> bool:
+        return await self.mark_token_used(token_id)
+
+    async def get_pending_users(self, limit: int = 50, offset: int = 0):
+        result = await self.db.execute(
+            select(User).where(
+                User.status_verifikasi == "pending"
+            ).order_by(User.created_at.desc()).limit(limit).offset(offset)
+        )
+        return result.scalars().all()
+
+    async def get_pending_users_with_total(self, limit: int = 50, offset: int = 0, columns: Optional[list] = None):
+        """columns diisi untuk proyeksi kolom; item hasil berupa dict, bukan entity."""
+        return await paginate_with_total(
+            self.db,
+            select(*(columns or [User])).where(
+                User.status_verifikasi == "pending"
+            ).order_by(User.created_at.desc(), User.id.desc()),
+            offset,
+            limit,
+            as_mappings=bool(columns)
+        )
+
+    async def count_pending_users(self) -> int:
+        result = await self.db.execute(
+            select(func.count()).select_from(User).where(User.status_verifikasi == "pending")
+        )
+        return result.scalar_one()
+
+    # ===================MANAGEMENT PENEGGUNA==========================
+    @staticmethod
+    def _user_list_statement(term: Optional[str], role_filter: Optional[str], columns: Optional[list] = None):
+        stmt = select(*(columns or [User]))
+
+        # Filter pencarian lewat kolom search_text (index trigram)
+        if term:
+            stmt = apply_user_search(stmt, term)
+
+        if role_filter:
+            stmt = stmt.where(User.role_name == role_filter)
+
+        return stmt
+
+    async def stream_users(
+        self,
+        columns: list,
+        search: str = None,
+        role_filter: str = None,
+        batch_size: int = 1000,
+    ):
+        """Yield batch (list mapping) user terfilter lewat server-side cursor.
+
+        Dipakai export; memori tetap sebesar satu batch berapa pun jumlah user.
+        """
+        stmt = self._user_list_statement(
+            normalize_search_term(search), role_filter, columns
+        ).order_by(
+            User.created_at.desc(), User.id.desc()
+        ).execution_options(yield_per=batch_size)
+
+        result = await self.db.stream(stmt)
+        async for partition in result.mappings().partitions():
+            yield partition
+
+    async def get_all_users(
+        self,
+        limit: int = 50,
+        page: int = 0,
+        search: str = None,
+        role_filter: str = None,
+        cursor: Optional[str] = None,
+        count_mode: str = "exact",
+        rank_by_relevance: bool = False,
+        columns: Optional[list] = None,
+    ):
+        """Daftar user terurut (created_at, id) DESC.
+
+        Tanpa cursor memakai offset `page`; dengan cursor memakai keyset
+        sehingga halaman dalam tetap konstan. Jika rank_by_relevance dan ada
+        pencarian (tanpa cursor), hasil diurutkan menurut similarity trigram
+        dan next_cursor tidak diberikan. Mengembalikan
+        (users, total, next_cursor); total None jika count_mode "none".
+        Jika columns diisi, hanya kolom tersebut yang di-select dan setiap
+        user berupa dict.
+        """
+        term = normalize_search_term(search)
+        stmt = self._user_list_statement(term, role_filter, columns)
+
+        # Mode exact tanpa cursor: total diambil dari count(*) OVER () di query halaman
+        windowed = count_mode == "exact" and not cursor
+        total = None if windowed else await self._count_users(stmt, count_mode)
+
+        ranked = (
+            term is not None
+            and rank_by_relevance
+            and not cursor
+            and self.db.get_bind().dialect.name == "postgresql"
+        )
+        if ranked:
+            page_stmt = stmt.order_by(
+                user_search_rank(term).desc(),
+                User.created_at.desc(),
+                User.id.desc()
+            ).limit(limit + 1).offset(page)
+        else:
+            page_stmt = apply_keyset_pagination(stmt, User.created_at, User.id, cursor, limit)
+            if not cursor:
+                page_stmt = page_stmt.offset(page)
+
+        if windowed:
+            result = await self.db.execute(add_total_count_column(page_stmt))
+            users, total = split_total_count(result.all(), as_mappings=bool(columns))
+            if total is None:
+                total = await self._count_users(stmt, count_mode) if page else 0
+        elif columns:
+            result = await self.db.execute(page_stmt)
+            users = [dict(row) for row in result.mappings()]
+        else:
+            result = await self.db.execute(page_stmt)
+            users = result.scalars().all()
+
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            if not ranked:
+                last = users[-1]
+                if columns:
+                    next_cursor = encode_cursor(last["created_at"], last["id"])
+                else:
+                    next_cursor = encode_cursor(last.created_at, last.id)
+
+        return users, total, next_cursor
+
+    async def _count_users(self, stmt, count_mode: str) -> Optional[int]:
+        if count_mode == "none":
+            return None
+
+        if count_mode == "approx":
+            estimate = await estimate_count(self.db, stmt)
+            if estimate is not None:
+                return estimate
+
+        total_result = await self.db.execute(
+            select(func.count()).select_from(stmt.subquery())
+        )
+        return total_result.scalar_one()
+
+    async def toggle_user_active(self, user_id: int, is_active: bool) -> Optional[UserResponse]:
+        user = await self._update_user(user_id, is_active=is_active, updated_at=datetime.now(timezone.utc))
+        if user:
+            await self._after_commit(invalidate_principal, user_id)
+        return user
+
+    async def bulk_set_users_active(self, user_ids: list, is_active: bool):
+        """Ubah is_active untuk user yang statusnya berbeda. Menonaktifkan juga
+        menaikkan token_version (force logout). Mengembalikan (id, token_version)."""
+        values = {"is_active": is_active, "updated_at": datetime.now(timezone.utc)}
+        if not is_active:
+            values["token_version"] = User.token_version + 1
+        result = await self.db.execute(
+            update(User).where(
+                User.id.in_(user_ids),
+                User.is_active.is_not(is_active)
+            ).values(**values).returning(User.id, User.token_version).execution_options(synchronize_session=False)
+        )
+        updated = result.all()
+        await self._commit()
+        if not is_active:
+            await self._after_commit(set_token_versions, {row.id: row.token_version for row in updated})
+        await self._after_commit(invalidate_principals, [row.id for row in updated])
+        return updated
+
+    async def get_existing_user_ids(self, user_ids: list) -> set:
+        if not user_ids:
+            return set()
+        result = await self.db.execute(select(User.id).where(User.id.in_(user_ids)))
+        return set(result.scalars().all())
+
+    async def create_user_by_admin(self, user_data: dict, hashed_password: str) -> UserResponse:
+        return await self._write_user(
+            insert(User).values(
+                nip=user_data['nip'],
+                username=user_data['username'],
+                email=user_data['email'],
+                full_name=user_data['full_name'],
+                jabatan=user_data['jabatan'],
+                organization=user_data['organization'],
+                no_telepon=user_data['no_telepon'],
+                role_name=user_data['role_name'],
+                hashed_password=hashed_password,
+                is_active=True,
+                is_verified=True,
+                status_verifikasi="approved",
+                is_approved=True
+            )
+        )
+
+    async def get_existing_identities(self, nips: list, usernames: list, emails: list):
+        """Satu query untuk semua NIP/username/email yang sudah terdaftar."""
+        if not (nips or usernames or emails):
+            return []
+        result = await self.db.execute(
+            select(User.nip, User.username, User.email).where(or_(
+                User.nip.in_(nips),
+                User.username.in_(usernames),
+                User.email.in_(emails)
+            ))
+        )
+        return result.all()
+
+    async def bulk_create_users_by_admin(
+        self, rows: list, token_hashes: dict, raw_tokens: dict, expires_at, batch_size: int = 200
+    ) -> list:
+        """Insert user buatan admin tanpa password per batch, buat token set
+        password dan antrikan email set password dalam satu transaksi.
+
+        rows: dict kolom User tanpa hashed_password. token_hashes/raw_tokens:
+        email -> token. Mengembalikan (id, email) sesuai urutan rows; jika satu
+        batch gagal semuanya di-rollback.
+        """
+        stmt = insert(User).returning(User.id, User.email, sort_by_parameter_order=True)
+        token_stmt = insert(PasswordResetToken).returning(
+            PasswordResetToken.id, PasswordResetToken.user_id, PasswordResetToken.token_hash
+        )
+        created = []
+        tokens = []
+        try:
+            for start in range(0, len(rows), batch_size):
+                batch = [
+                    {
+                        **row,
+                        "hashed_password": None,
+                        "is_active": True,
+                        "is_verified": True,
+                        "status_verifikasi": "approved",
+                        "is_approved": True
+                    }
+                    for row in rows[start:start + batch_size]
+                ]
+                inserted = (await self.db.execute(stmt, batch)).all()
+                token_result = await self.db.execute(
+                    token_stmt,
+                    [
+                        {"user_id": row.id, "token_hash": token_hashes[row.email], "expires_at": expires_at}
+                        for row in inserted
+                    ]
+                )
+                tokens.extend(token_result.all())
+                created.extend(inserted)
+            for row in rows:
+                self.enqueue_email(
+                    "send_set_password_email",
+                    row["email"],
+                    email=row["email"],
+                    set_password_token=raw_tokens[row["email"]],
+                    user_display_name=row["full_name"]
+                )
+            await self._commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        await self._after_commit(remember_live_tokens, tokens, expires_at)
+        return created
+
+    async def update_user_by_admin(self, user_id: int, update_data: dict) -> Optional[UserResponse]:
+        # Update hanya field yang diberikan
+        values = {key: value for key, value in update_data.items() if value is not None}
+        user = await self._update_user(user_id, **values, updated_at=datetime.now(timezone.utc))
+        if user:
+            await self._after_commit(invalidate_principal, user_id)
+        return user
@@ -1,12 +1,85 @@
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from contextlib import contextmanager
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime, timezone
 from app.domain.models import User, PasswordResetToken, Role 
-from app.api.schemas.auth_schema import UserCreate, ProfileUpdateRequest
+from app.api.schemas.auth_schema import UserCreate, ProfileUpdateRequest, UserResponse
+from app.utils.email_outbox_util import enqueue_email
+from app.utils.principal_cache_util import invalidate_principal
+from app.utils.query_helpers_util import paginate_query_with_total
+from app.utils.serialization_util import projection_columns
+from app.utils.token_lifecycle_util import forget_live_tokens, remember_live_token
+from app.utils.token_registry_util import set_token_version
+
+# Write path satu user mengembalikan kolom ini lewat RETURNING, langsung jadi UserResponse
+USER_RESPONSE_COLUMNS = projection_columns(User, UserResponse)
 
 class AuthRepository:
     def __init__(self, db: Session):
         self.db = db
+        self._uow_depth = 0
+        self._after_commit_callbacks = []
+
+    @contextmanager
+    def unit_of_work(self):
+        """Gabungkan beberapa method repository dalam satu transaksi.
+
+        Di dalam blok, method hanya flush; commit dilakukan sekali saat blok
+        selesai dan di-rollback jika terjadi error. Invalidasi cache Redis
+        ditunda sampai commit berhasil. Blok boleh bersarang.
+        """
+        self._uow_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._uow_depth -= 1
+            if not self._uow_depth:
+                self._after_commit_callbacks.clear()
+                self.db.rollback()
+            raise
+        self._uow_depth -= 1
+        if not self._uow_depth:
+            self._commit()
+
+    def _commit(self):
+        if self._uow_depth:
+            self.db.flush()
+            return
+        self.db.commit()
+        callbacks, self._after_commit_callbacks = self._after_commit_callbacks, []
+        for callback, args in callbacks:
+            callback(*args)
+
+    def _after_commit(self, callback, *args):
+        if self._uow_depth:
+            self._after_commit_callbacks.append((callback, args))
+        else:
+            callback(*args)
+
+    def _write_user(self, stmt) -> Optional[UserResponse]:
+        """Jalankan INSERT/UPDATE user ... RETURNING lalu commit.
+
+        Satu statement menggantikan SELECT -> ubah atribut -> commit -> refresh.
+        """
+        try:
+            row = self.db.execute(stmt.returning(*USER_RESPONSE_COLUMNS)).mappings().first()
+        except IntegrityError:
+            # Pending object (mis. outbox email) ikut dibuang; di dalam unit of work
+            # rollback dilakukan oleh blok terluar
+            if not self._uow_depth:
+                self.db.rollback()
+            raise
+        self._commit()
+        return UserResponse.model_validate(dict(row)) if row else None
+
+    def _update_user(self, user_id: int, **values) -> Optional[UserResponse]:
+        return self._write_user(update(User).where(User.id == user_id).values(**values))
+
+    def enqueue_email(self, template: str, to_email: str, **payload):
+        """Email ke outbox; ikut commit repository berikutnya."""
+        return enqueue_email(self.db, template, to_email, **payload)
 
     def get_user_by_username(self, username: str) -> Optional[User]:
         return self.db.query(User).filter(User.username == username).first()
@@ -14,48 +87,52 @@ class AuthRepository:
     def get_user_by_email(self, email: str) -> Optional[User]:
         return self.db.query(User).filter(User.email == email).first()
 
-    def create_user(self, user: UserCreate, hashed_password: str) -> User:
-        db_user = User(
-            username=user.username,
-            email=user.email,
-            full_name=user.full_name,
-            hashed_password=hashed_password,
-            organization=user.organization 
+    def create_user(self, user: UserCreate, hashed_password: str) -> UserResponse:
+        return self._write_user(
+            insert(User).values(
+                username=user.username,
+                email=user.email,
+                full_name=user.full_name,
+                hashed_password=hashed_password,
+                organization=user.organization
+            )
         )
-        self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
-        return db_user
 
     def update_last_activity(self, user_id: int):
         self.db.query(User).filter(User.id == user_id).update(
             {"last_activity": datetime.now(timezone.utc)}
         )
-        self.db.commit()
+        self._commit()
 
     def update_password(self, user_id: int, new_hashed_password: str):
 
         self.db.query(User).filter(User.id == user_id).update(
             {"hashed_password": new_hashed_password}
         )
-        self.db.commit()
+        self._commit()
 
     def increment_token_version(self, user_id: int): 
-        self.db.query(User).filter(User.id == user_id).update(
-            {"token_version": User.token_version + 1}
+        new_version = self.db.execute(
+            update(User).where(User.id == user_id).values(
+                token_version=User.token_version + 1
+            ).returning(User.token_version)
+        ).scalar()
+        self._commit()
+        if new_version is not None:
+            self._after_commit(set_token_version, user_id, new_version)
+        self._after_commit(invalidate_principal, user_id)
+
+    def update_user_profile(self, user_id: int, payload: ProfileUpdateRequest) -> Optional[UserResponse]:
+        user = self._update_user(
+            user_id,
+            username=payload.username,
+            email=payload.email,
+            full_name=payload.full_name,
+            organization=payload.organization,
+            updated_at=datetime.now(timezone.utc)
         )
-        self.db.commit()
-
-    def update_user_profile(self, user_id: int, payload: ProfileUpdateRequest) -> User:
-        user = self.get_user_by_id(user_id)
         if user:
-            user.username = payload.username
-            user.email = payload.email
-            user.full_name = payload.full_name
-            user.organization = payload.organization
-            user.updated_at = datetime.now(timezone.utc)
-            self.db.commit()
-            self.db.refresh(user)
+            self._after_commit(invalidate_principal, user_id)
         return user
 
     def change_password(self, user_id: int, new_hashed_password: str):
@@ -65,44 +142,53 @@ class AuthRepository:
                 "updated_at": datetime.now(timezone.utc)
             }
         )
-        self.db.commit()
+        self._commit()
 
     def mark_reset_tokens_used(self, user_id: int):
-        self.db.query(PasswordResetToken).filter(
-            PasswordResetToken.user_id == user_id,
-            PasswordResetToken.used_at.is_(None)
-        ).update({"used_at": datetime.now(timezone.utc)})
-        self.db.commit()
-
-    def create_reset_token(self, user_id: int, token_hash: str, expires_at: datetime) -> PasswordResetToken:
-        reset_token = PasswordResetToken(
-            user_id=user_id,
-            token_hash=token_hash,
-            expires_at=expires_at
-        )
-        self.db.add(reset_token)
-        self.db.commit()
-        self.db.refresh(reset_token)
-        return reset_token
+        token_hashes = self.db.execute(
+            update(PasswordResetToken).where(
+                PasswordResetToken.user_id == user_id,
+                PasswordResetToken.used_at.is_(None)
+            ).values(used_at=datetime.now(timezone.utc)).returning(PasswordResetToken.token_hash)
+        ).scalars().all()
+        self._commit()
+        self._after_commit(forget_live_tokens, token_hashes)
+
+    def create_reset_token(self, user_id: int, token_hash: str, expires_at: datetime) -> int:
+        token_id = self.db.execute(
+            insert(PasswordResetToken).values(
+                user_id=user_id,
+                token_hash=token_hash,
+                expires_at=expires_at
+            ).returning(PasswordResetToken.id)
+        ).scalar_one()
+        self._commit()
+        self._after_commit(remember_live_token, token_hash, token_id, user_id, expires_at)
+        return token_id
 
     def get_reset_token(self, token_hash: str) -> Optional[PasswordResetToken]:
         return self.db.query(PasswordResetToken).filter(
             PasswordResetToken.token_hash == token_hash
         ).first()
 
-    def mark_token_used(self, token_id: int):
-        self.db.query(PasswordResetToken).filter(
-            PasswordResetToken.id == token_id
-        ).update({"used_at": datetime.now(timezone.utc)})
-        self.db.commit()
-
-    def update_user_role(self, user_id: int, role_name: str) -> User:
-        user = self.get_user_by_id(user_id)
+    def mark_token_used(self, token_id: int) -> bool:
+        """Tandai token terpakai; False jika token sudah dipakai sebelumnya."""
+        token_hash = self.db.execute(
+            update(PasswordResetToken).where(
+                PasswordResetToken.id == token_id,
+                PasswordResetToken.used_at.is_(None)
+            ).values(used_at=datetime.now(timezone.utc)).returning(PasswordResetToken.token_hash)
+        ).scalar()
+        self._commit()
+        if token_hash is None:
+            return False
+        self._after_commit(forget_live_tokens, [token_hash])
+        return True
+
+    def update_user_role(self, user_id: int, role_name: str) -> Optional[UserResponse]:
+        user = self._update_user(user_id, role_name=role_name, updated_at=datetime.now(timezone.utc))
         if user:
-            user.role_name = role_name
-            user.updated_at = datetime.now(timezone.utc)
-            self.db.commit()
-            self.db.refresh(user)
+            self._after_commit(invalidate_principal, user_id)
         return user
 
     def get_all_roles(self) -> list[Role]:
@@ -111,106 +197,92 @@ class AuthRepository:
     def get_role_by_name(self, role_name: str) -> Optional[Role]:
         return self.db.query(Role).filter(Role.name == role_name).first()
 
-    def verify_user(self, user_id: int, is_verified: bool = True, is_active: bool = True) -> Optional[User]:
-        user = self.get_user_by_id(user_id)
+    def verify_user(self, user_id: int, is_verified: bool = True, is_active: bool = True) -> Optional[UserResponse]:
+        user = self._update_user(
+            user_id,
+            is_verified=is_verified,
+            is_active=is_active,
+            updated_at=datetime.now(timezone.utc)
+        )
         if user:
-            user.is_verified = is_verified
-            user.is_active = is_active
-            user.updated_at = datetime.now(timezone.utc)
-            self.db.commit()
-            self.db.refresh(user)
+            self._after_commit(invalidate_principal, user_id)
         return user
 
-    def reject_user(self, user_id: int) -> Optional[User]:
-        user = self.get_user_by_id(user_id)
-        if user:
-            user.is_verified = False
-            user.is_active = False
-            user.updated_at = datetime.now(timezone.utc)
-            self.db.commit()
-            self.db.refresh(user)
-        return user
+    def reject_user(self, user_id: int) -> Optional[UserResponse]:
+        return self._update_user(
+            user_id,
+            is_verified=False,
+            is_active=False,
+            updated_at=datetime.now(timezone.utc)
+        )
     
 
     def get_user_by_nip(self, nip: str):
         return self.db.query(User).filter(User.nip == nip).first()
 
-    def create_user_without_password(self, user: UserCreate):
-        from app.domain.models import User
-        db_user = User(
-            nip=user.nip,
-            username=user.username,
-            email=user.email,
-            full_name=user.full_name,
-            jabatan=user.jabatan,
-            organization=user.organization,
-            no_telepon=user.no_telepon,
-            hashed_password=None,  # Belum ada password
-            is_active=False,
-            is_verified=False,
-            status_verifikasi="pending"
+    def get_existing_identities(self, nips: list, usernames: list, emails: list):
+        """Satu query untuk semua NIP/username/email yang sudah terdaftar."""
+        if not (nips or usernames or emails):
+            return []
+        return self.db.execute(
+            select(User.nip, User.username, User.email).where(or_(
+                User.nip.in_(nips),
+                User.username.in_(usernames),
+                User.email.in_(emails)
+            ))
+        ).all()
+
+    def create_user_without_password(self, user: UserCreate) -> UserResponse:
+        return self._write_user(
+            insert(User).values(
+                nip=user.nip,
+                username=user.username,
+                email=user.email,
+                full_name=user.full_name,
+                jabatan=user.jabatan,
+                organization=user.organization,
+                no_telepon=user.no_telepon,
+                hashed_password=None,  # Belum ada password
+                is_active=False,
+                is_verified=False,
+                status_verifikasi="pending"
+            )
         )
-        self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
-        return db_user
 
-    def approve_user(self, user_id: int, verified_by: int, notes: str = None):
+    def approve_user(self, user_id: int, verified_by: int, notes: str = None) -> Optional[UserResponse]:
         """Approve user - set is_verified=True, is_active=True"""
-        from app.domain.models import User
-        from datetime import datetime, timezone
-        
-        user = self.db.query(User).filter(User.id == user_id).first()
-        if user:
-            user.is_verified = True
-            user.is_active = True
-            user.status_verifikasi = "approved"
-            user.verified_by = verified_by
-            user.verified_at = datetime.now(timezone.utc)
-            user.verification_notes = notes,
-            user.role_name = "Eksekutif",
-            user.is_approved = True
-            self.db.commit()
-            self.db.refresh(user)
-        return user
+        return self._update_user(
+            user_id,
+            is_verified=True,
+            is_active=True,
+            status_verifikasi="approved",
+            verified_by=verified_by,
+            verified_at=datetime.now(timezone.utc),
+            verification_notes=notes,
+            role_name="Eksekutif",
+            is_approved=True
+        )
 
-    def reject_user(self, user_id: int, verified_by: int, notes: str = None):
+    def reject_user(self, user_id: int, verified_by: int, notes: str = None) -> Optional[UserResponse]:
         """Reject user - set status_verifikasi=rejected"""
-        from app.domain.models import User
-        from datetime import datetime, timezone
-        
-        user = self.db.query(User).filter(User.id == user_id).first()
-        if user:
-            user.status_verifikasi = "rejected"
-            user.verified_by = verified_by
-            user.verified_at = datetime.now(timezone.utc)
-            user.verification_notes = notes,
-            user.is_approved = False
-            self.db.commit()
-            self.db.refresh(user)
-        return user
+        return self._update_user(
+            user_id,
+            status_verifikasi="rejected",
+            verified_by=verified_by,
+            verified_at=datetime.now(timezone.utc),
+            verification_notes=notes,
+            is_approved=False
+        )
 
     def set_user_password(self, user_id: int, hashed_password: str):
         """Set password user pertama kali"""
-        from app.domain.models import User
-        user = self.db.query(User).filter(User.id == user_id).first()
-        if user:
-            user.hashed_password = hashed_password
-            self.db.commit()
-            self.db.refresh(user)
-        return user
-
-    def create_set_password_token(self, user_id: int, token_hash: str, expires_at):
-        from app.domain.models import PasswordResetToken
-        token = PasswordResetToken(
-            user_id=user_id,
-            token_hash=token_hash,
-            expires_at=expires_at
+        self.db.execute(
+            update(User).where(User.id == user_id).values(hashed_password=hashed_password)
         )
-        self.db.add(token)
-        self.db.commit()
-        self.db.refresh(token)
-        return token
+        self._commit()
+
+    def create_set_password_token(self, user_id: int, token_hash: str, expires_at) -> int:
+        return self.create_reset_token(user_id, token_hash, expires_at)
 
     def get_set_password_token(self, token_hash: str):
         from app.domain.models import PasswordResetToken
@@ -218,14 +290,8 @@ class AuthRepository:
             PasswordResetToken.token_hash == token_hash
         ).first()
 
-    def mark_set_password_token_used(self, token_id: int):
-        from app.domain.models import PasswordResetToken
-        from datetime import datetime, timezone
-        
-        token = self.db.query(PasswordResetToken).filter(PasswordResetToken.id == token_id).first()
-        if token:
-            token.used_at = datetime.now(timezone.utc)
-            self.db.commit()
+    def mark_set_password_token_used(self, token_id: int) -> bool:
+        return self.mark_token_used(token_id)
 
     def get_pending_users(self, limit: int = 50, offset: int = 0):
         from app.domain.models import User
@@ -233,6 +299,13 @@ class AuthRepository:
             User.status_verifikasi == "pending"
         ).order_by(User.created_at.desc()).limit(limit).offset(offset).all()
 
+    def get_pending_users_with_total(self, limit: int = 50, offset: int = 0):
+        query = self.db.query(User).filter(
+            User.status_verifikasi == "pending"
+        ).order_by(User.created_at.desc(), User.id.desc())
+
+        return paginate_query_with_total(query, offset, limit)
+
     def count_pending_users(self):
         from app.domain.models import User
         return self.db.query(User).filter(User.status_verifikasi == "pending").count()
@@ -276,55 +349,37 @@ class AuthRepository:
         
         return users, total
     
-    def toggle_user_active(self, user_id: int, is_active: bool):
-        from app.domain.models import User
-        from datetime import datetime, timezone
-        
-        user = self.db.query(User).filter(User.id == user_id).first()
+    def toggle_user_active(self, user_id: int, is_active: bool) -> Optional[UserResponse]:
+        user = self._update_user(user_id, is_active=is_active, updated_at=datetime.now(timezone.utc))
         if user:
-            user.is_active = is_active
-            user.updated_at = datetime.now(timezone.utc)
-            self.db.commit()
-            self.db.refresh(user)
+            self._after_commit(invalidate_principal, user_id)
         return user
 
 
-    def create_user_by_admin(self, user_data: dict, hashed_password: str):
-        from app.domain.models import User
-        
-        db_user = User(
-            nip=user_data['nip'],
-            username=user_data['username'],
-            email=user_data['email'],
-            full_name=user_data['full_name'],
-            jabatan=user_data['jabatan'],
-            organization=user_data['organization'],
-            no_telepon=user_data['no_telepon'],
-            role_name=user_data['role_name'],
-            hashed_password=hashed_password,
-            is_active=True,
-            is_verified=True,
-            status_verifikasi="approved",
-            is_approved=True
+    def create_user_by_admin(self, user_data: dict, hashed_password: str) -> UserResponse:
+        return self._write_user(
+            insert(User).values(
+                nip=user_data['nip'],
+                username=user_data['username'],
+                email=user_data['email'],
+                full_name=user_data['full_name'],
+                jabatan=user_data['jabatan'],
+                organization=user_data['organization'],
+                no_telepon=user_data['no_telepon'],
+                role_name=user_data['role_name'],
+                hashed_password=hashed_password,
+                is_active=True,
+                is_verified=True,
+                status_verifikasi="approved",
+                is_approved=True
+            )
         )
-        self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
-        return db_user
 
 
-    def update_user_by_admin(self, user_id: int, update_data: dict):
-        from app.domain.models import User
-        from datetime import datetime, timezone
-        
-        user = self.db.query(User).filter(User.id == user_id).first()
+    def update_user_by_admin(self, user_id: int, update_data: dict) -> Optional[UserResponse]:
+        # Update hanya field yang diberikan
+        values = {key: value for key, value in update_data.items() if value is not None}
+        user = self._update_user(user_id, **values, updated_at=datetime.now(timezone.utc))
         if user:
-            # Update hanya field yang diberikan
-            for key, value in update_data.items():
-                if value is not None:
-                    setattr(user, key, value)
-            
-            user.updated_at = datetime.now(timezone.utc)
-            self.db.commit()
-            self.db.refresh(user)
-        return user
\ No newline at end of file
+            self._after_commit(invalidate_principal, user_id)
+        return user
@@ -0,0 +1,783 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from app.repository.async_auth_repository import AsyncAuthRepository
+from app.service.auth_service import AuthService
+from app.api.schemas.auth_schema import(
+    UserCreate, UserLogin,
+    ProfileUpdateRequest, ChangePasswordRequest,
+    ForgotPasswordRequest, ResetPasswordRequest,
+    AdminUserCreate, AdminUserImportRow, AdminUserUpdate,
+    UserResponse, PendingUserResponse
+)
+from app.domain.models import User
+from datetime import timedelta, datetime, timezone
+from app.config import settings
+from app.utils.auth_util import (
+    verify_password_async,
+    get_password_hash_async,
+)
+from app.utils.activity_tracker_util import activity_tracker
+from app.utils.import_util import read_xlsx_rows
+from app.utils.serialization_util import projection_columns, validate_rows
+from app.utils.token_lifecycle_util import get_live_token
+from app.utils.session_store_util import end_session
+import secrets
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AsyncAuthService:
+    """Varian async dari AuthService di atas AsyncSession.
+
+    Query berjalan lewat asyncpg dan bcrypt lewat password hasher pool sehingga
+    event loop tidak pernah terblokir. Email ditulis ke outbox dalam transaksi
+    yang sama dan dikirim oleh worker (app.email_worker), bukan di dalam request.
+    """
+
+    ALLOWED_ROLES = AuthService.ALLOWED_ROLES
+    DEFAULT_ROLE_AFTER_APPROVAL = AuthService.DEFAULT_ROLE_AFTER_APPROVAL
+    PASSWORD_RESET_TOKEN_EXPIRY_HOURS = AuthService.PASSWORD_RESET_TOKEN_EXPIRY_HOURS
+    SET_PASSWORD_TOKEN_EXPIRY_HOURS = AuthService.SET_PASSWORD_TOKEN_EXPIRY_HOURS
+
+    # Helper tanpa I/O dipakai bersama dengan AuthService
+    _validate_user_status = AuthService._validate_user_status
+    _create_token_hash = AuthService._create_token_hash
+    _generate_access_token = AuthService._generate_access_token
+    USER_UNIQUE_MESSAGES = AuthService.USER_UNIQUE_MESSAGES
+    _raise_for_existing_identity = AuthService._raise_for_existing_identity
+    _raise_for_duplicate_user = AuthService._raise_for_duplicate_user
+    _validate_token_record = AuthService._validate_token_record
+    _raise_token_already_used = AuthService._raise_token_already_used
+
+    def __init__(self, db: AsyncSession):
+        self.repository = AsyncAuthRepository(db)
+
+    async def _get_usable_token(self, token_hash: str, invalid_detail: str):
+        """(token_id, user_id) token reset/set password yang masih berlaku.
+
+        Token aktif di Redis cukup satu GET; jika tidak ada, dicek ke DB agar
+        pesan error (tidak valid/terpakai/kadaluarsa) tetap spesifik.
+        """
+        live = await run_in_threadpool(get_live_token, token_hash)
+        if live:
+            return live
+        token = await self.repository.get_reset_token(token_hash)
+        self._validate_token_record(token, invalid_detail)
+        return token.id, token.user_id
+
+    async def _validate_user_identity_available(self, nip: str, username: str, email: str):
+        """Satu query OR untuk NIP/username/email, sebelum langkah mahal seperti hashing password."""
+        rows = await self.repository.get_existing_identities([nip], [username], [email])
+        self._raise_for_existing_identity(rows, nip, username, email)
+
+    async def register_user(self, user: UserCreate):
+        """Registrasi user baru tanpa password"""
+        logger.info(f"Memulai registrasi user: {user.email}")
+
+        # Email masuk outbox dan ikut commit pembuatan user
+        self.repository.enqueue_email(
+            "send_registration_confirmation_email",
+            user.email,
+            email=user.email,
+            user_display_name=user.full_name
+        )
+        self.repository.enqueue_email(
+            "send_admin_notification_new_registration",
+            settings.ADMIN_NOTIFICATION_EMAIL,
+            user_data={
+                'nip': user.nip,
+                'username': user.username,
+                'email': user.email,
+                'full_name': user.full_name,
+                'jabatan': user.jabatan,
+                'organization': user.organization,
+                'no_telepon': user.no_telepon,
+                'created_at': datetime.now(timezone.utc).strftime('%d %B %Y, %H:%M WIB')
+            }
+        )
+
+        # Duplikat NIP/username/email ditolak constraint unik, tanpa SELECT terpisah;
+        # email di outbox ikut di-rollback
+        try:
+            new_user = await self.repository.create_user_without_password(user)
+        except IntegrityError as e:
+            self._raise_for_duplicate_user(e)
+        logger.info(f"User berhasil dibuat dengan id: {new_user.id}")
+
+        return new_user
+
+    async def authenticate_user(self, login: UserLogin):
+        clean_email = login.email.strip().lower()
+
+        user = await self.repository.get_user_by_email(clean_email)
+
+        if not user:
+            logger.error(f"User dengan email '{clean_email}' tidak ditemukan")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Pastikan email atau kata sandi yang Anda masukkan sudah sesuai"
+            )
+
+        if not user.hashed_password:
+            logger.error(f"User {user.id} tidak memiliki password")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Akun tidak valid. Silakan hubungi administrator."
+            )
+
+        if not await verify_password_async(login.password, user.hashed_password):
+            logger.error(f"Password tidak sesuai untuk user {user.id}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Pastikan email atau kata sandi yang Anda masukkan sudah sesuai"
+            )
+
+        self._validate_user_status(user)
+
+        await run_in_threadpool(activity_tracker.touch, user.id)
+
+        logger.info(f"Login berhasil untuk user: {user.username}")
+        # start_session memakai client Redis sync
+        return await run_in_threadpool(self._generate_access_token, user)
+
+    async def logout_user(self, user):
+        logger.info(f"User {user.id} melakukan logout")
+        await self.repository.increment_token_version(user.id)
+        await run_in_threadpool(end_session, user.id, user.token_version)
+
+    async def update_user_profile(self, user, payload: ProfileUpdateRequest):
+        """Update profil user"""
+        logger.info(f"Update profil untuk user {user.id}")
+
+        if payload.username != user.username:
+            existing = await self.repository.get_user_by_username(payload.username)
+            if existing and existing.id != user.id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Username sudah digunakan oleh akun lain"
+                )
+
+        if payload.email != user.email:
+            existing = await self.repository.get_user_by_email(payload.email)
+            if existing and existing.id != user.id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Email sudah digunakan oleh akun lain"
+                )
+
+        return await self.repository.update_user_profile(user.id, payload)
+
+    async def change_user_password(self, user, payload: ChangePasswordRequest):
+        logger.info(f"Ubah password untuk user {user.id}")
+
+        if not await verify_password_async(payload.current_password, user.hashed_password):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Password saat ini tidak sesuai"
+            )
+
+        new_hashed = await get_password_hash_async(payload.new_password)
+
+        async with self.repository.unit_of_work():
+            self.repository.enqueue_email(
+                "send_password_changed_notification",
+                user.email,
+                email=user.email,
+                user_display_name=user.full_name
+            )
+            await self.repository.change_password(user.id, new_hashed)
+            await self.repository.increment_token_version(user.id)
+
+    async def request_password_reset(self, payload: ForgotPasswordRequest) -> bool:
+        logger.info(f"Request reset password untuk email: {payload.email}")
+
+        user = await self.repository.get_user_by_email(payload.email)
+
+        if not user or not user.is_verified:
+            logger.warning(f"Reset password request untuk email tidak valid: {payload.email}")
+            return False
+
+        is_admin = user.role_name == "Super Admin"
+
+        raw_token = secrets.token_urlsafe(48)
+        token_hash = self._create_token_hash(raw_token)
+
+        expires_at = datetime.now(timezone.utc) + timedelta(
+            hours=self.PASSWORD_RESET_TOKEN_EXPIRY_HOURS
+        )
+
+        async with self.repository.unit_of_work():
+            await self.repository.mark_reset_tokens_used(user.id)
+            self.repository.enqueue_email(
+                "send_reset_password_email",
+                user.email,
+                email=user.email,
+                reset_token=raw_token
+            )
+            await self.repository.create_reset_token(
+                user_id=user.id,
+                token_hash=token_hash,
+                expires_at=expires_at
+            )
+
+        return is_admin
+
+    async def reset_password(self, payload: ResetPasswordRequest):
+        logger.info("Memproses reset password")
+
+        token_hash = self._create_token_hash(payload.token)
+        token_id, user_id = await self._get_usable_token(token_hash, "Token reset password tidak valid")
+
+        new_hashed = await get_password_hash_async(payload.new_password)
+
+        # Password, token terpakai dan token_version dalam satu transaksi:
+        # token tidak bisa dipakai ulang jika salah satu langkah gagal
+        async with self.repository.unit_of_work():
+            if not await self.repository.mark_token_used(token_id):
+                self._raise_token_already_used()
+            await self.repository.change_password(user_id, new_hashed)
+            await self.repository.increment_token_version(user_id)
+
+        logger.info(f"Password berhasil direset untuk user {user_id}")
+
+    async def change_user_role(self, acting_user, target_user_id: int, role_name: str):
+        """Ubah role user - Super Admin only"""
+        if acting_user.role_name != "Super Admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Hanya Super Admin yang dapat mengubah role user"
+            )
+
+        target_user = await self.repository.get_user_by_id(target_user_id)
+        if not target_user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User tidak ditemukan"
+            )
+
+        logger.info(f"Admin {acting_user.id} mengubah role user {target_user_id} menjadi {role_name}")
+        return await self.repository.update_user_role(target_user_id, role_name)
+
+    async def list_roles(self):
+        """List semua role yang tersedia"""
+        return await self.repository.get_all_roles()
+
+    async def get_pending_users_for_verification(self, limit: int = 50, offset: int = 0):
+        """Dapatkan daftar user yang menunggu verifikasi (sudah tervalidasi PendingUserResponse)"""
+        rows, total = await self.repository.get_pending_users_with_total(
+            limit, offset, columns=projection_columns(User, PendingUserResponse)
+        )
+        return validate_rows(PendingUserResponse, rows), total
+
+    async def verify_user(self, current_user, user_id: int, payload):
+        """Verifikasi user - approve atau reject"""
+        logger.info(f"Admin {current_user.id} memverifikasi user {user_id}: {payload.status}")
+
+        target_user = await self.repository.get_user_by_id(user_id)
+        if not target_user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User tidak ditemukan"
+            )
+
+        if target_user.status_verifikasi != "pending":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"User sudah {target_user.status_verifikasi}"
+            )
+
+        if payload.status == "approve":
+            return await self._approve_user(target_user, current_user.id, payload.notes)
+
+        elif payload.status == "reject":
+            return await self._reject_user(target_user, current_user.id, payload.notes)
+
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Status harus 'approve' atau 'reject'"
+            )
+
+    async def _approve_user(self, target_user, admin_id: int, notes: str):
+        raw_token = secrets.token_urlsafe(48)
+        token_hash = self._create_token_hash(raw_token)
+
+        expires_at = datetime.now(timezone.utc) + timedelta(
+            hours=self.SET_PASSWORD_TOKEN_EXPIRY_HOURS
+        )
+
+        async with self.repository.unit_of_work():
+            approved_user = await self.repository.approve_user(
+                user_id=target_user.id,
+                verified_by=admin_id,
+                notes=notes
+            )
+            self.repository.enqueue_email(
+                "send_set_password_email",
+                approved_user.email,
+                email=approved_user.email,
+                set_password_token=raw_token,
+                user_display_name=approved_user.full_name
+            )
+            await self.repository.create_set_password_token(
+                user_id=target_user.id,
+                token_hash=token_hash,
+                expires_at=expires_at
+            )
+
+        return approved_user
+
+    async def _reject_user(self, target_user, admin_id: int, notes: str):
+        self.repository.enqueue_email(
+            "send_registration_rejection_email",
+            target_user.email,
+            email=target_user.email,
+            user_display_name=target_user.full_name,
+            rejection_notes=notes
+        )
+        rejected_user = await self.repository.reject_user(
+            user_id=target_user.id,
+            verified_by=admin_id,
+            notes=notes
+        )
+        logger.info(f"User {target_user.id} ditolak oleh admin {admin_id}")
+
+        return rejected_user
+
+    def _bulk_skipped(self, user_ids: list, processed_ids, reasons: dict) -> list:
+        processed_ids = set(processed_ids)
+        return [
+            {"user_id": user_id, "reason": reasons.get(user_id, "User tidak ditemukan")}
+            for user_id in user_ids
+            if user_id not in processed_ids
+        ]
+
+    async def bulk_verify_users(self, current_user, user_ids: list, payload):
+        """Approve/reject banyak user pending dalam satu transaksi; email
+        notifikasi masuk outbox di transaksi yang sama.
+
+        Mengembalikan (processed_ids, skipped).
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        logger.info(f"Admin {current_user.id} memverifikasi {len(user_ids)} user sekaligus: {payload.status}")
+
+        if payload.status == "approve":
+            raw_tokens = {user_id: secrets.token_urlsafe(48) for user_id in user_ids}
+            expires_at = datetime.now(timezone.utc) + timedelta(
+                hours=self.SET_PASSWORD_TOKEN_EXPIRY_HOURS
+            )
+            rows = await self.repository.bulk_approve_users(
+                user_ids=user_ids,
+                verified_by=current_user.id,
+                notes=payload.notes,
+                token_hashes={user_id: self._create_token_hash(token) for user_id, token in raw_tokens.items()},
+                raw_tokens=raw_tokens,
+                expires_at=expires_at
+            )
+        else:
+            rows = await self.repository.bulk_reject_users(
+                user_ids=user_ids,
+                verified_by=current_user.id,
+                notes=payload.notes
+            )
+
+        # Urutan mengikuti request; RETURNING tidak menjamin urutan
+        returned_ids = {row.id for row in rows}
+        processed_ids = [user_id for user_id in user_ids if user_id in returned_ids]
+        statuses = await self.repository.get_verification_status(
+            list(set(user_ids) - set(processed_ids))
+        )
+        skipped = self._bulk_skipped(
+            user_ids,
+            processed_ids,
+            {user_id: f"User sudah {user_status}" for user_id, user_status in statuses.items()}
+        )
+
+        logger.info(f"Verifikasi massal selesai: {len(processed_ids)} diproses, {len(skipped)} dilewati")
+        return processed_ids, skipped
+
+    async def set_password_from_token(self, payload):
+        logger.info("Memproses set password dari token")
+
+        token_hash = self._create_token_hash(payload.token)
+        token_id, user_id = await self._get_usable_token(token_hash, "Token tidak valid")
+
+        hashed_password = await get_password_hash_async(payload.password)
+        async with self.repository.unit_of_work():
+            if not await self.repository.mark_set_password_token_used(token_id):
+                self._raise_token_already_used()
+            await self.repository.set_user_password(user_id, hashed_password)
+
+        logger.info(f"Password berhasil di-set untuk user {user_id}")
+
+
+    # ===================MANAGEMENT PENEGGUNA==========================
+
+    async def get_all_users(
+        self,
+        limit: int = 50,
+        page: int = 0,
+        search: str = None,
+        role_filter: str = None,
+        cursor: str = None,
+        count_mode: str = "exact",
+        rank_by_relevance: bool = False
+    ):
+        """Mengembalikan (list UserResponse, total, next_cursor).
+
+        Hanya kolom UserResponse yang di-select, lalu satu halaman divalidasi
+        sekaligus lewat TypeAdapter (bukan from_orm per baris).
+        """
+        try:
+            rows, total, next_cursor = await self.repository.get_all_users(
+                limit=limit,
+                page=page,
+                search=search,
+                role_filter=role_filter,
+                cursor=cursor,
+                count_mode=count_mode,
+                rank_by_relevance=rank_by_relevance,
+                columns=projection_columns(User, UserResponse)
+            )
+            return validate_rows(UserResponse, rows), total, next_cursor
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+
+    # Kolom export direktori user: (key, judul kolom)
+    EXPORT_COLUMNS = [
+        ("id", "ID"),
+        ("nip", "NIP"),
+        ("username", "Username"),
+        ("email", "Email"),
+        ("full_name", "Nama Lengkap"),
+        ("jabatan", "Jabatan"),
+        ("organization", "Instansi"),
+        ("no_telepon", "No. Telepon"),
+        ("role_name", "Role"),
+        ("is_active", "Aktif"),
+        ("is_verified", "Terverifikasi"),
+        ("status_verifikasi", "Status Verifikasi"),
+        ("last_activity", "Aktivitas Terakhir (UTC)"),
+        ("created_at", "Dibuat (UTC)"),
+    ]
+
+    def stream_users_for_export(self, search: str = None, role_filter: str = None):
+        """Async iterator batch user (dict) untuk export, filter sama dengan get_all_users."""
+        logger.info(f"Export user: search={search!r}, role={role_filter!r}")
+        return self.repository.stream_users(
+            columns=[getattr(User, key).label(key) for key, _ in self.EXPORT_COLUMNS],
+            search=search,
+            role_filter=role_filter
+        )
+
+    async def get_user_by_id(self, user_id: int):
+        logger.info(f"Mengambil detail user dengan ID: {user_id}")
+
+        user = await self.repository.get_user_by_id(user_id)
+
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User tidak ditemukan"
+            )
+
+        return user
+
+    async def toggle_user_active(self, admin_user, user_id: int, is_active: bool):
+        if admin_user.role_name != "Super Admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Hanya Super Admin yang dapat mengubah status user"
+            )
+
+        target_user = await self.repository.get_user_by_id(user_id)
+        if not target_user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User tidak ditemukan"
+            )
+
+        if target_user.id == admin_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Tidak dapat mengubah status akun Anda sendiri"
+            )
+
+        action = "diaktifkan" if is_active else "dinonaktifkan"
+        logger.info(f"Admin {admin_user.id} mengubah status user {user_id} menjadi: {action}")
+
+        async with self.repository.unit_of_work():
+            updated_user = await self.repository.toggle_user_active(user_id, is_active)
+
+            # Jika dinonaktifkan, increment token version untuk force logout
+            if not is_active:
+                await self.repository.increment_token_version(user_id)
+                logger.info(f"Token version user {user_id} di-increment (force logout)")
+
+        return updated_user
+
+    async def bulk_toggle_user_active(self, admin_user, user_ids: list, is_active: bool):
+        if admin_user.role_name != "Super Admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Hanya Super Admin yang dapat mengubah status user"
+            )
+
+        user_ids = list(dict.fromkeys(user_ids))
+        action = "diaktifkan" if is_active else "dinonaktifkan"
+        logger.info(f"Admin {admin_user.id} mengubah status {len(user_ids)} user menjadi: {action}")
+
+        target_ids = [user_id for user_id in user_ids if user_id != admin_user.id]
+        rows = await self.repository.bulk_set_users_active(target_ids, is_active)
+
+        # Urutan mengikuti request; RETURNING tidak menjamin urutan
+        returned_ids = {row.id for row in rows}
+        processed_ids = [user_id for user_id in user_ids if user_id in returned_ids]
+        existing_ids = await self.repository.get_existing_user_ids(
+            list(set(target_ids) - set(processed_ids))
+        )
+        reasons = {user_id: f"User sudah {action}" for user_id in existing_ids}
+        reasons[admin_user.id] = "Tidak dapat mengubah status akun Anda sendiri"
+
+        return processed_ids, self._bulk_skipped(user_ids, processed_ids, reasons)
+
+    async def create_user_by_admin(self, admin_user, user_data: AdminUserCreate):
+        if admin_user.role_name != "Super Admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Hanya Super Admin yang dapat membuat user"
+            )
+
+        logger.info(f"Admin {admin_user.id} membuat user baru: {user_data.email}")
+
+        await self._validate_user_identity_available(user_data.nip, user_data.username, user_data.email)
+
+        hashed_password = await get_password_hash_async(user_data.password)
+
+        self._enqueue_account_created_email(user_data)
+        try:
+            new_user = await self.repository.create_user_by_admin(
+                user_data=user_data.model_dump(exclude={'password'}),
+                hashed_password=hashed_password
+            )
+        except IntegrityError as e:
+            self._raise_for_duplicate_user(e)
+
+        logger.info(f"User berhasil dibuat oleh admin dengan id: {new_user.id}")
+
+        return new_user
+
+    def _enqueue_account_created_email(self, user_data: AdminUserCreate):
+        self.repository.enqueue_email(
+            "send_account_created_by_admin_email",
+            user_data.email,
+            email=user_data.email,
+            user_display_name=user_data.full_name,
+            username=user_data.username,
+            temporary_password=user_data.password
+        )
+
+    # Kolom file import user: (field AdminUserImportRow, judul kolom).
+    # Tanpa password: user mengatur sendiri lewat link set password, kolom
+    # Password pada file lama diabaikan
+    IMPORT_COLUMNS = [
+        ("nip", "NIP"),
+        ("username", "Username"),
+        ("email", "Email"),
+        ("full_name", "Nama Lengkap"),
+        ("jabatan", "Jabatan"),
+        ("organization", "Instansi"),
+        ("no_telepon", "No. Telepon"),
+        ("role_name", "Role"),
+    ]
+
+    def _format_import_errors(self, error: ValidationError) -> list:
+        titles = dict(self.IMPORT_COLUMNS)
+        messages = []
+        for item in error.errors():
+            field = item["loc"][0] if item["loc"] else None
+            message = "wajib diisi" if item["type"] == "missing" else item["msg"].removeprefix("Value error, ")
+            messages.append(f"{titles.get(field, field)}: {message}" if field else message)
+        return messages
+
+    async def import_users_from_xlsx(self, admin_user, content: bytes, dry_run: bool = False):
+        """Import user dari XLSX: validasi semua baris, cek duplikat sekali jalan,
+        lalu insert per batch dalam satu transaksi.
+
+        User dibuat tanpa password (tanpa bcrypt di dalam request) dan email
+        set password masuk outbox di transaksi yang sama, seperti bulk approve.
+        Baris yang gagal validasi dilewati dan dilaporkan; baris valid tetap dibuat.
+        """
+        if admin_user.role_name != "Super Admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Hanya Super Admin yang dapat membuat user"
+            )
+
+        try:
+            rows = await run_in_threadpool(
+                read_xlsx_rows, content, self.IMPORT_COLUMNS, settings.USER_IMPORT_MAX_ROWS
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        if not rows:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File tidak berisi data user"
+            )
+
+        logger.info(f"Admin {admin_user.id} mengimport {len(rows)} baris user (dry_run={dry_run})")
+
+        results = []
+        valid = []
+        first_seen = {"nip": {}, "username": {}, "email": {}}
+        for row_number, data in rows:
+            # Telepon yang diketik sebagai angka kehilangan 0 di depan
+            phone = data.get("no_telepon")
+            if phone and phone.startswith("8"):
+                data["no_telepon"] = f"0{phone}"
+
+            result = {
+                "row": row_number,
+                "status": "valid",
+                "nip": data.get("nip"),
+                "username": data.get("username"),
+                "email": data.get("email"),
+                "user_id": None,
+                "errors": []
+            }
+            results.append(result)
+
+            try:
+                # Sel kosong dilaporkan sebagai "wajib diisi", bukan salah tipe
+                user_data = AdminUserImportRow(**{key: value for key, value in data.items() if value is not None})
+            except ValidationError as e:
+                result["status"] = "failed"
+                result["errors"] = self._format_import_errors(e)
+                continue
+
+            result["email"] = user_data.email
+            for field, label in (("nip", "NIP"), ("username", "Username"), ("email", "Email")):
+                value = getattr(user_data, field)
+                if value in first_seen[field]:
+                    result["errors"].append(f"{label} duplikat dengan baris {first_seen[field][value]}")
+                else:
+                    first_seen[field][value] = row_number
+
+            if result["errors"]:
+                result["status"] = "failed"
+            else:
+                valid.append((result, user_data))
+
+        if valid:
+            existing = await self.repository.get_existing_identities(
+                nips=[user_data.nip for _, user_data in valid],
+                usernames=[user_data.username for _, user_data in valid],
+                emails=[user_data.email for _, user_data in valid]
+            )
+            taken = {
+                "nip": {row.nip for row in existing},
+                "username": {row.username for row in existing},
+                "email": {row.email for row in existing}
+            }
+            remaining = []
+            for result, user_data in valid:
+                for field, label in (("nip", "NIP"), ("username", "Username"), ("email", "Email")):
+                    if getattr(user_data, field) in taken[field]:
+                        result["errors"].append(f"{label} sudah terdaftar")
+                if result["errors"]:
+                    result["status"] = "failed"
+                else:
+                    remaining.append((result, user_data))
+            valid = remaining
+
+        created = 0
+        if valid and not dry_run:
+            raw_tokens = {user_data.email: secrets.token_urlsafe(48) for _, user_data in valid}
+            expires_at = datetime.now(timezone.utc) + timedelta(
+                hours=self.SET_PASSWORD_TOKEN_EXPIRY_HOURS
+            )
+            try:
+                inserted = await self.repository.bulk_create_users_by_admin(
+                    [user_data.model_dump() for _, user_data in valid],
+                    token_hashes={email: self._create_token_hash(token) for email, token in raw_tokens.items()},
+                    raw_tokens=raw_tokens,
+                    expires_at=expires_at,
+                    batch_size=settings.USER_IMPORT_BATCH_SIZE
+                )
+            except IntegrityError as e:
+                # Bentrok dengan user yang dibuat bersamaan setelah pengecekan di atas
+                logger.warning(f"Import user dibatalkan karena data duplikat: {str(e.orig)}")
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Sebagian data sudah terdaftar saat import berjalan, silakan ulangi import"
+                )
+
+            user_ids = {row.email: row.id for row in inserted}
+            for result, user_data in valid:
+                result["status"] = "created"
+                result["user_id"] = user_ids.get(user_data.email)
+            created = len(valid)
+
+            logger.info(f"Import user selesai: {created} user dibuat oleh admin {admin_user.id}")
+
+        return {
+            "dry_run": dry_run,
+            "total_rows": len(results),
+            "created": created,
+            "failed": sum(1 for result in results if result["status"] == "failed"),
+            "rows": results
+        }
+
+    async def update_user_by_admin(self, admin_user, user_id: int, update_data: AdminUserUpdate):
+        if admin_user.role_name != "Super Admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Hanya Super Admin yang dapat mengubah data user"
+            )
+
+        target_user = await self.repository.get_user_by_id(user_id)
+        if not target_user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User tidak ditemukan"
+            )
+
+        logger.info(f"Admin {admin_user.id} mengupdate user {user_id}")
+
+        if update_data.username and update_data.username != target_user.username:
+            existing = await self.repository.get_user_by_username(update_data.username)
+            if existing and existing.id != user_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Username sudah digunakan oleh akun lain"
+                )
+
+        if update_data.email and update_data.email != target_user.email:
+            existing = await self.repository.get_user_by_email(update_data.email)
+            if existing and existing.id != user_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Email sudah digunakan oleh akun lain"
+                )
+
+        if update_data.nip and update_data.nip != target_user.nip:
+            existing = await self.repository.get_user_by_nip(update_data.nip)
+            if existing and existing.id != user_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="NIP sudah digunakan oleh akun lain"
+                )
+
+        update_dict = update_data.model_dump(exclude_none=True)
+        updated_user = await self.repository.update_user_by_admin(user_id, update_dict)
+
+        logger.info(f"User {user_id} berhasil diupdate oleh admin {admin_user.id}")
+        return updated_user
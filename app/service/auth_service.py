@@ -1,3 +1,4 @@
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from app.repository.auth_repository import AuthRepository
@@ -14,12 +15,10 @@ from app.utils.auth_util import (
     get_password_hash,
     create_access_token,
 )
-from app.utils.email_util import (
-    send_reset_password_email,
-    send_registration_confirmation_email,
-    send_set_password_email,
-    send_password_changed_notification
-)
+from app.utils.activity_tracker_util import activity_tracker
+from app.utils.integrity_util import unique_violation_column
+from app.utils.token_lifecycle_util import get_live_token
+from app.utils.session_store_util import start_session, end_session
 import hashlib
 import secrets
 import logging
@@ -27,39 +26,81 @@ import logging
 logger = logging.getLogger(__name__)
 
 class AuthService:
-    
+    """Service auth di atas Session sync.
+
+    Email tidak dikirim di dalam request: ditulis ke outbox dalam transaksi
+    yang sama dan dikirim oleh worker (app.email_worker).
+    """
+
     ALLOWED_ROLES = ["Super Admin", "Eksekutif"]
     DEFAULT_ROLE_AFTER_APPROVAL = "Eksekutif"
     PASSWORD_RESET_TOKEN_EXPIRY_HOURS = 1
     SET_PASSWORD_TOKEN_EXPIRY_HOURS = 24
+    # Pesan per kolom unik users, dipakai untuk pre-check maupun IntegrityError
+    USER_UNIQUE_MESSAGES = {
+        "nip": "NIP sudah terdaftar",
+        "username": "Username sudah terdaftar",
+        "email": "Email sudah terdaftar",
+    }
     
     def __init__(self, db: Session):
         self.repository = AuthRepository(db)
 
-    def _validate_user_exists_by_nip(self, nip: str):
-        existing_nip = self.repository.get_user_by_nip(nip)
-        if existing_nip:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="NIP sudah terdaftar"
-            )
-    
-    def _validate_user_exists_by_username(self, username: str):
-        existing_user = self.repository.get_user_by_username(username)
-        if existing_user:
+    def _raise_for_existing_identity(self, rows, nip: str, username: str, email: str):
+        for column, value in (("nip", nip), ("username", username), ("email", email)):
+            if any(getattr(row, column) == value for row in rows):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=self.USER_UNIQUE_MESSAGES[column]
+                )
+
+    def _raise_for_duplicate_user(self, error: IntegrityError):
+        """Ubah unique violation users.nip/username/email menjadi 400 dengan pesan per kolom."""
+        column = unique_violation_column(error, self.USER_UNIQUE_MESSAGES)
+        if column is None:
+            raise error
+        logger.warning(f"Insert user ditolak constraint unik kolom {column}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=self.USER_UNIQUE_MESSAGES[column]
+        )
+
+    def _validate_token_record(self, token, invalid_detail: str):
+        if not token:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username sudah terdaftar"
+                detail=invalid_detail
             )
-    
-    def _validate_user_exists_by_email(self, email: str):
-        existing_email = self.repository.get_user_by_email(email)
-        if existing_email:
+
+        if token.used_at:
+            self._raise_token_already_used()
+
+        if token.expires_at < datetime.now(timezone.utc):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email sudah terdaftar"
+                detail="Token sudah kadaluarsa"
             )
 
+    def _raise_token_already_used(self):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Token sudah pernah digunakan"
+        )
+
+    def _get_usable_token(self, token_hash: str, invalid_detail: str):
+        """(token_id, user_id) token reset/set password yang masih berlaku; Redis dulu, lalu DB."""
+        live = get_live_token(token_hash)
+        if live:
+            return live
+        token = self.repository.get_reset_token(token_hash)
+        self._validate_token_record(token, invalid_detail)
+        return token.id, token.user_id
+
+    def _validate_user_identity_available(self, nip: str, username: str, email: str):
+        """Satu query OR untuk NIP/username/email, sebelum langkah mahal seperti hashing password."""
+        rows = self.repository.get_existing_identities([nip], [username], [email])
+        self._raise_for_existing_identity(rows, nip, username, email)
+
     def _validate_user_status(self, user):
         if not user.is_active:
             logger.error(f"User {user.id} tidak aktif")
@@ -87,13 +128,14 @@ class AuthService:
 
     def _generate_access_token(self, user) -> dict:
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={
-                "sub": user.username,
-                "ver": user.token_version
-            },
-            expires_delta=access_token_expires
-        )
+        data = {
+            "sub": user.username,
+            "uid": user.id,
+            "ver": user.token_version
+        }
+        if start_session(user.id, user.token_version):
+            data["ses"] = True
+        access_token = create_access_token(data=data, expires_delta=access_token_expires)
         
         return {
             "access_token": access_token,
@@ -105,40 +147,35 @@ class AuthService:
         """Registrasi user baru tanpa password"""
         logger.info(f"Memulai registrasi user: {user.email}")
         
-        self._validate_user_exists_by_nip(user.nip)
-        self._validate_user_exists_by_username(user.username)
-        self._validate_user_exists_by_email(user.email)
-        
-        new_user = self.repository.create_user_without_password(user)
-        logger.info(f"User berhasil dibuat dengan id: {new_user.id}")
-        
-        try:
-            send_registration_confirmation_email(
-                email=new_user.email,
-                user_display_name=new_user.full_name
-            )
-            logger.info(f"Email konfirmasi registrasi terkirim ke: {new_user.email}")
-        except Exception as e:
-            logger.warning(f"Gagal mengirim email konfirmasi registrasi: {str(e)}")
+        # Email masuk outbox dan ikut commit pembuatan user
+        self.repository.enqueue_email(
+            "send_registration_confirmation_email",
+            user.email,
+            email=user.email,
+            user_display_name=user.full_name
+        )
+        self.repository.enqueue_email(
+            "send_admin_notification_new_registration",
+            settings.ADMIN_NOTIFICATION_EMAIL,
+            user_data={
+                'nip': user.nip,
+                'username': user.username,
+                'email': user.email,
+                'full_name': user.full_name,
+                'jabatan': user.jabatan,
+                'organization': user.organization,
+                'no_telepon': user.no_telepon,
+                'created_at': datetime.now(timezone.utc).strftime('%d %B %Y, %H:%M WIB')
+            }
+        )
         
+        # Duplikat NIP/username/email ditolak constraint unik, tanpa SELECT terpisah;
+        # email di outbox ikut di-rollback
         try:
-            from app.utils.email_util import send_admin_notification_new_registration
-            
-            user_data = {
-                'nip': new_user.nip,
-                'username': new_user.username,
-                'email': new_user.email,
-                'full_name': new_user.full_name,
-                'jabatan': new_user.jabatan,
-                'organization': new_user.organization,
-                'no_telepon': new_user.no_telepon,
-                'created_at': new_user.created_at.strftime('%d %B %Y, %H:%M WIB') if new_user.created_at else '-'
-            }
-            
-            send_admin_notification_new_registration(user_data)
-            logger.info(f"Notifikasi admin terkirim ke: {settings.ADMIN_NOTIFICATION_EMAIL}")
-        except Exception as e:
-            logger.warning(f"Gagal mengirim notifikasi ke admin: {str(e)}")
+            new_user = self.repository.create_user_without_password(user)
+        except IntegrityError as e:
+            self._raise_for_duplicate_user(e)
+        logger.info(f"User berhasil dibuat dengan id: {new_user.id}")
         
         return new_user
 
@@ -170,7 +207,7 @@ class AuthService:
         
         self._validate_user_status(user)
         
-        self.repository.update_last_activity(user.id)
+        activity_tracker.touch(user.id)
         
         logger.info(f"Login berhasil untuk user: {user.username}")
         return self._generate_access_token(user)
@@ -178,6 +215,7 @@ class AuthService:
     def logout_user(self, user):
         logger.info(f"User {user.id} melakukan logout")
         self.repository.increment_token_version(user.id)
+        end_session(user.id, user.token_version)
 
     def update_user_profile(self, user, payload: ProfileUpdateRequest):
         """Update profil user"""
@@ -212,18 +250,15 @@ class AuthService:
         
         new_hashed = get_password_hash(payload.new_password)
         
-        self.repository.change_password(user.id, new_hashed)
-        
-        self.repository.increment_token_version(user.id)
-        
-        try:
-            send_password_changed_notification(
+        with self.repository.unit_of_work():
+            self.repository.enqueue_email(
+                "send_password_changed_notification",
+                user.email,
                 email=user.email,
                 user_display_name=user.full_name
             )
-            logger.info(f"Notifikasi perubahan password terkirim ke {user.email}")
-        except Exception as e:
-            logger.warning(f"Gagal mengirim notifikasi perubahan password: {str(e)}")
+            self.repository.change_password(user.id, new_hashed)
+            self.repository.increment_token_version(user.id)
 
     def request_password_reset(self, payload: ForgotPasswordRequest) -> bool:
         logger.info(f"Request reset password untuk email: {payload.email}")
@@ -236,8 +271,6 @@ class AuthService:
         
         is_admin = user.role_name == "Super Admin"
         
-        self.repository.mark_reset_tokens_used(user.id)
-        
         raw_token = secrets.token_urlsafe(48)
         token_hash = self._create_token_hash(raw_token)
         
@@ -245,21 +278,18 @@ class AuthService:
             hours=self.PASSWORD_RESET_TOKEN_EXPIRY_HOURS
         )
         
-        self.repository.create_reset_token(
-            user_id=user.id,
-            token_hash=token_hash,
-            expires_at=expires_at
-        )
-        
-        # Kirim email
-        try:
-            send_reset_password_email(user.email, raw_token)
-            logger.info(f"Email reset password terkirim ke: {user.email}")
-        except Exception as e:
-            logger.error(f"Gagal mengirim email reset password: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Gagal mengirim email reset password"
+        with self.repository.unit_of_work():
+            self.repository.mark_reset_tokens_used(user.id)
+            self.repository.enqueue_email(
+                "send_reset_password_email",
+                user.email,
+                email=user.email,
+                reset_token=raw_token
+            )
+            self.repository.create_reset_token(
+                user_id=user.id,
+                token_hash=token_hash,
+                expires_at=expires_at
             )
         
         return is_admin
@@ -268,35 +298,19 @@ class AuthService:
         logger.info("Memproses reset password")
         
         token_hash = self._create_token_hash(payload.token)
-        reset_token = self.repository.get_reset_token(token_hash)
-        
-        # Validasi token
-        if not reset_token:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Token reset password tidak valid"
-            )
-        
-        if reset_token.used_at:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Token sudah pernah digunakan"
-            )
-        
-        if reset_token.expires_at < datetime.now(timezone.utc):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Token sudah kadaluarsa"
-            )
+        token_id, user_id = self._get_usable_token(token_hash, "Token reset password tidak valid")
         
         new_hashed = get_password_hash(payload.new_password)
-        self.repository.change_password(reset_token.user_id, new_hashed)
-        
-        self.repository.mark_token_used(reset_token.id)
         
-        self.repository.increment_token_version(reset_token.user_id)
+        # Password, token terpakai dan token_version dalam satu transaksi:
+        # token tidak bisa dipakai ulang jika salah satu langkah gagal
+        with self.repository.unit_of_work():
+            if not self.repository.mark_token_used(token_id):
+                self._raise_token_already_used()
+            self.repository.change_password(user_id, new_hashed)
+            self.repository.increment_token_version(user_id)
         
-        logger.info(f"Password berhasil direset untuk user {reset_token.user_id}")
+        logger.info(f"Password berhasil direset untuk user {user_id}")
 
     def change_user_role(self, acting_user, target_user_id: int, role_name: str):
         """Ubah role user - Super Admin only"""
@@ -322,9 +336,7 @@ class AuthService:
 
     def get_pending_users_for_verification(self, limit: int = 50, offset: int = 0):
         """Dapatkan daftar user yang menunggu verifikasi"""
-        users = self.repository.get_pending_users(limit, offset)
-        total = self.repository.count_pending_users()
-        return users, total
+        return self.repository.get_pending_users_with_total(limit, offset)
     
     def verify_user(self, current_user, user_id: int, payload):
         """Verifikasi user - approve atau reject"""
@@ -356,12 +368,6 @@ class AuthService:
             )
 
     def _approve_user(self, target_user, admin_id: int, notes: str):
-        approved_user = self.repository.approve_user(
-            user_id=target_user.id,
-            verified_by=admin_id,
-            notes=notes
-        )
-        
         raw_token = secrets.token_urlsafe(48)
         token_hash = self._create_token_hash(raw_token)
         
@@ -369,31 +375,35 @@ class AuthService:
             hours=self.SET_PASSWORD_TOKEN_EXPIRY_HOURS
         )
         
-        self.repository.create_set_password_token(
-            user_id=target_user.id,
-            token_hash=token_hash,
-            expires_at=expires_at
-        )
-        
-        try:
-            send_set_password_email(
+        with self.repository.unit_of_work():
+            approved_user = self.repository.approve_user(
+                user_id=target_user.id,
+                verified_by=admin_id,
+                notes=notes
+            )
+            self.repository.enqueue_email(
+                "send_set_password_email",
+                approved_user.email,
                 email=approved_user.email,
                 set_password_token=raw_token,
                 user_display_name=approved_user.full_name
             )
-            logger.info(f"Email set password terkirim ke: {approved_user.email}")
-        except Exception as e:
-            logger.error(f"Gagal mengirim email set password: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Gagal mengirim email set password"
+            self.repository.create_set_password_token(
+                user_id=target_user.id,
+                token_hash=token_hash,
+                expires_at=expires_at
             )
         
         return approved_user
 
     def _reject_user(self, target_user, admin_id: int, notes: str):
-        from app.utils.email_util import send_registration_rejection_email
-        
+        self.repository.enqueue_email(
+            "send_registration_rejection_email",
+            target_user.email,
+            email=target_user.email,
+            user_display_name=target_user.full_name,
+            rejection_notes=notes
+        )
         rejected_user = self.repository.reject_user(
             user_id=target_user.id,
             verified_by=admin_id,
@@ -401,49 +411,21 @@ class AuthService:
         )
         logger.info(f"User {target_user.id} ditolak oleh admin {admin_id}")
         
-        try:
-            send_registration_rejection_email(
-                email=rejected_user.email,
-                user_display_name=rejected_user.full_name,
-                rejection_notes=notes
-            )
-            logger.info(f"Email rejection notification terkirim ke: {rejected_user.email}")
-        except Exception as e:
-            logger.error(f"Gagal mengirim email rejection notification: {str(e)}")
-        
         return rejected_user
 
     def set_password_from_token(self, payload):
         logger.info("Memproses set password dari token")
         
         token_hash = self._create_token_hash(payload.token)
-        token_record = self.repository.get_set_password_token(token_hash)
-        
-        # Validasi token
-        if not token_record:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Token tidak valid"
-            )
-        
-        if token_record.used_at:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Token sudah pernah digunakan"
-            )
-        
-        if token_record.expires_at < datetime.now(timezone.utc):
-            raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Token sudah kadaluarsa"
-            )
+        token_id, user_id = self._get_usable_token(token_hash, "Token tidak valid")
         
         hashed_password = get_password_hash(payload.password)
-        self.repository.set_user_password(token_record.user_id, hashed_password)
+        with self.repository.unit_of_work():
+            if not self.repository.mark_set_password_token_used(token_id):
+                self._raise_token_already_used()
+            self.repository.set_user_password(user_id, hashed_password)
     
-        self.repository.mark_set_password_token_used(token_record.id)
-    
-        logger.info(f"Password berhasil di-set untuk user {token_record.user_id}")
+        logger.info(f"Password berhasil di-set untuk user {user_id}")
 
     
     # ===================MANAGEMENT PENEGGUNA==========================
@@ -501,12 +483,13 @@ class AuthService:
         action = "diaktifkan" if is_active else "dinonaktifkan"
         logger.info(f"Admin {admin_user.id} mengubah status user {user_id} menjadi: {action}")
         
-        updated_user = self.repository.toggle_user_active(user_id, is_active)
-        
-        # ✨ Jika dinonaktifkan, increment token version untuk force logout
-        if not is_active:
-            self.repository.increment_token_version(user_id)
-            logger.info(f"Token version user {user_id} di-increment (force logout)")
+        with self.repository.unit_of_work():
+            updated_user = self.repository.toggle_user_active(user_id, is_active)
+            
+            # ✨ Jika dinonaktifkan, increment token version untuk force logout
+            if not is_active:
+                self.repository.increment_token_version(user_id)
+                logger.info(f"Token version user {user_id} di-increment (force logout)")
         
         return updated_user
 
@@ -520,30 +503,27 @@ class AuthService:
         
         logger.info(f"Admin {admin_user.id} membuat user baru: {user_data.email}")
         
-        self._validate_user_exists_by_nip(user_data.nip)
-        self._validate_user_exists_by_username(user_data.username)
-        self._validate_user_exists_by_email(user_data.email)
+        self._validate_user_identity_available(user_data.nip, user_data.username, user_data.email)
         
         hashed_password = get_password_hash(user_data.password)
         
-        new_user = self.repository.create_user_by_admin(
-            user_data=user_data.dict(exclude={'password'}),
-            hashed_password=hashed_password
+        self.repository.enqueue_email(
+            "send_account_created_by_admin_email",
+            user_data.email,
+            email=user_data.email,
+            user_display_name=user_data.full_name,
+            username=user_data.username,
+            temporary_password=user_data.password
         )
-        
-        logger.info(f"User berhasil dibuat oleh admin dengan id: {new_user.id}")
-        
         try:
-            from app.utils.email_util import send_account_created_by_admin_email
-            send_account_created_by_admin_email(
-                email=new_user.email,
-                user_display_name=new_user.full_name,
-                username=new_user.username,
-                temporary_password=user_data.password  # ✨ Kirim password temporary
+            new_user = self.repository.create_user_by_admin(
+                user_data=user_data.dict(exclude={'password'}),
+                hashed_password=hashed_password
             )
-            logger.info(f"Email notifikasi akun terkirim ke: {new_user.email}")
-        except Exception as e:
-            logger.warning(f"Gagal mengirim email notifikasi: {str(e)}")
+        except IntegrityError as e:
+            self._raise_for_duplicate_user(e)
+        
+        logger.info(f"User berhasil dibuat oleh admin dengan id: {new_user.id}")
         
         return new_user
 
@@ -0,0 +1,22 @@
+import argparse
+import logging
+from app.config import settings
+from app.utils.email_outbox_util import email_outbox
+from app.utils.token_lifecycle_util import purge_stale_tokens
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Hapus token reset/set password yang sudah terpakai atau kadaluarsa "
+                                                 "dan email outbox sent/dead yang melewati retensi")
+    parser.add_argument("--retention-hours", type=int, default=settings.TOKEN_PURGE_RETENTION_HOURS,
+                        help="Token terpakai/kadaluarsa lebih lama dari ini akan dihapus")
+    parser.add_argument("--batch-size", type=int, default=settings.TOKEN_PURGE_BATCH_SIZE)
+    parser.add_argument("--email-retention-hours", type=int, default=settings.EMAIL_OUTBOX_RETENTION_HOURS,
+                        help="Email sent/dead lebih lama dari ini akan dihapus dari outbox")
+    args = parser.parse_args()
+
+    deleted = purge_stale_tokens(retention_hours=args.retention_hours, batch_size=args.batch_size)
+    print(f"{deleted} token dihapus")
+    purged = email_outbox.purge(retention_hours=args.email_retention_hours, batch_size=args.batch_size)
+    print(f"{purged} email outbox dihapus")
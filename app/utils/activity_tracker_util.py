@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from redis.exceptions import RedisError
+from sqlalchemy import text
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTracker:
+    """Write-behind untuk kolom users.last_activity.
+
+    Setiap request hanya mencatat timestamp ke Redis (atau memori lokal jika
+    Redis tidak tersedia). Timestamp yang tertunda di-flush ke Postgres secara
+    berkala dalam satu statement UPDATE ... FROM (VALUES ...).
+    """
+
+    PENDING_KEY = "auth:activity:pending"
+    LAST_SEEN_KEY = "auth:activity:last_seen"
+    FLUSH_BATCH_SIZE = 500
+
+    def __init__(self, flush_interval_seconds: int):
+        self.flush_interval_seconds = flush_interval_seconds
+        self._lock = threading.Lock()
+        self._local_pending: Dict[int, datetime] = {}
+        self._local_last_seen: Dict[int, datetime] = {}
+        self._last_flush = time.monotonic()
+
+    def touch(self, user_id: int, at: Optional[datetime] = None) -> datetime:
+        at = at or datetime.now(timezone.utc)
+        try:
+            pipe = settings.REDIS.pipeline(transaction=False)
+            pipe.hset(self.LAST_SEEN_KEY, user_id, at.isoformat())
+            pipe.expire(self.LAST_SEEN_KEY, settings.SESSION_EXPIRE_MINUTES * 60 * 2)
+            pipe.hset(self.PENDING_KEY, user_id, at.isoformat())
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Activity tracker fallback ke memori lokal: {str(e)}")
+            with self._lock:
+                self._local_pending[user_id] = at
+                self._local_last_seen[user_id] = at
+        return at
+
+    def get_last_activity(self, user_id: int, fallback: Optional[datetime] = None) -> Optional[datetime]:
+        candidates = [fallback, self._local_last_seen.get(user_id)]
+        try:
+            raw = settings.REDIS.hget(self.LAST_SEEN_KEY, user_id)
+            if raw:
+                candidates.append(datetime.fromisoformat(raw))
+        except RedisError as e:
+            logger.warning(f"Gagal membaca last activity user {user_id} dari Redis: {str(e)}")
+
+        candidates = [c for c in candidates if c is not None]
+        return max(candidates) if candidates else None
+
+    def _drain(self) -> Dict[int, datetime]:
+        with self._lock:
+            pending = dict(self._local_pending)
+            self._local_pending.clear()
+
+        try:
+            pipe = settings.REDIS.pipeline(transaction=True)
+            pipe.hgetall(self.PENDING_KEY)
+            pipe.delete(self.PENDING_KEY)
+            raw_pending, _ = pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Gagal mengambil antrian activity dari Redis: {str(e)}")
+            raw_pending = {}
+
+        for user_id, raw in raw_pending.items():
+            user_id = int(user_id)
+            at = datetime.fromisoformat(raw)
+            if user_id not in pending or pending[user_id] < at:
+                pending[user_id] = at
+        return pending
+
+    def _requeue(self, pending: Dict[int, datetime]):
+        with self._lock:
+            for user_id, at in pending.items():
+                current = self._local_pending.get(user_id)
+                if current is None or current < at:
+                    self._local_pending[user_id] = at
+
+    def _bulk_update(self, db, items: list):
+        values = ", ".join(
+            f"(:id_{i}, CAST(:ts_{i} AS TIMESTAMPTZ))" for i in range(len(items))
+        )
+        params = {}
+        for i, (user_id, at) in enumerate(items):
+            params[f"id_{i}"] = user_id
+            params[f"ts_{i}"] = at
+
+        db.execute(
+            text(
+                f"""
+                UPDATE users AS u
+                SET last_activity = v.last_activity
+                FROM (VALUES {values}) AS v(id, last_activity)
+                WHERE u.id = v.id
+                  AND (u.last_activity IS NULL OR u.last_activity < v.last_activity)
+                """
+            ),
+            params
+        )
+
+    def _prune_local_last_seen(self):
+        # Entry di luar jendela sesi hanya bisa berarti "sesi habis", sama
+        # seperti last_activity di DB, jadi aman dibuang
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=settings.SESSION_EXPIRE_MINUTES)
+        with self._lock:
+            stale = [user_id for user_id, at in self._local_last_seen.items() if at < cutoff]
+            for user_id in stale:
+                del self._local_last_seen[user_id]
+
+    def flush(self) -> int:
+        from app.database import SessionLocal
+
+        self._prune_local_last_seen()
+        pending = self._drain()
+        if not pending:
+            return 0
+
+        items = sorted(pending.items())
+        db = SessionLocal()
+        try:
+            for start in range(0, len(items), self.FLUSH_BATCH_SIZE):
+                self._bulk_update(db, items[start:start + self.FLUSH_BATCH_SIZE])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Gagal flush last activity ({len(items)} user): {str(e)}")
+            self._requeue(pending)
+            return 0
+        finally:
+            db.close()
+
+        logger.debug(f"Flush last activity untuk {len(items)} user")
+        return len(items)
+
+    def flush_due(self) -> bool:
+        """Klaim jadwal flush; True jika pemanggil yang harus menjalankan flush."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_flush < self.flush_interval_seconds:
+                return False
+            self._last_flush = now
+        return True
+
+    def maybe_flush(self) -> int:
+        if not self.flush_due():
+            return 0
+        return self.flush()
+
+
+activity_tracker = ActivityTracker(settings.ACTIVITY_FLUSH_INTERVAL_SECONDS)
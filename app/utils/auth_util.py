@@ -1,32 +1,47 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.config import settings
-from passlib.context import CryptContext
+from app.utils.principal_cache_util import CachedPrincipal, get_cached_principal, cache_principal
+from app.utils.activity_tracker_util import activity_tracker
+from app.utils.token_cache_util import token_cache
+from app.utils.session_store_util import start_session, touch_session
+from app.utils.token_registry_util import (
+    get_token_version,
+    remember_token_version,
+    is_registry_ready,
+    warm_token_registry,
+)
+from app.utils.password_hasher_util import (
+    hash_password,
+    check_password,
+    hash_password_async,
+    check_password_async,
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-try:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    pwd_context.hash("test")
-except Exception:
-    pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
-
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return check_password(plain_password, hashed_password)
 
 def get_password_hash(password):
-    if len(password) > 72:
-        password = password[:72]
-    return pwd_context.hash(password)
+    return hash_password(password)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await check_password_async(plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await hash_password_async(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -41,46 +56,95 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 def decode_token(token: str) -> dict:
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        payload = token_cache.get(token)
+        if payload is None:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+            token_cache.put(token, payload)
         username: str = payload.get("sub")
         token_version: int = payload.get("ver", 0)
+        user_id: Optional[int] = payload.get("uid")
         
         if username is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Kredensial Tidak Valid"
             )
-        return {"username": username, "ver": token_version}
+        return {
+            "username": username,
+            "ver": token_version,
+            "uid": user_id,
+            # Token dari login dengan sesi Redis; token lama tetap memakai last_activity
+            "ses": bool(payload.get("ses"))
+        }
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Kredensial tidak valid"
         )
     
+def _raise_session_expired():
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Sesi Anda telah berakhir karena tidak ada aktivitas. Silakan login kembali."
+    )
+
 def check_session_validity(user):
-    if user.last_activity is None:
+    last_activity = activity_tracker.get_last_activity(user.id, user.last_activity)
+    if last_activity is None:
         return True
     
-    time_diff = datetime.now(timezone.utc) - user.last_activity
+    time_diff = datetime.now(timezone.utc) - last_activity
     session_expire = timedelta(minutes=settings.SESSION_EXPIRE_MINUTES)
     
     if time_diff > session_expire:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Sesi Anda telah berakhir karena tidak ada aktivitas. Silakan login kembali."
-        )
+        _raise_session_expired()
     return True
 
-def update_last_activity(db: Session, user):
+def update_last_activity(db: Session, user, last_activity: Optional[datetime] = None):
     from app.domain.models import User
     db.query(User).filter(User.id == user.id).update(
-        {"last_activity": datetime.now(timezone.utc)}
+        {"last_activity": last_activity or datetime.now(timezone.utc)}
     )
     db.commit()
 
+def _raise_token_revoked():
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Token has been revoked"
+    )
+
+def _load_cached_principal(username: str, token_version: int, user_id: Optional[int]):
+    """Tahap Redis sebelum DB: cek revokasi O(1) lewat registry lalu principal cache."""
+    if user_id is not None:
+        registry_version = get_token_version(user_id)
+        if registry_version is not None and registry_version != token_version:
+            _raise_token_revoked()
+    return get_cached_principal(username, token_version)
+
+def _track_authenticated_user(user, token_version: int, use_session_store: bool, from_cache: bool):
+    """Tahap Redis setelah user tervalidasi: sesi, cache principal, registry, aktivitas."""
+    # Sesi Redis: key hidup cukup diperpanjang dengan EXPIRE. Key hilang bisa
+    # karena idle atau flush/restart Redis, jadi dipastikan lewat last_activity
+    # lalu dibuat ulang jika sesi masih berlaku
+    session_alive = use_session_store and touch_session(user.id, token_version)
+    if not session_alive:
+        check_session_validity(user)
+        if use_session_store:
+            start_session(user.id, token_version)
+
+    if not from_cache:
+        remember_token_version(user.id, user.token_version)
+        if not is_registry_ready():
+            warm_token_registry()
+        cache_principal(user)
+    if not session_alive:
+        activity_tracker.touch(user.id)
+    if activity_tracker.flush_due():
+        activity_tracker.flush()
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     from app.domain.models import User
 
@@ -88,8 +152,15 @@ async def get_current_user(
         token_data = decode_token(token)
         username = token_data["username"]
         token_version = token_data["ver"]
-        
-        user = db.query(User).filter(User.username == username).first()
+        user_id = token_data["uid"]
+
+        # Client Redis sync: setiap tahap dijalankan di threadpool agar Redis
+        # yang lambat/mati tidak menahan event loop
+        user = await run_in_threadpool(_load_cached_principal, username, token_version, user_id)
+        from_cache = user is not None
+        if not from_cache:
+            result = await db.execute(select(User).where(User.username == username))
+            user = result.scalars().first()
         
         if user is None:
             raise HTTPException(
@@ -98,19 +169,21 @@ async def get_current_user(
             )
 
         if token_version != user.token_version:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token has been revoked"
-            )
+            _raise_token_revoked()
 
         if not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Pengguna tidak aktif"
             )
-        
-        check_session_validity(user)
-        update_last_activity(db, user)
+
+        await run_in_threadpool(
+            _track_authenticated_user,
+            user,
+            token_version,
+            token_data["ses"] and settings.SESSION_STORE_REDIS,
+            from_cache
+        )
 
         return user
     except HTTPException:
@@ -128,6 +201,25 @@ async def get_current_active_user(current_user = Depends(get_current_user)):
     return current_user
 
 
+async def get_current_user_entity(
+    current_user = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """User lengkap dari DB untuk endpoint yang butuh field di luar snapshot principal"""
+    from app.domain.models import User
+
+    if not isinstance(current_user, CachedPrincipal):
+        return current_user
+
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Pengguna tidak ditemukan"
+        )
+    return user
+
+
 async def get_current_user_with_role(
     current_user = Depends(get_current_active_user)
 ):
@@ -0,0 +1,314 @@
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, delete, func, or_, select, update
+from app.config import settings
+from app.domain.models import EmailOutbox
+from app.utils import email_util
+
+logger = logging.getLogger(__name__)
+
+# Template yang boleh dikirim lewat outbox: nama fungsi di email_util
+EMAIL_TEMPLATES = {
+    fn.__name__: fn
+    for fn in (
+        email_util.send_admin_notification_new_registration,
+        email_util.send_reset_password_email,
+        email_util.send_registration_confirmation_email,
+        email_util.send_set_password_email,
+        email_util.send_password_changed_notification,
+        email_util.send_registration_rejection_email,
+        email_util.send_account_created_by_admin_email,
+    )
+}
+
+# Field payload berisi rahasia (token/password sementara) per template; dihapus
+# saat email terkirim atau masuk dead letter agar tidak tersimpan di tabel
+SECRET_PAYLOAD_FIELDS = {
+    "send_reset_password_email": "reset_token",
+    "send_set_password_email": "set_password_token",
+    "send_account_created_by_admin_email": "temporary_password",
+}
+
+
+def _without_secret(template: str, payload: Optional[dict]) -> Optional[dict]:
+    field = SECRET_PAYLOAD_FIELDS.get(template)
+    if not payload or field is None:
+        return payload
+    return {key: value for key, value in payload.items() if key != field}
+
+
+def _has_secret(template: str, payload: Optional[dict]) -> bool:
+    field = SECRET_PAYLOAD_FIELDS.get(template)
+    return field is None or bool(payload and payload.get(field))
+
+
+def enqueue_email(db, template: str, to_email: str, **payload) -> EmailOutbox:
+    """Tambahkan email ke outbox di session `db` (sync maupun async).
+
+    Tidak melakukan commit: baris ikut commit perubahan bisnis berikutnya
+    dan ikut hilang jika transaksi di-rollback.
+    """
+    if template not in EMAIL_TEMPLATES:
+        raise ValueError(f"Template email tidak dikenal: {template}")
+    entry = EmailOutbox(
+        template=template,
+        to_email=to_email,
+        payload=jsonable_encoder(payload),
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.now(timezone.utc)
+    )
+    db.add(entry)
+    return entry
+
+
+class EmailOutboxDispatcher:
+    """Mengirim email dari outbox dengan retry backoff dan status dead.
+
+    Baris diklaim dengan SELECT ... FOR UPDATE SKIP LOCKED lalu ditandai
+    `sending` dengan lease, sehingga beberapa worker bisa berjalan bersamaan
+    dan baris milik worker yang mati diambil ulang setelah lease habis.
+    Nilai locked_until menjadi tanda kepemilikan: lease diperpanjang per baris
+    tepat sebelum dikirim, dan baris yang sudah diklaim ulang worker lain
+    dilewati. Pengiriman bersifat at-least-once.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        max_attempts: int,
+        backoff_base_seconds: int,
+        backoff_max_seconds: int,
+        lease_seconds: int
+    ):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.lease_seconds = lease_seconds
+
+    def backoff(self, attempts: int) -> timedelta:
+        delay = min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** (attempts - 1))
+        # Jitter agar retry dari banyak email tidak serentak
+        return timedelta(seconds=random.uniform(delay / 2, delay))
+
+    def _claim(self, db) -> list:
+        now = datetime.now(timezone.utc)
+        ids = db.execute(
+            select(EmailOutbox.id).where(or_(
+                and_(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now),
+                and_(EmailOutbox.status == "sending", EmailOutbox.locked_until < now)
+            )).order_by(EmailOutbox.next_attempt_at).limit(self.batch_size).with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not ids:
+            db.rollback()
+            return []
+
+        rows = db.execute(
+            update(EmailOutbox).where(EmailOutbox.id.in_(ids)).values(
+                status="sending",
+                locked_until=now + timedelta(seconds=self.lease_seconds),
+                attempts=EmailOutbox.attempts + 1
+            ).returning(
+                EmailOutbox.id, EmailOutbox.template, EmailOutbox.to_email,
+                EmailOutbox.payload, EmailOutbox.attempts, EmailOutbox.locked_until
+            ).execution_options(synchronize_session=False)
+        ).all()
+        db.commit()
+        return rows
+
+    def _owned(self, row, lease):
+        return and_(
+            EmailOutbox.id == row.id,
+            EmailOutbox.status == "sending",
+            EmailOutbox.locked_until == lease
+        )
+
+    def _renew_lease(self, db, row) -> Optional[datetime]:
+        """Perpanjang lease satu baris sebelum dikirim.
+
+        Lease saat klaim bisa habis sebelum giliran baris di akhir batch
+        (batch_size x timeout SMTP); None jika baris sudah diklaim ulang
+        worker lain sehingga tidak boleh dikirim lagi.
+        """
+        lease = db.execute(
+            update(EmailOutbox).where(self._owned(row, row.locked_until)).values(
+                locked_until=datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+            ).returning(EmailOutbox.locked_until).execution_options(synchronize_session=False)
+        ).scalar()
+        db.commit()
+        return lease
+
+    def _deliver(self, row) -> Optional[str]:
+        """Kirim satu email; kembalikan pesan error atau None jika berhasil."""
+        send = EMAIL_TEMPLATES.get(row.template)
+        if send is None:
+            return f"Template email tidak dikenal: {row.template}"
+        try:
+            # Sebagian fungsi email_util mengembalikan False alih-alih raise
+            if send(**(row.payload or {})) is False:
+                return "Pengiriman email gagal"
+        except Exception as e:
+            return str(e)
+        return None
+
+    def _mark_sent(self, db, row, lease):
+        db.execute(
+            update(EmailOutbox).where(self._owned(row, lease)).values(
+                status="sent",
+                sent_at=datetime.now(timezone.utc),
+                locked_until=None,
+                last_error=None,
+                # Payload bisa berisi token/password sementara; tidak disimpan setelah terkirim
+                payload=None
+            ).execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    def _mark_failed(self, db, row, lease, error: str):
+        if row.attempts >= self.max_attempts:
+            values = {
+                "status": "dead",
+                "locked_until": None,
+                "payload": _without_secret(row.template, row.payload)
+            }
+            logger.error(
+                f"Email {row.id} ({row.template}) ke {row.to_email} gagal {row.attempts} kali, "
+                f"dipindah ke dead letter: {error}"
+            )
+        else:
+            delay = self.backoff(row.attempts)
+            values = {
+                "status": "pending",
+                "locked_until": None,
+                "next_attempt_at": datetime.now(timezone.utc) + delay
+            }
+            logger.warning(
+                f"Email {row.id} ({row.template}) ke {row.to_email} gagal (percobaan {row.attempts}), "
+                f"dicoba lagi dalam {int(delay.total_seconds())} detik: {error}"
+            )
+        db.execute(
+            update(EmailOutbox).where(self._owned(row, lease)).values(
+                last_error=error[:2000], **values
+            ).execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    def dispatch(self) -> int:
+        """Proses satu batch; kembalikan jumlah email yang diklaim."""
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            rows = self._claim(db)
+            for row in rows:
+                lease = self._renew_lease(db, row)
+                if lease is None:
+                    logger.warning(f"Email {row.id} ({row.template}) sudah diklaim worker lain, dilewati")
+                    continue
+                error = self._deliver(row)
+                if error is None:
+                    self._mark_sent(db, row, lease)
+                    logger.info(f"Email {row.id} ({row.template}) terkirim ke {row.to_email}")
+                else:
+                    self._mark_failed(db, row, lease, error)
+            return len(rows)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Gagal memproses outbox email: {str(e)}")
+            return 0
+        finally:
+            db.close()
+
+    def requeue_dead(self, ids: Optional[list] = None) -> int:
+        """Kembalikan email berstatus dead ke antrian dengan hitungan percobaan baru.
+
+        Email yang token/password sementaranya sudah dihapus tidak bisa dikirim
+        ulang; user perlu link reset/set password baru.
+        """
+        from app.database import SessionLocal
+
+        stmt = select(EmailOutbox.id, EmailOutbox.template, EmailOutbox.payload).where(
+            EmailOutbox.status == "dead"
+        )
+        if ids:
+            stmt = stmt.where(EmailOutbox.id.in_(ids))
+        with SessionLocal() as db:
+            rows = db.execute(stmt).all()
+            requeue_ids = [row.id for row in rows if _has_secret(row.template, row.payload)]
+            skipped = [row.id for row in rows if row.id not in requeue_ids]
+            if skipped:
+                logger.warning(
+                    f"Email {skipped} tidak dikembalikan ke antrian karena token/password sudah dihapus; "
+                    f"kirim ulang link reset/set password ke user terkait"
+                )
+            if not requeue_ids:
+                return 0
+            result = db.execute(
+                update(EmailOutbox).where(
+                    EmailOutbox.id.in_(requeue_ids),
+                    EmailOutbox.status == "dead"
+                ).values(
+                    status="pending",
+                    attempts=0,
+                    next_attempt_at=datetime.now(timezone.utc)
+                ).execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return result.rowcount
+
+    def purge(self, retention_hours: int = None, batch_size: int = None) -> int:
+        """Hapus email sent/dead yang lebih lama dari retention_hours, per batch."""
+        from app.database import SessionLocal
+
+        retention_hours = settings.EMAIL_OUTBOX_RETENTION_HOURS if retention_hours is None else retention_hours
+        batch_size = batch_size or settings.TOKEN_PURGE_BATCH_SIZE
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=retention_hours)
+        stale_ids = select(EmailOutbox.id).where(or_(
+            and_(EmailOutbox.status == "sent", EmailOutbox.sent_at < cutoff),
+            and_(EmailOutbox.status == "dead", EmailOutbox.updated_at < cutoff)
+        )).limit(batch_size).scalar_subquery()
+
+        total = 0
+        db = SessionLocal()
+        try:
+            while True:
+                deleted = db.execute(
+                    delete(EmailOutbox).where(
+                        EmailOutbox.id.in_(stale_ids)
+                    ).execution_options(synchronize_session=False)
+                ).rowcount
+                db.commit()
+                total += deleted
+                if deleted < batch_size:
+                    break
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Gagal purge outbox email: {str(e)}")
+        finally:
+            db.close()
+
+        if total:
+            logger.info(f"Purge outbox email: {total} baris dihapus")
+        return total
+
+    def stats(self) -> dict:
+        from app.database import SessionLocal
+
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)
+            ).all()
+        return {status: count for status, count in rows}
+
+
+email_outbox = EmailOutboxDispatcher(
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    backoff_base_seconds=settings.EMAIL_OUTBOX_BACKOFF_BASE_SECONDS,
+    backoff_max_seconds=settings.EMAIL_OUTBOX_BACKOFF_MAX_SECONDS,
+    lease_seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS
+)
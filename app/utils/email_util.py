@@ -1,7 +1,7 @@
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from app.config import settings
+from app.utils.smtp_pool_util import smtp_pool
 from datetime import datetime, timezone
 import logging
 
@@ -28,14 +28,12 @@ def _send_email_via_resend(
         part = MIMEText(html_content, "html")
         message.attach(part)
         
-        with smtplib.SMTP_SSL(settings.MAIL_HOST, settings.MAIL_PORT) as server:
-            server.login(settings.MAIL_USERNAME, settings.MAIL_PASSWORD)
-            
-            recipients = [to_email]
-            if cc_emails:
-                recipients.extend(cc_emails)
-            
-            server.sendmail(sender_email, recipients, message.as_string())
+        recipients = [to_email]
+        if cc_emails:
+            recipients.extend(cc_emails)
+
+        # Sesi SMTP yang sudah login dipakai ulang dari pool
+        smtp_pool.send(sender_email, recipients, message.as_string())
         
         logger.info(f" Email berhasil terkirim ke {to_email}")
         return True
@@ -0,0 +1,87 @@
+import csv
+import io
+import tempfile
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Sequence, Tuple
+from fastapi.concurrency import run_in_threadpool
+
+# Ukuran potongan file XLSX yang dikirim ke client
+XLSX_CHUNK_SIZE = 64 * 1024
+
+
+# Awalan yang membuat spreadsheet membaca sel sebagai formula (CSV/formula injection)
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _escape_formula(value):
+    # Nama, jabatan, instansi berasal dari registrasi mandiri; jangan sampai jadi formula
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def _format_csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return _escape_formula(value)
+
+
+def _format_xlsx_value(value):
+    # Excel tidak mendukung datetime ber-timezone; simpan sebagai UTC naive
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return _escape_formula(value)
+
+
+async def stream_csv(
+    columns: Sequence[Tuple[str, str]],
+    batches: AsyncIterator[List[dict]]
+) -> AsyncIterator[bytes]:
+    """columns: pasangan (key baris, judul kolom). Satu chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # BOM agar Excel membaca CSV sebagai UTF-8
+    buffer.write("\ufeff")
+    writer.writerow([title for _, title in columns])
+
+    async for batch in batches:
+        for row in batch:
+            writer.writerow([_format_csv_value(row[key]) for key, _ in columns])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    remaining = buffer.getvalue()
+    if remaining:
+        yield remaining.encode("utf-8")
+
+
+async def stream_xlsx(
+    columns: Sequence[Tuple[str, str]],
+    batches: AsyncIterator[List[dict]],
+    sheet_title: str = "Data"
+) -> AsyncIterator[bytes]:
+    """XLSX dengan openpyxl write-only: baris langsung ditulis ke file sementara,
+    tidak ditahan di memori. File zip baru lengkap setelah semua baris masuk,
+    jadi pengiriman dimulai setelah save."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title)
+    sheet.append([title for _, title in columns])
+
+    async for batch in batches:
+        for row in batch:
+            sheet.append([_format_xlsx_value(row[key]) for key, _ in columns])
+
+    with tempfile.TemporaryFile(suffix=".xlsx") as output:
+        await run_in_threadpool(workbook.save, output)
+        output.seek(0)
+        while True:
+            chunk = await run_in_threadpool(output.read, XLSX_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,78 @@
+import io
+import zipfile
+from datetime import date, datetime
+from typing import List, Sequence, Tuple
+
+
+def _normalize_header(value) -> str:
+    return " ".join(str(value or "").split()).lower()
+
+
+def _format_cell(value):
+    if value is None:
+        return None
+    # Excel menyimpan NIP/telepon yang diketik sebagai angka menjadi int/float
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    value = str(value).strip()
+    return value or None
+
+
+def read_xlsx_rows(
+    content: bytes,
+    columns: Sequence[Tuple[str, str]],
+    max_rows: int
+) -> List[Tuple[int, dict]]:
+    """Baca sheet aktif dengan openpyxl read-only dan kembalikan (nomor baris, data).
+
+    columns: pasangan (key, judul kolom); header boleh berupa key atau judul.
+    Baris kosong dilewati. Fungsi ini blocking, panggil lewat threadpool.
+    """
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError, OSError):
+        raise ValueError("File bukan XLSX yang valid")
+
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            raise ValueError("File tidak memiliki baris header")
+
+        aliases = {}
+        for key, title in columns:
+            aliases[_normalize_header(key)] = key
+            aliases[_normalize_header(title)] = key
+
+        positions = {}
+        for index, cell in enumerate(header):
+            key = aliases.get(_normalize_header(cell))
+            if key and key not in positions:
+                positions[key] = index
+
+        missing = [title for key, title in columns if key not in positions]
+        if missing:
+            raise ValueError(f"Kolom wajib tidak ditemukan: {', '.join(missing)}")
+
+        result = []
+        # Nomor baris mengikuti Excel: header di baris 1
+        for row_number, row in enumerate(rows, start=2):
+            data = {
+                key: _format_cell(row[index]) if index < len(row) else None
+                for key, index in positions.items()
+            }
+            if all(value is None for value in data.values()):
+                continue
+            if len(result) >= max_rows:
+                raise ValueError(f"Jumlah baris melebihi batas {max_rows}")
+            result.append((row_number, data))
+        return result
+    finally:
+        workbook.close()
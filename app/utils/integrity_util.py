@@ -0,0 +1,40 @@
+import re
+from typing import Iterable, Optional
+from sqlalchemy.exc import IntegrityError
+
+# Postgres: 'Key (email)=(a@b.id) already exists.', SQLite: 'UNIQUE constraint failed: users.email'
+_UNIQUE_DETAIL_PATTERNS = (
+    re.compile(r"Key \((?P<column>[^)]+)\)=\("),
+    re.compile(r"UNIQUE constraint failed: \w+\.(?P<column>\w+)"),
+)
+
+
+def _constraint_name(orig) -> Optional[str]:
+    # psycopg2 menyimpan nama constraint di diag; asyncpg lewat adapter
+    # SQLAlchemy menyimpan exception aslinya di __cause__
+    diag = getattr(orig, "diag", None)
+    name = getattr(diag, "constraint_name", None)
+    if name:
+        return name
+    return getattr(getattr(orig, "__cause__", None), "constraint_name", None)
+
+
+def unique_violation_column(error: IntegrityError, columns: Iterable[str]) -> Optional[str]:
+    """Kolom di `columns` yang unique constraint-nya dilanggar, atau None.
+
+    Nama constraint (ix_users_email, users_email_key, ...) dicek lebih dulu,
+    lalu pesan error driver sebagai fallback.
+    """
+    columns = list(columns)
+    constraint = _constraint_name(error.orig)
+    if constraint:
+        for column in columns:
+            if re.search(rf"(^|_){re.escape(column)}(_|$)", constraint):
+                return column
+
+    message = str(error.orig)
+    for pattern in _UNIQUE_DETAIL_PATTERNS:
+        match = pattern.search(message)
+        if match and match.group("column") in columns:
+            return match.group("column")
+    return None
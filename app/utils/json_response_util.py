@@ -0,0 +1,67 @@
+import json
+from decimal import Decimal
+from typing import Any, Optional
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson opsional; fallback ke json stdlib
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    # Dipanggil orjson hanya untuk tipe yang tidak dikenalnya
+    # (datetime, UUID, Enum, dataclass sudah ditangani langsung)
+    if isinstance(obj, BaseModel):
+        # mode="json" menjaga format keluaran sama dengan serializer Pydantic
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return jsonable_encoder(obj)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse yang meng-encode dengan orjson.
+
+    Menerima dict envelope (success_response/error_response), model Pydantic,
+    dan datetime secara langsung. Jika orjson tidak terpasang, konten
+    dilewatkan jsonable_encoder lalu json stdlib seperti JSONResponse biasa.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            jsonable_encoder(content),
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[dict] = None) -> FastJSONResponse:
+    """Kembalikan Response langsung dari route.
+
+    FastAPI tidak lagi menjalankan validasi response_model dan jsonable_encoder
+    untuk Response, jadi konten hanya di-encode sekali.
+    """
+    return FastJSONResponse(content=content, status_code=status_code, headers=headers)
+
+
+async def http_exception_handler(request, exc: StarletteHTTPException) -> Response:
+    # Sama dengan handler bawaan FastAPI, hanya memakai FastJSONResponse
+    headers = getattr(exc, "headers", None)
+    if exc.status_code in (204, 304):
+        return Response(status_code=exc.status_code, headers=headers)
+    return FastJSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=headers)
+
+
+async def validation_exception_handler(request, exc: RequestValidationError) -> Response:
+    return FastJSONResponse({"detail": jsonable_encoder(exc.errors())}, status_code=422)
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+BCRYPT_MAX_PASSWORD_LENGTH = 72
+
+
+@lru_cache(maxsize=None)
+def get_crypt_context() -> CryptContext:
+    try:
+        context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        context.hash("test")
+    except Exception:
+        context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
+    return context
+
+
+def _hash_password(password: str) -> str:
+    if len(password) > BCRYPT_MAX_PASSWORD_LENGTH:
+        password = password[:BCRYPT_MAX_PASSWORD_LENGTH]
+    return get_crypt_context().hash(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return get_crypt_context().verify(plain_password, hashed_password)
+
+
+class PasswordHasherPool:
+    """Pool proses terbatas untuk bcrypt.
+
+    Jumlah pekerjaan yang sedang antre/diproses dibatasi `max_pending`. Jika
+    penuh, request langsung ditolak dengan 503 agar lonjakan login tidak
+    menghabiskan worker API.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, timeout_seconds: float):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout_seconds = timeout_seconds
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    try:
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            mp_context=multiprocessing.get_context("spawn")
+                        )
+                    except (OSError, NotImplementedError) as e:
+                        # Lingkungan serverless tertentu tidak mendukung semaphore multiprocessing
+                        logger.warning(f"Process pool tidak tersedia, memakai thread pool: {str(e)}")
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers,
+                            thread_name_prefix="password-hasher"
+                        )
+        return self._executor
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                logger.warning(f"Password hasher penuh ({self._pending} pekerjaan antre)")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server sedang sibuk, silakan coba beberapa saat lagi"
+                )
+            self._pending += 1
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def _submit(self, fn, *args):
+        self._acquire()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        # Slot dilepas saat pekerjaan selesai, bukan saat pemanggil berhenti menunggu
+        future.add_done_callback(self._release)
+        return future
+
+    def _timeout_error(self) -> HTTPException:
+        logger.error(f"Password hasher melebihi batas waktu {self.timeout_seconds} detik")
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server sedang sibuk, silakan coba beberapa saat lagi"
+        )
+
+    def run(self, fn, *args):
+        future = self._submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout_seconds)
+        except FutureTimeoutError:
+            raise self._timeout_error()
+
+    async def run_async(self, fn, *args):
+        future = asyncio.wrap_future(self._submit(fn, *args))
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            raise self._timeout_error()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasherPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    timeout_seconds=settings.PASSWORD_HASH_TIMEOUT_SECONDS
+)
+
+
+def hash_password(password: str) -> str:
+    return password_hasher.run(_hash_password, password)
+
+
+def check_password(plain_password: str, hashed_password: str) -> bool:
+    return password_hasher.run(_verify_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.run_async(_hash_password, password)
+
+
+async def check_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run_async(_verify_password, plain_password, hashed_password)
@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Jumlah sampel waktu tunggu checkout terakhir yang dipakai untuk avg/p95
+WAIT_SAMPLE_SIZE = 1000
+
+
+class PoolMetrics:
+    """Counter connection pool untuk satu engine."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._waits_ms = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self.pool = None
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.invalidations = 0
+        self.pre_ping_failures = 0
+        self.peak_checked_out = 0
+        self.max_wait_ms = 0.0
+
+    def record_wait(self, wait_ms: float):
+        with self._lock:
+            self._waits_ms.append(wait_ms)
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def record_timeout(self, wait_ms: float):
+        with self._lock:
+            self.timeouts += 1
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        logger.warning(
+            f"Pool {self.name} habis: checkout timeout setelah {round(wait_ms, 1)} ms "
+            f"({self.pool.status() if self.pool is not None else '-'})"
+        )
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            if self.pool is not None:
+                self.peak_checked_out = max(self.peak_checked_out, self.pool.checkedout())
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+            # Pre-ping yang gagal meng-invalidate koneksi dengan DisconnectionError
+            if isinstance(exception, exc.DisconnectionError):
+                self.pre_ping_failures += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits_ms)
+            data = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "timeouts": self.timeouts,
+                "invalidations": self.invalidations,
+                "pre_ping_failures": self.pre_ping_failures,
+                "peak_checked_out": self.peak_checked_out,
+                "wait_ms": {
+                    "avg": round(sum(waits) / len(waits), 2) if waits else 0.0,
+                    "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2) if waits else 0.0,
+                    "max": round(self.max_wait_ms, 2),
+                    "samples": len(waits),
+                },
+            }
+
+        pool = self.pool
+        if pool is None:
+            data["initialized"] = False
+            return data
+
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        data.update({
+            "initialized": True,
+            "pool_size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+            "checked_out": checked_out,
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "capacity": capacity,
+            "saturation": round(checked_out / capacity, 4) if capacity else 0.0,
+        })
+        return data
+
+
+class _TimedCheckoutMixin:
+    """Mengukur lama menunggu koneksi dari pool (termasuk membuka koneksi baru)."""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_timeout((time.perf_counter() - started) * 1000)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait((time.perf_counter() - started) * 1000)
+        return record
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.pool = pool
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+pool_metrics: Dict[str, PoolMetrics] = {
+    "sync": PoolMetrics("sync"),
+    "async": PoolMetrics("async"),
+}
+
+
+def instrument_engine(engine, name: str):
+    """Pasang event listener pool; `engine` adalah Engine sync (atau AsyncEngine.sync_engine)."""
+    metrics = pool_metrics[name]
+    metrics.pool = engine.pool
+    engine.pool.metrics = metrics
+
+    event.listen(engine, "connect", metrics.on_connect)
+    event.listen(engine, "checkout", metrics.on_checkout)
+    event.listen(engine, "checkin", metrics.on_checkin)
+    event.listen(engine, "invalidate", metrics.on_invalidate)
+    return engine
+
+
+def get_pool_metrics() -> dict:
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
+
+
+def is_pool_saturated(snapshot: dict) -> bool:
+    if not snapshot.get("initialized"):
+        return False
+    return snapshot["saturation"] >= settings.DB_POOL_SATURATION_WARN
@@ -0,0 +1,122 @@
+import json
+import logging
+from datetime import datetime
+from typing import Optional
+from redis.exceptions import RedisError
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_KEY_PREFIX = "auth:principal"
+
+
+def _principal_key(username: str, token_version: int) -> str:
+    return f"{PRINCIPAL_KEY_PREFIX}:{username}:{token_version}"
+
+
+def _principal_index_key(user_id: int) -> str:
+    # Set berisi semua key principal milik satu user, dipakai saat invalidasi
+    return f"{PRINCIPAL_KEY_PREFIX}:keys:{user_id}"
+
+
+class CachedPrincipal:
+    """Snapshot ringkas user dari Redis.
+
+    Field snapshot dibaca langsung tanpa query. Atribut lain (email, full_name,
+    hashed_password, dst.) memuat entity User dari DB saat pertama diakses jika
+    diberi Session sync; untuk AsyncSession gunakan dependency
+    get_current_user_entity.
+    """
+
+    def __init__(self, snapshot: dict, db=None):
+        self._snapshot = snapshot
+        self._db = db
+        self._user = None
+
+    def _load_user(self):
+        if self._db is None:
+            raise AttributeError("Principal dari cache tidak memiliki session untuk memuat data user")
+        if self._user is None:
+            from app.domain.models import User
+            self._user = self._db.query(User).filter(User.id == self._snapshot["id"]).first()
+            if self._user is None:
+                raise AttributeError(f"User {self._snapshot['id']} tidak ditemukan")
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        snapshot = self.__dict__.get("_snapshot", {})
+        if name in snapshot:
+            return snapshot[name]
+        return getattr(self._load_user(), name)
+
+
+def _serialize(user, last_activity: Optional[datetime] = None) -> str:
+    last_activity = last_activity or user.last_activity
+    last_activity = last_activity.isoformat() if last_activity else None
+    return json.dumps({
+        "id": user.id,
+        "username": user.username,
+        "role_name": user.role_name,
+        "is_active": bool(user.is_active),
+        "token_version": user.token_version,
+        "last_activity": last_activity,
+    })
+
+
+def _deserialize(raw: str) -> dict:
+    snapshot = json.loads(raw)
+    if snapshot.get("last_activity"):
+        snapshot["last_activity"] = datetime.fromisoformat(snapshot["last_activity"])
+    return snapshot
+
+
+def get_cached_principal(username: str, token_version: int, db=None) -> Optional[CachedPrincipal]:
+    try:
+        raw = settings.REDIS.get(_principal_key(username, token_version))
+    except RedisError as e:
+        logger.warning(f"Principal cache tidak tersedia, fallback ke DB: {str(e)}")
+        return None
+
+    if raw is None:
+        return None
+    return CachedPrincipal(_deserialize(raw), db)
+
+
+def cache_principal(user, last_activity: Optional[datetime] = None) -> None:
+    key = _principal_key(user.username, user.token_version)
+    index_key = _principal_index_key(user.id)
+    ttl = settings.PRINCIPAL_CACHE_TTL_SECONDS
+    try:
+        pipe = settings.REDIS.pipeline(transaction=False)
+        pipe.set(key, _serialize(user, last_activity), ex=ttl)
+        pipe.sadd(index_key, key)
+        pipe.expire(index_key, ttl)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Gagal menyimpan principal cache user {user.id}: {str(e)}")
+
+
+def invalidate_principal(user_id: int) -> None:
+    index_key = _principal_index_key(user_id)
+    try:
+        keys = settings.REDIS.smembers(index_key)
+        settings.REDIS.delete(index_key, *keys)
+    except RedisError as e:
+        logger.warning(f"Gagal invalidasi principal cache user {user_id}: {str(e)}")
+
+
+def invalidate_principals(user_ids) -> None:
+    """Invalidasi banyak user dengan dua round-trip Redis."""
+    index_keys = [_principal_index_key(user_id) for user_id in user_ids]
+    if not index_keys:
+        return
+    try:
+        pipe = settings.REDIS.pipeline(transaction=False)
+        for index_key in index_keys:
+            pipe.smembers(index_key)
+        keys = [key for members in pipe.execute() for key in members]
+        settings.REDIS.delete(*index_keys, *keys)
+    except RedisError as e:
+        logger.warning(f"Gagal invalidasi principal cache {len(index_keys)} user: {str(e)}")
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+from fastapi.concurrency import run_in_threadpool
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.utils.query_helpers_util import clean_search_string
+
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_PREFIX = "qcache"
+
+
+def _table_version_key(table: str) -> str:
+    return f"{QUERY_CACHE_PREFIX}:ver:{table}"
+
+
+def _normalize_sort(sort: Optional[str]) -> Optional[str]:
+    # Format sort: "column,direction" (lihat PaginationParams*)
+    if not sort:
+        return None
+    column, _, direction = sort.partition(",")
+    column = column.strip().lower()
+    if not column:
+        return None
+    direction = "asc" if direction.strip().lower() == "asc" else "desc"
+    return f"{column},{direction}"
+
+
+def _normalize_filter_key(key: Any) -> str:
+    # apply_dynamic_filters memakai objek Column sebagai key
+    table = getattr(getattr(key, "table", None), "name", None)
+    name = getattr(key, "key", None) or str(key)
+    return f"{table}.{name}" if table else name
+
+
+def normalize_query_params(
+    search: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    sort: Optional[str] = None,
+    filters: Optional[dict] = None,
+    page: Optional[int] = None,
+    limit: Optional[int] = None,
+    **extra: Any
+) -> dict:
+    """Bentuk kanonik parameter list query; nilai kosong/None dibuang."""
+    search_clean = clean_search_string(search)
+    params = {
+        # ILIKE tidak peka huruf besar-kecil, jadi "Budi" dan "budi " satu entry cache
+        "search": search_clean.lower() if search_clean else None,
+        "start_date": start_date or None,
+        "end_date": end_date or None,
+        "sort": _normalize_sort(sort),
+        "filters": {
+            _normalize_filter_key(key): str(value)
+            for key, value in (filters or {}).items()
+            if value is not None and value != ""
+        } or None,
+        "page": page,
+        "limit": limit,
+    }
+    params.update(extra)
+    return {key: value for key, value in params.items() if value is not None}
+
+
+def _get_table_versions(tables: Iterable[str]) -> Dict[str, int]:
+    tables = sorted(set(tables))
+    values = settings.REDIS.mget([_table_version_key(table) for table in tables])
+    return {table: int(value or 0) for table, value in zip(tables, values)}
+
+
+def build_query_cache_key(namespace: str, tables: Iterable[str], params: dict) -> str:
+    """Key cache = namespace + versi tabel + hash parameter kanonik.
+
+    Versi tabel ikut di key, jadi write cukup menaikkan counter; entry lama
+    tidak terjangkau lagi dan hilang sendiri oleh TTL.
+    """
+    versions = _get_table_versions(tables)
+    version_part = ",".join(f"{table}={version}" for table, version in versions.items())
+    digest = hashlib.sha256(
+        json.dumps(params, sort_keys=True, separators=(",", ":"), default=str).encode()
+    ).hexdigest()[:32]
+    return f"{QUERY_CACHE_PREFIX}:{namespace}:{version_part}:{digest}"
+
+
+def _read_cache(namespace: str, tables: Iterable[str], params: dict):
+    try:
+        key = build_query_cache_key(namespace, tables, params)
+        raw = settings.REDIS.get(key)
+    except RedisError as e:
+        logger.warning(f"Query cache {namespace} tidak tersedia: {str(e)}")
+        return None, None
+    return key, (json.loads(raw) if raw is not None else None)
+
+
+def _write_cache(key: str, value: Any, ttl: Optional[int]):
+    try:
+        settings.REDIS.set(
+            key,
+            json.dumps(value, separators=(",", ":"), default=str),
+            ex=ttl or settings.QUERY_CACHE_TTL_SECONDS
+        )
+    except RedisError as e:
+        logger.warning(f"Gagal menyimpan query cache {key}: {str(e)}")
+
+
+def cached_query(
+    namespace: str,
+    tables: Iterable[str],
+    params: dict,
+    loader: Callable[[], Any],
+    ttl: Optional[int] = None
+) -> Any:
+    """Ambil halaman dari Redis, atau jalankan loader dan simpan hasilnya.
+
+    loader harus mengembalikan data yang bisa di-serialize ke JSON
+    (mis. hasil model_dump(mode="json")).
+    """
+    key, cached = _read_cache(namespace, tables, params)
+    if cached is not None:
+        return cached
+
+    value = loader()
+    if key is not None:
+        _write_cache(key, value, ttl)
+    return value
+
+
+async def cached_query_async(
+    namespace: str,
+    tables: Iterable[str],
+    params: dict,
+    loader: Callable[[], Awaitable[Any]],
+    ttl: Optional[int] = None
+) -> Any:
+    # Client Redis sync: baca/tulis cache di threadpool agar event loop tidak terblokir
+    key, cached = await run_in_threadpool(_read_cache, namespace, tables, params)
+    if cached is not None:
+        return cached
+
+    value = await loader()
+    if key is not None:
+        await run_in_threadpool(_write_cache, key, value, ttl)
+    return value
+
+
+def bump_table_versions(tables: Iterable[str]):
+    tables = set(tables)
+    if not tables:
+        return
+    try:
+        pipe = settings.REDIS.pipeline(transaction=False)
+        for table in tables:
+            pipe.incr(_table_version_key(table))
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Gagal menaikkan versi query cache {sorted(tables)}: {str(e)}")
+
+
+# ============================================================================
+# Invalidasi otomatis: tabel yang ditulis dalam transaksi di-bump setelah commit
+# ============================================================================
+_DIRTY_TABLES_KEY = "query_cache_dirty_tables"
+_COMMITTED_TABLES_KEY = "query_cache_committed_tables"
+_DEFER_BUMP_KEY = "query_cache_defer_bump"
+
+
+def defer_version_bumps(session: Session):
+    """Session di balik AsyncSession: listener after_commit berjalan di event loop,
+    jadi bump tidak dijalankan di sana tetapi diambil lewat pop_committed_tables."""
+    session.info[_DEFER_BUMP_KEY] = True
+
+
+def pop_committed_tables(session: Session) -> set:
+    return session.info.pop(_COMMITTED_TABLES_KEY, set())
+
+
+def _mark_tables(session: Session, tables: Iterable[str]):
+    session.info.setdefault(_DIRTY_TABLES_KEY, set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    tables = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            tables.add(table)
+    _mark_tables(session, tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_write_tables(orm_execute_state):
+    # update()/delete()/insert() via session.execute tidak melewati flush
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    name = getattr(table, "name", None)
+    if name:
+        _mark_tables(orm_execute_state.session, [name])
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_tables(session):
+    tables = session.info.pop(_DIRTY_TABLES_KEY, set())
+    if session.info.get(_DEFER_BUMP_KEY):
+        session.info.setdefault(_COMMITTED_TABLES_KEY, set()).update(tables)
+        return
+    bump_table_versions(tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_tables(session):
+    session.info.pop(_DIRTY_TABLES_KEY, None)
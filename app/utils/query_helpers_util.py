@@ -1,5 +1,9 @@
+import base64
+import binascii
+import json
+from datetime import datetime
 from sqlalchemy.orm import Query
-from sqlalchemy import or_
+from sqlalchemy import Select, func, or_, select, tuple_
 from typing import List, Any, Tuple, Optional
 
 def clean_search_string(search_item: Optional[str]) -> Optional[str]:
@@ -63,6 +67,76 @@ def apply_pagination(
     return paginated_query, total
 
 
+# ============================================================================
+# Pagination satu round trip: total ikut di setiap baris lewat count(*) OVER ()
+# ============================================================================
+TOTAL_COUNT_LABEL = "_total_count"
+
+
+def add_total_count_column(query):
+    """Tambah kolom count(*) OVER () (total sebelum LIMIT/OFFSET) ke Query atau Select."""
+    return query.add_columns(func.count().over().label(TOTAL_COUNT_LABEL))
+
+
+def split_total_count(rows, as_mappings: bool = False) -> Tuple[List[Any], Optional[int]]:
+    """Pisahkan kolom total dari baris hasil; total None jika halaman kosong.
+
+    as_mappings=True untuk query proyeksi kolom: setiap item menjadi dict.
+    """
+    if not rows:
+        return [], None
+
+    total = rows[0][-1]
+    if as_mappings:
+        items = [
+            {key: value for key, value in row._mapping.items() if key != TOTAL_COUNT_LABEL}
+            for row in rows
+        ]
+    else:
+        items = [row[0] if len(row) == 2 else tuple(row[:-1]) for row in rows]
+    return items, total
+
+
+def paginate_query_with_total(
+    query: Query,
+    offset: int,
+    limit: int
+) -> Tuple[List[Any], int]:
+    """Halaman dan total dari satu statement untuk Query sync.
+
+    Berbeda dengan apply_pagination, yang dikembalikan adalah (items, total),
+    bukan Query yang masih bisa dirangkai.
+    """
+    rows = add_total_count_column(query).limit(limit).offset(offset).all()
+    items, total = split_total_count(rows)
+
+    # Halaman di luar jangkauan tidak membawa total; hanya kasus ini yang butuh COUNT
+    if total is None:
+        total = query.count() if offset else 0
+
+    return items, total
+
+
+async def paginate_with_total(
+    db,
+    stmt: Select,
+    offset: int,
+    limit: int,
+    as_mappings: bool = False
+) -> Tuple[List[Any], int]:
+    """Versi AsyncSession dari paginate_query_with_total; mengembalikan (items, total)."""
+    result = await db.execute(add_total_count_column(stmt).offset(offset).limit(limit))
+    items, total = split_total_count(result.all(), as_mappings)
+
+    if total is None:
+        total = 0
+        if offset:
+            count_result = await db.execute(select(func.count()).select_from(stmt.subquery()))
+            total = count_result.scalar_one()
+
+    return items, total
+
+
 def apply_sorting(
     query: Query,
     sort_column: Any,
@@ -81,4 +155,65 @@ def apply_dynamic_filters(
     for column, value in filters.items():
         if value is not None:
             query = query.filter(column == value)
-    return query
\ No newline at end of file
+    return query
+
+# ============================================================================
+# Keyset (cursor) pagination
+# ============================================================================
+COUNT_MODES = ("exact", "approx", "none")
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    payload = json.dumps({"v": sort_value.isoformat(), "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Kebalikan encode_cursor; ValueError jika cursor tidak valid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["v"]), int(payload["id"])
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        raise ValueError("Cursor tidak valid") from e
+
+
+def apply_keyset_pagination(
+    stmt: Select,
+    sort_column: Any,
+    id_column: Any,
+    cursor: Optional[str],
+    limit: int
+) -> Select:
+    """Urutkan (sort_column DESC, id DESC) dan ambil limit + 1 baris setelah cursor.
+
+    Baris ekstra dipakai untuk mengetahui apakah masih ada halaman berikutnya.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+
+    return stmt.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+async def estimate_count(db, stmt: Select) -> Optional[int]:
+    """Perkiraan jumlah baris dari planner Postgres (EXPLAIN), tanpa scan.
+
+    Mengembalikan None untuk dialect selain PostgreSQL.
+    """
+    dialect = db.get_bind().dialect
+    if dialect.name != "postgresql":
+        return None
+
+    # Parameter dikirim terpisah ke driver (bukan literal) agar input pencarian tetap aman
+    compiled = stmt.compile(dialect=dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    conn = await db.connection()
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", params)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
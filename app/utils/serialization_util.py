@@ -0,0 +1,19 @@
+from functools import lru_cache
+from typing import Any, List, Sequence, Type
+from pydantic import BaseModel, TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def get_list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    # Membangun TypeAdapter (schema + validator) mahal, jadi cukup sekali per model
+    return TypeAdapter(List[model])
+
+
+def projection_columns(entity, model: Type[BaseModel]) -> list:
+    """Kolom entity yang dibutuhkan response model, untuk select(*columns)."""
+    return [getattr(entity, field).label(field) for field in model.model_fields]
+
+
+def validate_rows(model: Type[BaseModel], rows: Sequence[Any]) -> list:
+    """Validasi satu halaman (list dict/mapping) sekaligus menjadi list model."""
+    return get_list_adapter(model).validate_python(rows)
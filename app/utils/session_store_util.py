@@ -0,0 +1,84 @@
+import logging
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+from redis.exceptions import RedisError
+from app.config import settings
+from app.utils.activity_tracker_util import activity_tracker
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY_PREFIX = "auth:session:"
+
+# EXPIRE key sesi lalu, hanya jika key masih ada, tulis aktivitas seperti
+# ActivityTracker.touch; satu round trip dan atomik di Redis
+_TOUCH_SESSION_LUA = """
+if redis.call('EXPIRE', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[2], ARGV[3], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+redis.call('HSET', KEYS[3], ARGV[3], ARGV[4])
+return 1
+"""
+
+
+def _session_key(user_id: int, token_version: int) -> str:
+    return f"{SESSION_KEY_PREFIX}{user_id}:{token_version}"
+
+
+def _session_ttl() -> int:
+    return settings.SESSION_EXPIRE_MINUTES * 60
+
+
+@lru_cache(maxsize=1)
+def _touch_session_script():
+    # Dibuat saat pertama dipakai agar client Redis tidak dibuat saat import
+    return settings.REDIS.register_script(_TOUCH_SESSION_LUA)
+
+
+def start_session(user_id: int, token_version: int) -> bool:
+    """Buat sesi saat login; False jika store nonaktif atau Redis tidak tersedia."""
+    if not settings.SESSION_STORE_REDIS:
+        return False
+    try:
+        settings.REDIS.set(_session_key(user_id, token_version), 1, ex=_session_ttl())
+    except RedisError as e:
+        logger.warning(f"Gagal membuat sesi user {user_id} di Redis: {str(e)}")
+        return False
+    return True
+
+
+def touch_session(user_id: int, token_version: int, at: Optional[datetime] = None) -> bool:
+    """Perpanjang TTL sesi (sliding window); True jika key sesi masih ada.
+
+    False jika key tidak ada atau Redis tidak tersedia. Key bisa hilang karena
+    idle, tetapi juga karena flush/eviction/restart Redis, jadi pemanggil harus
+    memastikan lewat last_activity lalu memanggil start_session lagi.
+    Aktivitas hanya dicatat jika sesi masih hidup, dalam round trip yang sama.
+    """
+    at = at or datetime.now(timezone.utc)
+    try:
+        alive = _touch_session_script()(
+            keys=[
+                _session_key(user_id, token_version),
+                activity_tracker.LAST_SEEN_KEY,
+                activity_tracker.PENDING_KEY
+            ],
+            args=[_session_ttl(), _session_ttl() * 2, user_id, at.isoformat()],
+            client=settings.REDIS
+        )
+    except RedisError as e:
+        logger.warning(f"Session store Redis tidak tersedia, fallback ke last activity: {str(e)}")
+        return False
+    return bool(alive)
+
+
+def end_session(user_id: int, token_version: int) -> None:
+    if not settings.SESSION_STORE_REDIS:
+        return
+    try:
+        settings.REDIS.delete(_session_key(user_id, token_version))
+    except RedisError as e:
+        # Aman: token lama tetap ditolak lewat token_version yang sudah naik
+        logger.warning(f"Gagal menghapus sesi user {user_id} dari Redis: {str(e)}")
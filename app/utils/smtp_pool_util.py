@@ -0,0 +1,192 @@
+import logging
+import smtplib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _is_connection_error(error: Exception) -> bool:
+    """True jika koneksi SMTP tidak bisa dipakai lagi.
+
+    SMTPException turunan OSError; penolakan penerima/pengirim tidak
+    merusak sesi sehingga koneksi tetap boleh dikembalikan ke pool.
+    """
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class _PooledConnection:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.messages = 0
+        self.broken = False
+
+
+class SMTPConnectionPool:
+    """Pool sesi SMTP yang sudah login.
+
+    Handshake TLS dan AUTH hanya dibayar saat membuka koneksi baru; satu
+    koneksi dipakai untuk banyak email. Koneksi yang menganggur lebih dari
+    `noop_after_seconds` dicek dengan NOOP sebelum dipakai, koneksi yang
+    menganggur lebih dari `max_idle_seconds` atau sudah mengirim
+    `max_messages` email ditutup. Jika koneksi terputus saat mengirim,
+    email dikirim ulang sekali lewat koneksi baru.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        use_ssl: bool = True,
+        max_size: int = 2,
+        max_idle_seconds: float = 60,
+        noop_after_seconds: float = 5,
+        max_messages: int = 100,
+        timeout_seconds: float = 30
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.noop_after_seconds = noop_after_seconds
+        self.max_messages = max_messages
+        self.timeout_seconds = timeout_seconds
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._stats = {"connects": 0, "reuses": 0, "stale": 0, "retries": 0, "sent": 0}
+
+    def _connect(self) -> _PooledConnection:
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        smtp = smtp_class(self.host, self.port, timeout=self.timeout_seconds)
+        try:
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._close(smtp)
+            raise
+        with self._lock:
+            self._stats["connects"] += 1
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    def _close(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, conn: _PooledConnection) -> bool:
+        try:
+            return conn.smtp.noop()[0] == 250
+        except OSError:
+            return False
+
+    def _take_idle(self):
+        """Ambil koneksi idle yang masih sehat, atau None."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                conn = self._idle.pop()
+
+            idle_for = time.monotonic() - conn.last_used
+            if idle_for > self.max_idle_seconds:
+                self._close(conn.smtp)
+                continue
+            if idle_for > self.noop_after_seconds and not self._is_alive(conn):
+                with self._lock:
+                    self._stats["stale"] += 1
+                self._close(conn.smtp)
+                continue
+
+            with self._lock:
+                self._stats["reuses"] += 1
+            return conn
+
+    def _release(self, conn: _PooledConnection):
+        if conn.broken or conn.messages >= self.max_messages:
+            self._close(conn.smtp)
+            return
+        conn.last_used = time.monotonic()
+        with self._lock:
+            self._idle.append(conn)
+
+    @contextmanager
+    def connection(self, fresh: bool = False):
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = None if fresh else self._take_idle()
+            if conn is None:
+                conn = self._connect()
+            yield conn
+        except OSError as e:
+            if conn is not None and _is_connection_error(e):
+                conn.broken = True
+            raise
+        finally:
+            if conn is not None:
+                self._release(conn)
+            self._slots.release()
+
+    def send(self, from_addr: str, recipients: list, message: str):
+        for attempt in (1, 2):
+            reused = False
+            try:
+                with self.connection(fresh=attempt > 1) as conn:
+                    reused = conn.messages > 0
+                    conn.messages += 1
+                    conn.smtp.sendmail(from_addr, recipients, message)
+            except OSError as e:
+                # Hanya koneksi lama dari pool yang dicoba ulang: server bisa
+                # menutup sesi idle tanpa terdeteksi NOOP
+                if attempt > 1 or not reused or not _is_connection_error(e):
+                    raise
+                logger.warning(f"Koneksi SMTP terputus, mengirim ulang dengan koneksi baru: {str(e)}")
+                with self._lock:
+                    self._stats["retries"] += 1
+                continue
+            with self._lock:
+                self._stats["sent"] += 1
+            return
+
+    def close_all(self):
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn in idle:
+            self._close(conn.smtp)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "idle": len(self._idle), "max_size": self.max_size}
+
+
+smtp_pool = SMTPConnectionPool(
+    host=settings.MAIL_HOST,
+    port=settings.MAIL_PORT,
+    username=settings.MAIL_USERNAME,
+    password=settings.MAIL_PASSWORD,
+    use_ssl=settings.MAIL_USE_SSL,
+    max_size=settings.MAIL_POOL_SIZE,
+    max_idle_seconds=settings.MAIL_POOL_MAX_IDLE_SECONDS,
+    noop_after_seconds=settings.MAIL_POOL_NOOP_AFTER_SECONDS,
+    max_messages=settings.MAIL_POOL_MAX_MESSAGES,
+    timeout_seconds=settings.MAIL_TIMEOUT_SECONDS
+)
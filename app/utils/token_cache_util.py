@@ -0,0 +1,92 @@
+import hashlib
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from app.config import settings
+
+
+class VerifiedTokenCache:
+    """LRU untuk payload JWT yang signature-nya sudah diverifikasi.
+
+    Key berupa digest SHA-256 dari token (token mentah tidak disimpan).
+    Entry dibuang tepat pada klaim `exp`-nya dan tidak pernah dikembalikan
+    setelah kadaluarsa; token tanpa `exp` tidak di-cache.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._expiry_heap: list = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _purge_expired(self, now: float):
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            exp, key = heapq.heappop(self._expiry_heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == exp:
+                del self._entries[key]
+                self.expired += 1
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._digest(token)
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, token: str, payload: dict):
+        exp = payload.get("exp")
+        if exp is None or self.max_size <= 0:
+            return
+
+        key = self._digest(token)
+        with self._lock:
+            self._purge_expired(time.time())
+            self._entries[key] = (exp, payload)
+            self._entries.move_to_end(key)
+            heapq.heappush(self._expiry_heap, (exp, key))
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+            # Heap bisa berisi entry yang sudah dibuang oleh LRU; rapikan jika membengkak
+            if len(self._expiry_heap) > self.max_size * 2:
+                self._expiry_heap = [(exp, key) for key, (exp, _) in self._entries.items()]
+                heapq.heapify(self._expiry_heap)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._expiry_heap.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+token_cache = VerifiedTokenCache(settings.JWT_CACHE_MAX_SIZE)
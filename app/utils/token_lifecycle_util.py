@@ -0,0 +1,114 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Tuple
+from redis.exceptions import RedisError
+from sqlalchemy import delete, or_, select
+from app.config import settings
+from app.domain.models import PasswordResetToken
+
+logger = logging.getLogger(__name__)
+
+LIVE_TOKEN_KEY_PREFIX = "auth:reset_token:"
+
+
+def _live_token_key(token_hash: str) -> str:
+    return f"{LIVE_TOKEN_KEY_PREFIX}{token_hash}"
+
+
+def remember_live_token(token_hash: str, token_id: int, user_id: int, expires_at: datetime) -> None:
+    """Simpan token reset/set password aktif di Redis sampai expires_at."""
+    if not settings.TOKEN_STORE_REDIS or expires_at is None:
+        return
+    ttl = int((expires_at - datetime.now(timezone.utc)).total_seconds())
+    if ttl <= 0:
+        return
+    try:
+        settings.REDIS.set(_live_token_key(token_hash), f"{token_id}:{user_id}", ex=ttl)
+    except RedisError as e:
+        logger.warning(f"Gagal menyimpan token {token_id} ke Redis: {str(e)}")
+
+
+def remember_live_tokens(tokens, expires_at: datetime) -> None:
+    """tokens: baris (id, user_id, token_hash) dengan expires_at yang sama, satu pipeline."""
+    if not settings.TOKEN_STORE_REDIS or not tokens or expires_at is None:
+        return
+    ttl = int((expires_at - datetime.now(timezone.utc)).total_seconds())
+    if ttl <= 0:
+        return
+    try:
+        pipe = settings.REDIS.pipeline(transaction=False)
+        for token in tokens:
+            pipe.set(_live_token_key(token.token_hash), f"{token.id}:{token.user_id}", ex=ttl)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Gagal menyimpan {len(tokens)} token ke Redis: {str(e)}")
+
+
+def get_live_token(token_hash: str) -> Optional[Tuple[int, int]]:
+    """(token_id, user_id) jika token masih aktif di Redis, atau None (fallback ke DB)."""
+    if not settings.TOKEN_STORE_REDIS:
+        return None
+    try:
+        value = settings.REDIS.get(_live_token_key(token_hash))
+    except RedisError as e:
+        logger.warning(f"Token store Redis tidak tersedia, fallback ke DB: {str(e)}")
+        return None
+    if not value:
+        return None
+    token_id, user_id = value.split(":")
+    return int(token_id), int(user_id)
+
+
+def forget_live_tokens(token_hashes: Iterable[str]) -> None:
+    if not settings.TOKEN_STORE_REDIS:
+        return
+    keys = [_live_token_key(token_hash) for token_hash in token_hashes]
+    if not keys:
+        return
+    try:
+        settings.REDIS.delete(*keys)
+    except RedisError as e:
+        # Aman: pemakaian token tetap dijaga UPDATE ... WHERE used_at IS NULL
+        logger.warning(f"Gagal menghapus {len(keys)} token dari Redis: {str(e)}")
+
+
+def purge_stale_tokens(
+    retention_hours: int = None,
+    batch_size: int = None
+) -> int:
+    """Hapus token yang sudah terpakai/kadaluarsa lebih dari retention_hours, per batch.
+
+    Commit per batch agar lock dan WAL tetap kecil; kembalikan jumlah baris terhapus.
+    """
+    from app.database import SessionLocal
+
+    retention_hours = settings.TOKEN_PURGE_RETENTION_HOURS if retention_hours is None else retention_hours
+    batch_size = batch_size or settings.TOKEN_PURGE_BATCH_SIZE
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=retention_hours)
+    stale_ids = select(PasswordResetToken.id).where(or_(
+        PasswordResetToken.used_at < cutoff,
+        PasswordResetToken.expires_at < cutoff
+    )).limit(batch_size).scalar_subquery()
+
+    total = 0
+    db = SessionLocal()
+    try:
+        while True:
+            deleted = db.execute(
+                delete(PasswordResetToken).where(
+                    PasswordResetToken.id.in_(stale_ids)
+                ).execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            total += deleted
+            if deleted < batch_size:
+                break
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Gagal purge token reset password: {str(e)}")
+    finally:
+        db.close()
+
+    if total:
+        logger.info(f"Purge token reset password: {total} baris dihapus")
+    return total
@@ -0,0 +1,121 @@
+import logging
+from typing import Optional
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_KEY = "auth:token_versions"
+REGISTRY_READY_KEY = "auth:token_versions:ready"
+REGISTRY_WARM_LOCK_KEY = "auth:token_versions:warming"
+WARM_BATCH_SIZE = 1000
+
+# True jika ada penulisan versi yang gagal; registry tidak boleh dipercaya sampai di-warm ulang
+_registry_dirty = False
+
+
+def _mark_dirty():
+    global _registry_dirty
+    _registry_dirty = True
+
+
+def _reset_if_dirty():
+    global _registry_dirty
+    if _registry_dirty:
+        settings.REDIS.delete(REGISTRY_READY_KEY)
+        _registry_dirty = False
+        logger.warning("Token registry ditandai belum siap karena ada penulisan yang gagal")
+
+
+def set_token_version(user_id: int, token_version: int) -> None:
+    try:
+        settings.REDIS.hset(REGISTRY_KEY, user_id, token_version)
+    except RedisError as e:
+        logger.warning(f"Gagal menulis token version user {user_id} ke registry: {str(e)}")
+        _mark_dirty()
+
+
+def set_token_versions(versions: dict) -> None:
+    """versions: user_id -> token_version, ditulis dengan satu HSET."""
+    if not versions:
+        return
+    try:
+        settings.REDIS.hset(REGISTRY_KEY, mapping=versions)
+    except RedisError as e:
+        logger.warning(f"Gagal menulis token version {len(versions)} user ke registry: {str(e)}")
+        _mark_dirty()
+
+
+def remember_token_version(user_id: int, token_version: int) -> None:
+    """Isi entry yang belum ada tanpa menimpa versi yang lebih baru."""
+    try:
+        settings.REDIS.hsetnx(REGISTRY_KEY, user_id, token_version)
+    except RedisError as e:
+        logger.warning(f"Gagal menulis token version user {user_id} ke registry: {str(e)}")
+
+
+def get_token_version(user_id: int) -> Optional[int]:
+    """Versi token dari registry, atau None jika registry belum siap / tidak tersedia."""
+    try:
+        _reset_if_dirty()
+        pipe = settings.REDIS.pipeline(transaction=False)
+        pipe.exists(REGISTRY_READY_KEY)
+        pipe.hget(REGISTRY_KEY, user_id)
+        ready, version = pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Token registry tidak tersedia, fallback ke DB: {str(e)}")
+        return None
+
+    if not ready or version is None:
+        return None
+    return int(version)
+
+
+def is_registry_ready() -> bool:
+    try:
+        _reset_if_dirty()
+        return bool(settings.REDIS.exists(REGISTRY_READY_KEY))
+    except RedisError:
+        return False
+
+
+def warm_token_registry() -> int:
+    """Isi ulang registry dari tabel users (startup atau setelah Redis restart)."""
+    from app.database import SessionLocal
+    from app.domain.models import User
+
+    try:
+        # Hanya satu worker yang melakukan warm-up pada satu waktu
+        if not settings.REDIS.set(REGISTRY_WARM_LOCK_KEY, "1", nx=True, ex=60):
+            return 0
+    except RedisError as e:
+        logger.warning(f"Warm-up token registry dilewati: {str(e)}")
+        return 0
+
+    db = SessionLocal()
+    total = 0
+    try:
+        # Hapus isi lama sebelum membaca DB. HSETNX menjaga versi yang ditulis
+        # increment_token_version selama warm-up agar tidak tertimpa nilai lama.
+        settings.REDIS.delete(REGISTRY_KEY)
+        result = db.execute(
+            select(User.id, User.token_version).execution_options(yield_per=WARM_BATCH_SIZE)
+        )
+        for rows in result.partitions():
+            pipe = settings.REDIS.pipeline(transaction=False)
+            for row in rows:
+                pipe.hsetnx(REGISTRY_KEY, row.id, row.token_version)
+            pipe.execute()
+            total += len(rows)
+        settings.REDIS.set(REGISTRY_READY_KEY, "1")
+        logger.info(f"Token registry di-warm dengan {total} user")
+    except Exception as e:
+        logger.error(f"Gagal warm-up token registry: {str(e)}")
+    finally:
+        db.close()
+        try:
+            settings.REDIS.delete(REGISTRY_WARM_LOCK_KEY)
+        except RedisError:
+            pass
+    return total
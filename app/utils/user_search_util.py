@@ -0,0 +1,25 @@
+from typing import Optional
+from sqlalchemy import Select, func
+from app.domain.models import User
+from app.utils.query_helpers_util import clean_search_string
+
+
+def normalize_search_term(search: Optional[str]) -> Optional[str]:
+    # Kolom search_text disimpan lowercase, jadi term juga di-lowercase
+    cleaned = clean_search_string(search)
+    return cleaned.lower() if cleaned else None
+
+
+def apply_user_search(stmt: Select, term: str) -> Select:
+    """Filter substring pada users.search_text.
+
+    LIKE '%term%' pada kolom ini dilayani index GIN pg_trgm
+    (ix_users_search_text_trgm), bukan sequential scan.
+    """
+    escaped = term.replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return stmt.where(User.search_text.like(f"%{escaped}%", escape="/"))
+
+
+def user_search_rank(term: str):
+    # word_similarity: kemiripan term dengan kata/potongan terbaik di search_text
+    return func.word_similarity(term, User.search_text)
@@ -0,0 +1,92 @@
+"""Microbenchmark encoding response: jsonable_encoder + JSONResponse vs FastJSONResponse.
+
+Payload mewakili response nyata: envelope success_response berisi model,
+dict dengan datetime (register), satu halaman UserListResponse, dan
+error_response.
+
+    python benchmarks/json_response.py --number 2000
+"""
+import argparse
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from app.api.schemas.auth_schema import UserListResponse, UserResponse  # noqa: E402
+from app.api.schemas.response_schemas import error_response, success_response  # noqa: E402
+from app.utils.json_response_util import FastJSONResponse, orjson  # noqa: E402
+
+
+def make_user(n: int) -> UserResponse:
+    now = datetime.now(timezone.utc)
+    return UserResponse(
+        id=n,
+        nip=f"{n:08d}",
+        username=f"user{n}",
+        email=f"user{n}@example.id",
+        full_name=f"Pengguna Nomor {n}",
+        jabatan="Staf Teknis",
+        organization=f"UPTD {n % 6 + 1}",
+        no_telepon="081234567890",
+        is_active=True,
+        is_verified=True,
+        role_name="Eksekutif",
+        last_activity=now - timedelta(minutes=n),
+        created_at=now - timedelta(days=n),
+        updated_at=now,
+    )
+
+
+def payloads() -> dict:
+    user = make_user(1)
+    return {
+        "login (envelope + model)": success_response(
+            data={"access_token": "x" * 180, "token_type": "bearer", "expires_in": 86400, "user": user},
+            message="Login berhasil"
+        ),
+        "register (dict + datetime)": {
+            "status": "success",
+            "code": 201,
+            "message": "User berhasil terdaftar. Menunggu verifikasi administrator.",
+            "data": user.model_dump(),
+        },
+        "users list (100 model)": UserListResponse(
+            status=200,
+            message="Daftar user berhasil diambil",
+            data=[make_user(n) for n in range(100)],
+            page=1,
+            limit=100,
+            total=1000,
+        ),
+        "error envelope": error_response("Internal server error", 500),
+    }
+
+
+def default_path(content):
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def fast_path(content):
+    return FastJSONResponse(content).body
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"orjson: {'ya' if orjson is not None else 'tidak terpasang (fallback json stdlib)'}")
+    print(f"{'payload':<30} {'default':>12} {'fast':>12} {'speedup':>8}")
+    for name, content in payloads().items():
+        default_us = timeit.timeit(lambda: default_path(content), number=args.number) / args.number * 1e6
+        fast_us = timeit.timeit(lambda: fast_path(content), number=args.number) / args.number * 1e6
+        print(f"{name:<30} {default_us:>9.1f} us {fast_us:>9.1f} us {default_us / fast_us:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Benchmark serialisasi list user: entity + from_orm per baris vs proyeksi kolom + TypeAdapter.
+
+Memakai SQLite in-memory agar bisa dijalankan tanpa Postgres; angka absolut
+berbeda dengan produksi, yang dibandingkan adalah biaya per baris kedua jalur.
+
+    python benchmarks/serialization.py --rows 5000 --repeat 5
+
+Hasil referensi (Python 3.11, pydantic 2.5, SQLAlchemy 2.0, 3 run):
+entity + from_orm 35.8-38.3 us/baris, proyeksi + TypeAdapter 14.5-22.8 us/baris
+(1.6-2.6x).
+"""
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from app.api.schemas.auth_schema import UserResponse  # noqa: E402
+from app.domain.models import User  # noqa: E402
+from app.utils.serialization_util import get_list_adapter, projection_columns, validate_rows  # noqa: E402
+
+
+def seed(engine, rows: int):
+    User.__table__.create(engine)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {
+                "nip": f"{n:08d}",
+                "username": f"user{n}",
+                "email": f"user{n}@example.id",
+                "full_name": f"Pengguna Nomor {n}",
+                "jabatan": "Staf Teknis",
+                "organization": f"UPTD {n % 6 + 1}",
+                "no_telepon": "081234567890",
+                "hashed_password": "x" * 60,
+                "is_active": n % 3 != 0,
+                "is_verified": True,
+                "role_name": "Eksekutif",
+                "token_version": 0,
+                "last_activity": now - timedelta(minutes=n),
+                "created_at": now - timedelta(hours=n),
+                "updated_at": now,
+            }
+            for n in range(rows)
+        ])
+
+
+def entity_path(engine) -> list:
+    with Session(engine) as session:
+        users = session.execute(select(User).order_by(User.id)).scalars().all()
+        return [UserResponse.from_orm(user) for user in users]
+
+
+def projection_path(engine) -> list:
+    with Session(engine) as session:
+        rows = session.execute(
+            select(*projection_columns(User, UserResponse)).order_by(User.id)
+        ).mappings().all()
+        return validate_rows(UserResponse, [dict(row) for row in rows])
+
+
+def measure(fn, engine, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(engine)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    seed(engine, args.rows)
+
+    # Pemanasan: konfigurasi mapper dan pembuatan TypeAdapter tidak ikut diukur
+    get_list_adapter(UserResponse)
+    assert [u.model_dump() for u in entity_path(engine)] == [u.model_dump() for u in projection_path(engine)]
+
+    before = measure(entity_path, engine, args.repeat)
+    after = measure(projection_path, engine, args.repeat)
+
+    print(f"rows: {args.rows}, repeat: {args.repeat} (median)")
+    print(f"{'entity + from_orm':<32} {before * 1000:>10.2f} ms {before / args.rows * 1e6:>8.2f} us/row")
+    print(f"{'proyeksi + TypeAdapter':<32} {after * 1000:>10.2f} ms {after / args.rows * 1e6:>8.2f} us/row")
+    print(f"speedup: {before / after:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
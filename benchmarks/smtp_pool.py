@@ -0,0 +1,136 @@
+"""Throughput pengiriman email: satu koneksi SMTP per email vs SMTPConnectionPool.
+
+Server SMTP pengganti berjalan lokal dengan aiosmtpd (pip install aiosmtpd).
+Biaya handshake TLS + AUTH ke Resend disimulasikan dengan jeda pada EHLO
+(--setup-latency-ms). Setelah benchmark, server di-restart untuk memastikan
+pool mendeteksi koneksi basi lewat NOOP dan menyambung ulang.
+
+    python benchmarks/smtp_pool.py --messages 200 --setup-latency-ms 150
+"""
+import argparse
+import asyncio
+import smtplib
+import socket
+import sys
+import logging
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.smtp_pool_util import SMTPConnectionPool  # noqa: E402
+
+try:
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.smtp import AuthResult
+except ImportError:  # dependensi benchmark saja, bukan dependensi aplikasi
+    Controller = None
+
+# Peringatan internal aiosmtpd saat AUTH, tidak relevan untuk benchmark
+logging.getLogger("mail.log").setLevel(logging.ERROR)
+
+HOST = "127.0.0.1"
+SENDER = "Monitoring Jalan <info@example.id>"
+MESSAGE = "Subject: Benchmark\r\n\r\n" + "Isi email benchmark.\r\n" * 40
+
+
+class StandInHandler:
+    def __init__(self, setup_latency_ms: float):
+        self.setup_latency = setup_latency_ms / 1000
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        # Mewakili round-trip TLS handshake + AUTH pada server sungguhan
+        await asyncio.sleep(self.setup_latency)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def start_server(handler, port: int) -> Controller:
+    controller = Controller(
+        handler,
+        hostname=HOST,
+        port=port,
+        authenticator=lambda *args: AuthResult(success=True),
+        auth_require_tls=False
+    )
+    controller.start()
+    return controller
+
+
+def send_unpooled(port: int, count: int):
+    # Perilaku lama: koneksi + login baru untuk setiap email
+    for n in range(count):
+        with smtplib.SMTP(HOST, port) as server:
+            server.login("resend", "secret")
+            server.sendmail(SENDER, [f"user{n}@example.id"], MESSAGE)
+
+
+def send_pooled(pool: SMTPConnectionPool, count: int):
+    for n in range(count):
+        pool.send(SENDER, [f"user{n}@example.id"], MESSAGE)
+
+
+def measure(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--setup-latency-ms", type=float, default=150)
+    args = parser.parse_args()
+
+    if Controller is None:
+        print("aiosmtpd belum terpasang: pip install aiosmtpd")
+        return 1
+
+    handler = StandInHandler(args.setup_latency_ms)
+    port = free_port()
+    controller = start_server(handler, port)
+
+    pool = SMTPConnectionPool(
+        HOST, port, "resend", "secret",
+        use_ssl=False, max_size=1, noop_after_seconds=0, max_messages=args.messages + 10
+    )
+    try:
+        # Jalur lama jauh lebih lambat; cukup sebagian kecil pesan untuk rata-rata
+        unpooled_count = max(1, min(args.messages, 20))
+        before = measure(send_unpooled, port, unpooled_count) / unpooled_count
+        after = measure(send_pooled, pool, args.messages) / args.messages
+        stats = pool.stats()
+
+        print(f"setup latency: {args.setup_latency_ms:.0f} ms, messages: {args.messages}")
+        print(f"{'koneksi per email':<22} {before * 1000:>9.2f} ms/email {1 / before:>9.1f} email/s")
+        print(f"{'pool':<22} {after * 1000:>9.2f} ms/email {1 / after:>9.1f} email/s")
+        print(f"speedup: {before / after:.1f}x, pool stats: {stats}")
+
+        # Server restart: koneksi di pool basi, harus terdeteksi dan diganti
+        controller.stop()
+        controller = start_server(handler, port)
+        pool.send(SENDER, ["after-restart@example.id"], MESSAGE)
+        reconnected = pool.stats()
+        ok = reconnected["connects"] == stats["connects"] + 1 and reconnected["stale"] + reconnected["retries"] >= 1
+        print(f"reconnect setelah restart server: {'ok' if ok else 'GAGAL'} ({reconnected})")
+        expected = unpooled_count + args.messages + 1
+        print(f"email diterima server: {handler.received}/{expected}")
+        return 0 if ok and handler.received == expected else 1
+    finally:
+        pool.close_all()
+        controller.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
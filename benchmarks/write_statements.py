@@ -0,0 +1,167 @@
+"""Jumlah statement per operasi tulis: SELECT -> ubah -> commit -> refresh vs INSERT/UPDATE ... RETURNING.
+
+Memakai SQLite in-memory (butuh SQLite >= 3.35 untuk RETURNING) agar bisa
+dijalankan tanpa Postgres. Yang dibandingkan adalah jumlah statement SQL
+(round-trip ke database) per operasi; di produksi setiap statement juga
+membayar latensi jaringan ke Postgres. Invalidasi cache Redis tidak diukur.
+
+    python benchmarks/write_statements.py --repeat 200
+
+Hasil referensi (3 run): jumlah statement tetap, update 3 -> 1, insert 2 -> 1,
+total 16 -> 6; waktu per operasi di SQLite in-memory turun sekitar 10-50%
+(create_reset_token ~1.9 ms -> ~1.1 ms) dan bervariasi antar run.
+"""
+import argparse
+import logging
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from app.api.schemas.auth_schema import UserResponse  # noqa: E402
+from app.domain.models import PasswordResetToken, User  # noqa: E402
+import app.repository.auth_repository as auth_repository  # noqa: E402
+
+auth_repository.invalidate_principal = lambda user_id: None
+# Tanpa Redis lokal, peringatan cache dari setiap commit hanya mengotori output
+logging.getLogger("app").setLevel(logging.ERROR)
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.statements = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, *args):
+        self.statements += 1
+
+    def _on_commit(self, *args):
+        self.commits += 1
+
+    def snapshot(self):
+        return self.statements, self.commits
+
+
+def admin_user_data(n: int) -> dict:
+    return {
+        "nip": f"{n:08d}",
+        "username": f"user{n}",
+        "email": f"user{n}@example.id",
+        "full_name": f"Pengguna {n}",
+        "jabatan": "Staf Teknis",
+        "organization": "UPTD 1",
+        "no_telepon": "081234567890",
+        "role_name": "Eksekutif",
+    }
+
+
+# Perilaku lama, disalin dari repository sebelum memakai RETURNING
+
+def old_create_user_by_admin(db: Session, n: int):
+    user = User(**admin_user_data(n), hashed_password="x" * 60, is_active=True, is_verified=True,
+                status_verifikasi="approved", is_approved=True)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return UserResponse.model_validate(user)
+
+
+def old_update(db: Session, user_id: int, **values):
+    user = db.query(User).filter(User.id == user_id).first()
+    for key, value in values.items():
+        setattr(user, key, value)
+    user.updated_at = datetime.now(timezone.utc)
+    db.commit()
+    db.refresh(user)
+    return UserResponse.model_validate(user)
+
+
+def old_create_reset_token(db: Session, user_id: int):
+    token = PasswordResetToken(user_id=user_id, token_hash=f"h{time.perf_counter_ns()}",
+                               expires_at=datetime.now(timezone.utc) + timedelta(hours=1))
+    db.add(token)
+    db.commit()
+    db.refresh(token)
+    return token.id
+
+
+OLD = {
+    "create_user_by_admin": lambda db, n, uid: old_create_user_by_admin(db, n),
+    "update_user_role": lambda db, n, uid: old_update(db, uid, role_name="Super Admin"),
+    "toggle_user_active": lambda db, n, uid: old_update(db, uid, is_active=False),
+    "approve_user": lambda db, n, uid: old_update(
+        db, uid, is_verified=True, is_active=True, status_verifikasi="approved", verified_by=uid,
+        verified_at=datetime.now(timezone.utc), role_name="Eksekutif", is_approved=True
+    ),
+    "update_user_by_admin": lambda db, n, uid: old_update(db, uid, full_name="Nama Baru", jabatan="Kepala"),
+    "create_reset_token": lambda db, n, uid: old_create_reset_token(db, uid),
+}
+
+NEW = {
+    "create_user_by_admin": lambda repo, n, uid: repo.create_user_by_admin(admin_user_data(n), "x" * 60),
+    "update_user_role": lambda repo, n, uid: repo.update_user_role(uid, "Super Admin"),
+    "toggle_user_active": lambda repo, n, uid: repo.toggle_user_active(uid, False),
+    "approve_user": lambda repo, n, uid: repo.approve_user(uid, verified_by=uid),
+    "update_user_by_admin": lambda repo, n, uid: repo.update_user_by_admin(
+        uid, {"full_name": "Nama Baru", "jabatan": "Kepala"}
+    ),
+    "create_reset_token": lambda repo, n, uid: repo.create_reset_token(
+        uid, f"h{time.perf_counter_ns()}", datetime.now(timezone.utc) + timedelta(hours=1)
+    ),
+}
+
+
+def run(engine, counter, operation, repeat: int, offset: int, use_repository: bool):
+    """Satu session per operasi seperti satu request API; kembalikan (statement, commit, detik) per operasi."""
+    statements, commits = counter.snapshot()
+    started = time.perf_counter()
+    for n in range(offset, offset + repeat):
+        with Session(engine, autoflush=False) as db:
+            if use_repository:
+                NEW[operation](auth_repository.AuthRepository(db), n, 1)
+            else:
+                OLD[operation](db, n, 1)
+    elapsed = time.perf_counter() - started
+    after_statements, after_commits = counter.snapshot()
+    return (after_statements - statements) / repeat, (after_commits - commits) / repeat, elapsed / repeat
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+    PasswordResetToken.__table__.create(engine)
+    counter = StatementCounter(engine)
+    with Session(engine) as db:
+        old_create_user_by_admin(db, 0)
+
+    print(f"repeat: {args.repeat}, statement & commit per operasi")
+    print(f"{'operasi':<22} {'lama':>12} {'RETURNING':>12} {'lama us':>10} {'baru us':>10}")
+    total_before = total_after = 0
+    offset = 1
+    for operation in OLD:
+        before = run(engine, counter, operation, args.repeat, offset, use_repository=False)
+        offset += args.repeat
+        after = run(engine, counter, operation, args.repeat, offset, use_repository=True)
+        offset += args.repeat
+        total_before += before[0]
+        total_after += after[0]
+        print(
+            f"{operation:<22} {before[0]:>5.1f} + {before[1]:.0f}c {after[0]:>5.1f} + {after[1]:.0f}c "
+            f"{before[2] * 1e6:>10.1f} {after[2] * 1e6:>10.1f}"
+        )
+    print(f"total statement: {total_before:.0f} -> {total_after:.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
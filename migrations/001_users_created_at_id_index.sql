@@ -0,0 +1,3 @@
+-- Index untuk keyset pagination GET /api/auth/users (ORDER BY created_at DESC, id DESC).
+-- create_all hanya membuat index pada tabel baru; jalankan manual untuk database yang sudah ada.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_created_at_id ON users (created_at, id);
@@ -0,0 +1,15 @@
+-- Pencarian direktori user: kolom search_text (generated) + index GIN pg_trgm.
+-- Menggantikan OR tujuh ILIKE '%term%' yang selalu sequential scan.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS search_text text GENERATED ALWAYS AS (
+        lower(
+            coalesce(full_name, '') || ' ' || coalesce(username, '') || ' ' ||
+            coalesce(email, '') || ' ' || coalesce(nip, '') || ' ' ||
+            coalesce(jabatan, '') || ' ' || coalesce(organization, '')
+        )
+    ) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_search_text_trgm
+    ON users USING gin (search_text gin_trgm_ops);
@@ -0,0 +1,20 @@
+-- Outbox email transaksional; dikirim oleh worker `python -m app.email_worker`.
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id SERIAL PRIMARY KEY,
+    template VARCHAR(100) NOT NULL,
+    to_email VARCHAR(255) NOT NULL,
+    payload JSON,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    locked_until TIMESTAMPTZ,
+    last_error TEXT,
+    sent_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT now(),
+    updated_at TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_email_outbox_id ON email_outbox (id);
+CREATE INDEX IF NOT EXISTS ix_email_outbox_status ON email_outbox (status);
+CREATE INDEX IF NOT EXISTS ix_email_outbox_due ON email_outbox (next_attempt_at)
+    WHERE status IN ('pending', 'sending');
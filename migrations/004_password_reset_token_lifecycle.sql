@@ -0,0 +1,8 @@
+-- Index siklus hidup token reset/set password (lihat app.utils.token_lifecycle_util).
+-- create_all hanya membuat index pada tabel baru; jalankan manual untuk database yang sudah ada.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_password_reset_token_live_user
+    ON password_reset_token (user_id) WHERE used_at IS NULL;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_password_reset_token_used_at
+    ON password_reset_token (used_at) WHERE used_at IS NOT NULL;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_password_reset_token_expires_at
+    ON password_reset_token (expires_at);
@@ -0,0 +1,55 @@
+import asyncio
+import csv
+import io
+from datetime import datetime, timezone
+import pytest
+from app.utils.export_util import _format_xlsx_value, stream_csv, stream_xlsx
+
+COLUMNS = [("full_name", "Nama Lengkap"), ("organization", "Instansi"), ("id", "ID")]
+
+
+async def _batches(rows):
+    yield rows
+
+
+async def _collect(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+@pytest.mark.parametrize("value", [
+    '=HYPERLINK("http://evil.example","klik")',
+    "+62 812 3456",
+    "-1+1",
+    "@SUM(A1:A2)",
+    "\tTab",
+    "\rCR",
+])
+def test_formula_prefixes_are_escaped(value):
+    assert _format_xlsx_value(value) == f"'{value}"
+
+
+def test_safe_values_are_unchanged():
+    created_at = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    assert _format_xlsx_value("Budi = Admin") == "Budi = Admin"
+    assert _format_xlsx_value(-5) == -5
+    assert _format_xlsx_value(created_at) == datetime(2026, 1, 2, 3, 4, 5)
+
+
+def test_stream_csv_escapes_formula_cells():
+    rows = [{"full_name": "=1+1", "organization": "UPTD 1", "id": 7}]
+    content = asyncio.run(_collect(stream_csv(COLUMNS, _batches(rows)))).decode("utf-8-sig")
+
+    header, row = list(csv.reader(io.StringIO(content)))
+    assert header == ["Nama Lengkap", "Instansi", "ID"]
+    assert row == ["'=1+1", "UPTD 1", "7"]
+
+
+def test_stream_xlsx_stores_formula_as_text():
+    openpyxl = pytest.importorskip("openpyxl")
+    rows = [{"full_name": '=HYPERLINK("http://evil.example")', "organization": "@cmd", "id": 7}]
+    content = asyncio.run(_collect(stream_xlsx(COLUMNS, _batches(rows))))
+
+    sheet = openpyxl.load_workbook(io.BytesIO(content)).active
+    cells = [cell.value for cell in sheet[2]]
+    assert cells == ['\'=HYPERLINK("http://evil.example")', "'@cmd", 7]
+    assert all(cell.data_type != "f" for cell in sheet[2])